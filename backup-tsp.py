@@ -1,6 +1,12 @@
+import os
+import sys
 import streamlit as st
-import gurobipy as gp
-from gurobipy import Model, GRB
+from gurobipy import GRB
+
+FINALS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "finals")
+if FINALS_DIR not in sys.path:
+    sys.path.append(FINALS_DIR)
+from tsp_model import solve_tsp
 
 # Title
 st.title("TSP Optimization Problem Solver")
@@ -56,40 +62,21 @@ col1, col2, col3, col4, col5 = st.columns([1, 3, 3, 1,1])  # Adjust widths as ne
 with col3:
 # Solve Button
     if st.button("Solve TSP"):
-    # Initialize the model
-        m = Model("TSP")
-
-        # Variables: x[i, j] = 1 if the salesman travels from city i to city j
-        x = m.addVars(
-            distances.keys(),
-            vtype=GRB.BINARY,
-            name="x"
-        )
-
-        # Set objective function
-        m.setObjective(
-            gp.quicksum(distances[(i, j)] * x[(i, j)] for i in range(num_vars) for j in range(num_vars) if i != j),
-            GRB.MINIMIZE,
-        )
-
-        # Add constraints
-        for i in range(num_vars):
-            # Ensure each city is left once
-            m.addConstr(gp.quicksum(x[(i, j)] for j in range(num_vars) if i != j) == 1, name=f"leave_{i}")
-            # Ensure each city is entered once
-            m.addConstr(gp.quicksum(x[(j, i)] for j in range(num_vars) if i != j) == 1, name=f"enter_{i}")
-
-        # Solve the problem
-        m.optimize()
+        # Held-Karp for these few cities; a MIP (undirected when the matrix is symmetric) above
+        result = solve_tsp(num_vars, distances, [], "auto")
 
         # Display results
-        if m.status == GRB.OPTIMAL:
+        if result["status"] == GRB.OPTIMAL:
             st.success("Optimal Solution Found!")
             st.latex(f"\\text{{ Solution :}}")
-            st.latex(f"Objective Value: {m.objVal}")
-            for i in range(num_vars):
-                for j in range(num_vars):
-                    if i != j and x[(i, j)].x > 0.5:
-                        st.latex(f"Travel from {city_names[i]} to {city_names[j]}")
+            st.latex(f"Objective Value: {result['objective']}")
+            if result["formulation"] == "dp":
+                st.write("Solver: Held-Karp dynamic programming")
+            else:
+                st.write(f"Model: {'undirected (symmetric distances)' if result['symmetric'] else 'directed'}")
+            if result["heuristic_gap"] is not None:
+                st.write(f"Heuristic tour: {result['heuristic']:.2f} (gap {result['heuristic_gap']:.2%})")
+            for i, j in result["itinerary"]:
+                st.latex(f"Travel from {city_names[i]} to {city_names[j]}")
         else:
             st.error("No optimal solution found.")
\ No newline at end of file
@@ -0,0 +1,115 @@
+import time
+
+from gurobipy import GRB
+import numpy as np
+import scipy.sparse as sp
+
+from linear_model import STATUS_NAMES, solve_linear_problem
+
+BACKENDS = {
+    "gurobi": "Gurobi",
+    "highs": "HiGHS (SciPy)",
+}
+
+
+# Every backend takes a linear_problem dict and returns the same result dict:
+#   status (Gurobi status code), status_name, objective, values,
+#   duals (one per row, as Gurobi's Pi; None for MIPs), runtime, backend,
+#   timings (seconds per phase) and stats (solver statistics, see telemetry.py)
+def solve_gurobi(problem):
+    result = solve_linear_problem(problem)
+    result["backend"] = "gurobi"
+    return result
+
+
+# linprog/milp status codes, mapped to Gurobi's. A failed solve (4:
+# numerical difficulties, or any code SciPy adds later) is NUMERIC, which is
+# not a final status, so the solution store never keeps it.
+HIGHS_STATUS = {
+    0: GRB.OPTIMAL,
+    1: GRB.ITERATION_LIMIT,
+    2: GRB.INFEASIBLE,
+    3: GRB.UNBOUNDED,
+    4: GRB.NUMERIC,
+}
+
+
+def solve_highs(problem):
+    # SciPy's solvers are only loaded when HiGHS is picked
+    from scipy.optimize import Bounds, LinearConstraint, linprog, milp
+
+    start = time.perf_counter()
+    # SciPy always minimises
+    sign = -1.0 if problem["sense"] == "max" else 1.0
+    c = sign * problem["c"]
+    A, senses, b = problem["A"], problem["senses"], problem["b"]
+    lb = np.where(problem["lb"] <= -GRB.INFINITY, -np.inf, problem["lb"])
+    ub = np.where(problem["ub"] >= GRB.INFINITY, np.inf, problem["ub"])
+    # Gurobi reads "B" as an integer in [0, 1]; HiGHS needs the bounds
+    binary = problem["vtype"] == "B"
+    lb, ub = np.where(binary, np.maximum(lb, 0), lb), np.where(binary, np.minimum(ub, 1), ub)
+    duals = None
+
+    if np.all(problem["vtype"] == "C"):
+        # ">" rows are flipped into "<" rows
+        upper = np.flatnonzero(senses != "=")
+        flip = np.where(senses[upper] == ">", -1.0, 1.0)
+        equal = np.flatnonzero(senses == "=")
+        res = linprog(
+            c,
+            A_ub=sp.diags(flip) @ A[upper] if len(upper) else None,
+            b_ub=flip * b[upper] if len(upper) else None,
+            A_eq=A[equal] if len(equal) else None,
+            b_eq=b[equal] if len(equal) else None,
+            bounds=np.column_stack((lb, ub)),
+            method="highs",
+        )
+        if res.status == 0:
+            duals = np.zeros(len(b))
+            if len(upper):
+                duals[upper] = sign * flip * res.ineqlin.marginals
+            if len(equal):
+                duals[equal] = sign * res.eqlin.marginals
+            duals = duals.tolist()
+    else:
+        low = np.where(senses == "<", -np.inf, b)
+        high = np.where(senses == ">", np.inf, b)
+        res = milp(
+            c,
+            constraints=LinearConstraint(A, low, high) if len(b) else None,
+            bounds=Bounds(lb, ub),
+            integrality=(problem["vtype"] != "C").astype(int),
+        )
+
+    runtime = time.perf_counter() - start
+    status = HIGHS_STATUS.get(res.status, GRB.NUMERIC)
+    found = res.x is not None
+    return {
+        "status": status,
+        "status_name": STATUS_NAMES.get(status, str(res.message)),
+        "objective": sign * float(res.fun) if found else None,
+        "values": res.x.tolist() if found else None,
+        "duals": duals,
+        "runtime": runtime,
+        "backend": "highs",
+        # SciPy does not split its time into phases
+        "timings": {"solve": runtime},
+        "stats": {
+            "runtime": runtime,
+            "nodes": getattr(res, "mip_node_count", 0),
+            "iterations": getattr(res, "nit", None),
+            "gap": getattr(res, "mip_gap", None),
+        },
+    }
+
+
+SOLVERS = {
+    "gurobi": solve_gurobi,
+    "highs": solve_highs,
+}
+
+
+def solve_problem(problem, backend="gurobi"):
+    if backend not in SOLVERS:
+        raise ValueError(f"Unknown backend: {backend}")
+    return SOLVERS[backend](problem)
@@ -0,0 +1,155 @@
+import queue
+import threading
+import time
+
+from gurobipy import GRB
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# Seconds between two looks at a running job, and at most one progress
+# report per this many seconds of solver time unless the incumbent or bound moved
+POLL_INTERVAL = 0.5
+REPORT_EVERY = 0.2
+
+# Callback codes of the incumbent, bound and node count, for each place they can be read
+_PROGRESS_CODES = {
+    GRB.Callback.MIP: (GRB.Callback.MIP_OBJBST, GRB.Callback.MIP_OBJBND, GRB.Callback.MIP_NODCNT),
+    GRB.Callback.MIPSOL: (GRB.Callback.MIPSOL_OBJBST, GRB.Callback.MIPSOL_OBJBND, GRB.Callback.MIPSOL_NODCNT),
+}
+
+
+# Push a progress report to the job's queue, at most one per REPORT_EVERY
+# seconds unless the incumbent or bound moved
+def _report(job, now, incumbent, bound, nodes):
+    if now - job["_reported"][0] < REPORT_EVERY and (incumbent, bound) == job["_reported"][1:]:
+        return
+    job["_reported"] = (now, incumbent, bound)
+    gap = None
+    if incumbent is not None and bound is not None:
+        gap = abs(incumbent - bound) / max(abs(incumbent), 1e-10)
+    job["queue"].put({"time": now, "incumbent": incumbent, "bound": bound, "gap": gap, "nodes": int(nodes)})
+
+
+# Gurobi callback of a job: runs `inner` (e.g. the lazy subtour cuts), stops
+# the solve once the job is cancelled and pushes the incumbent, bound, gap and
+# node count to the job's queue. A solve that runs Gurobi in other processes
+# reports through callback.report(time, incumbent, bound, nodes) and checks
+# callback.cancelled() itself.
+def progress_callback(job, inner=None):
+    def callback(model, where):
+        if inner is not None:
+            inner(model, where)
+        job["model"] = model
+        if job["cancel"].is_set():
+            model.terminate()
+            return
+        if where not in _PROGRESS_CODES:
+            return
+        best, bound, nodes = (model.cbGet(code) for code in _PROGRESS_CODES[where])
+        incumbent = None if abs(best) >= GRB.INFINITY else best
+        _report(job, model.cbGet(GRB.Callback.RUNTIME), incumbent, bound, nodes)
+
+    callback.report = lambda now, incumbent, bound, nodes: _report(job, now, incumbent, bound, nodes)
+    callback.cancelled = job["cancel"].is_set
+    return callback
+
+
+def _run(job, solve):
+    try:
+        job["result"] = solve(progress_callback(job))
+    except Exception as error:
+        job["error"] = error
+
+
+# Start `solve(callback)` in a worker thread and keep the job under `key` in
+# the session. The thread shares the page's script context, so the solve may
+# use the session state and caches like the page itself. `inputs` tags the
+# inputs being solved (see job_panel).
+def start_job(key, solve, inputs=None):
+    job = {
+        "inputs": inputs,
+        "queue": queue.Queue(),
+        "history": [],
+        "cancel": threading.Event(),
+        "model": None,
+        "result": None,
+        "error": None,
+        "started": time.perf_counter(),
+        "_reported": (float("-inf"), None, None),
+    }
+    job["thread"] = threading.Thread(target=_run, args=(job, solve), daemon=True)
+    add_script_run_ctx(job["thread"], get_script_run_ctx())
+    st.session_state[key] = job
+    job["thread"].start()
+    return job
+
+
+def job_running(key):
+    job = st.session_state.get(key)
+    return job is not None and job["thread"].is_alive()
+
+
+# Move the reports waiting in the queue to the job's history
+def poll_job(job):
+    while True:
+        try:
+            job["history"].append(job["queue"].get_nowait())
+        except queue.Empty:
+            return job["history"]
+
+
+# Ask the solver to stop; it keeps the best solution found so far
+def cancel_job(job):
+    job["cancel"].set()
+    if job["model"] is not None:
+        job["model"].terminate()
+
+
+def _progress_chart(history):
+    frame = pd.DataFrame(history).set_index("time")
+    last = history[-1]
+    columns = st.columns(3)
+    columns[0].metric("Incumbent", "-" if last["incumbent"] is None else f"{last['incumbent']:.6g}")
+    columns[1].metric("Gap", "-" if last["gap"] is None else f"{last['gap']:.2%}")
+    columns[2].metric("Nodes", last["nodes"])
+    st.line_chart(frame[["incumbent", "bound"]], x_label="Solver time (s)")
+
+
+@st.fragment(run_every=POLL_INTERVAL)
+def _progress_fragment(key):
+    job = st.session_state.get(key)
+    if job is None:
+        return
+    history = poll_job(job)
+    if not job["thread"].is_alive():
+        # The whole page reruns to show the result
+        st.rerun()
+    st.info(f"Solving... {time.perf_counter() - job['started']:.1f} s")
+    if history:
+        _progress_chart(history)
+    if job["cancel"].is_set():
+        st.caption("Stopping: the best solution found so far will be kept.")
+    elif st.button("Cancel", key=f"{key}_cancel"):
+        cancel_job(job)
+
+
+# Live progress of the job under `key` while it runs (redrawn every
+# POLL_INTERVAL seconds, with a Cancel button); once it has finished, its
+# result, returned on that one run only. None when there is nothing to show,
+# or when the result belongs to other inputs than `inputs` (they were edited
+# during the solve).
+def job_panel(key, inputs=None):
+    job = st.session_state.get(key)
+    if job is None:
+        return None
+    if job["thread"].is_alive():
+        _progress_fragment(key)
+        return None
+    del st.session_state[key]
+    if job["error"] is not None:
+        raise job["error"]
+    if job["inputs"] != inputs:
+        st.info("The inputs changed during the solve: press the button again to solve them.")
+        return None
+    return job["result"]
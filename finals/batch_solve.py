@@ -0,0 +1,232 @@
+# Solve diet, allocation, LP and TSP instances without the Streamlit pages.
+#
+#     python batch_solve.py instances/ -o results.jsonl --workers 4 --threads 2
+#     cat instances.jsonl | python batch_solve.py - > results.jsonl
+#
+# The input is a directory of .json/.jsonl files, a single .json/.jsonl file, or
+# "-" for JSON lines on stdin. Every instance is an object with a "kind":
+#
+#     {"id": "d1", "kind": "diet",
+#      "foods": [{"name": "Rice", "price": 1.2, "min": 0, "max": 10}, ...],
+#      "constraints": [{"name": "Calories", "sense": ">=", "limit": 2000,
+#                       "contributions": [130, ...]}, ...]}
+#     {"id": "a1", "kind": "allocation", "costs": [...], "coefficients": [[...]], "limits": [...]}
+#     {"id": "l1", "kind": "lp", "c": [...], "A": [[...]], "senses": [...], "b": [...],
+#      "sense": "min", "lb": [...], "ub": [...], "vtype": "C"}
+#     {"id": "t1", "kind": "tsp", "positions": [[x, y], ...], "blocked_routes": [[i, j], ...],
+#      "formulation": "auto"}
+#
+# TSP formulations are "dfj", "mtz", "dp" (Held-Karp) or "auto", which takes
+# Held-Karp on small instances and DFJ above. A "dp" instance whose tables
+# would not fit in memory is solved with DFJ; the result line names the
+# formulation used.
+#
+# The linear kinds run on Gurobi or HiGHS (--backend, or a "backend" key per
+# instance); HiGHS needs no Gurobi license and has no size limit.
+#
+# One JSON line is written per instance as soon as its solve finishes, so the
+# output order follows completion, not input order.
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from gurobipy import GRB
+
+from distance_engine import distance_dict, euclidean_matrix
+from backends import BACKENDS, solve_problem
+from linear_model import allocation_problem, diet_problem, linear_problem
+from solver_env import set_defaults
+from tsp_dp import dp_fits
+from tsp_heuristics import check_routes
+from tsp_model import solve_tsp
+
+
+def diet_instance(instance):
+    foods = [(food["name"], food["price"], food.get("min", 0.0), food.get("max", float("inf")))
+             for food in instance["foods"]]
+    constraints = [(row["name"], row["sense"], row["limit"], row["contributions"])
+                   for row in instance["constraints"]]
+    return diet_problem(foods, constraints, name=str(instance.get("id", "NutriOpt")))
+
+
+def allocation_instance(instance):
+    return allocation_problem(instance["costs"], instance["coefficients"], instance["limits"],
+                              min_value=instance.get("min_value", 1e-2))
+
+
+def lp_instance(instance):
+    return linear_problem(
+        c=instance["c"],
+        A=instance["A"],
+        senses=instance["senses"],
+        b=instance["b"],
+        sense=instance.get("sense", "min"),
+        lb=instance.get("lb"),
+        ub=instance.get("ub"),
+        vtype=instance.get("vtype", "C"),
+    )
+
+
+BUILDERS = {
+    "diet": diet_instance,
+    "allocation": allocation_instance,
+    "lp": lp_instance,
+}
+
+
+def solve_tsp_instance(instance):
+    positions = instance["positions"]
+    blocked_routes = check_routes(len(positions), instance.get("blocked_routes", []))
+    distances = distance_dict(euclidean_matrix(positions))
+    formulation = instance.get("formulation", "auto")
+    if formulation == "dp" and not dp_fits(len(positions), max_nodes=None):
+        formulation = "dfj"
+    result = solve_tsp(len(positions), distances, blocked_routes, formulation)
+    return {
+        "formulation": result["formulation"],
+        "status": result["status"],
+        "objective": result["objective"],
+        "itinerary": [list(arc) for arc in result["itinerary"]],
+        "runtime": result["solve_time"],
+        "nodes": result["nodes"],
+    }
+
+
+# Solve one instance; runs in a worker process. Any error is reported in the
+# result line instead of stopping the batch (or killing a service worker). An
+# instance may pick its own "backend" for the linear kinds; TSP always runs on
+# Gurobi.
+def solve_instance(instance, backend="gurobi"):
+    start = time.perf_counter()
+    line = {"id": instance.get("id"), "kind": instance.get("kind")}
+    try:
+        kind = instance["kind"]
+        if kind == "tsp":
+            line.update(solve_tsp_instance(instance))
+        elif kind in BUILDERS:
+            result = solve_problem(BUILDERS[kind](instance), instance.get("backend", backend))
+            line.update({key: result[key] for key in ("backend", "status", "objective", "values", "runtime")})
+        else:
+            raise ValueError(f"Unknown instance kind: {kind}")
+        line["optimal"] = line["status"] == GRB.OPTIMAL
+    except Exception as error:
+        line["error"] = f"{type(error).__name__}: {error}"
+    line["wall_time"] = time.perf_counter() - start
+    return line
+
+
+def _init_worker(threads):
+    set_defaults(OutputFlag=0, Threads=threads)
+
+
+# Result line of an input that could not be read as an instance; written out
+# as it is, never solved
+class ReadError(dict):
+    pass
+
+
+def _instance(data, where):
+    if isinstance(data, dict):
+        return data
+    return ReadError(id=where, kind=None, error=f"TypeError: expected a JSON object, got {type(data).__name__}")
+
+
+def _read_file(path):
+    with open(path, encoding="utf-8") as handle:
+        if path.endswith(".jsonl"):
+            yield from _read_lines(handle, path)
+            return
+        try:
+            data = json.load(handle)
+        except ValueError as error:
+            yield ReadError(id=path, kind=None, error=f"{type(error).__name__}: {error}")
+            return
+        items = data if isinstance(data, list) else [data]
+        for index, item in enumerate(items):
+            yield _instance(item, f"{path}[{index}]")
+
+
+def _read_lines(handle, name):
+    for number, line in enumerate(handle, 1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as error:
+            yield ReadError(id=f"{name}:{number}", kind=None, error=f"{type(error).__name__}: {error}")
+            continue
+        yield _instance(data, f"{name}:{number}")
+
+
+# Instances one at a time, so a large stream is never held in memory
+def read_instances(source):
+    if source == "-":
+        yield from _read_lines(sys.stdin, "<stdin>")
+    elif os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.endswith((".json", ".jsonl")):
+                for instance in _read_file(os.path.join(source, name)):
+                    instance.setdefault("id", os.path.splitext(name)[0])
+                    yield instance
+    else:
+        yield from _read_file(source)
+
+
+# Solve the instances in a process pool and yield each result as it finishes.
+# At most 2 x workers instances are in flight at any time. Inputs that could
+# not be read come out as error lines straight away.
+def solve_batch(instances, workers=None, threads=1, backend="gurobi"):
+    workers = workers or max(1, (os.cpu_count() or 1) // threads)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(threads,),
+    ) as pool:
+        pending = set()
+        for instance in instances:
+            if isinstance(instance, ReadError):
+                yield dict(instance)
+                continue
+            pending.add(pool.submit(solve_instance, instance, backend))
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve diet, allocation, LP and TSP instances in batch.")
+    parser.add_argument("source", help="directory, .json/.jsonl file, or - for JSON lines on stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSON lines output file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: cores / threads)")
+    parser.add_argument("--threads", type=int, default=1, help="Gurobi threads per worker (default: 1)")
+    parser.add_argument("--backend", choices=list(BACKENDS), default="gurobi", help="solver for the linear instances")
+    args = parser.parse_args(argv)
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    solved = failed = 0
+    start = time.perf_counter()
+    try:
+        for line in solve_batch(read_instances(args.source), args.workers, args.threads, args.backend):
+            output.write(json.dumps(line) + "\n")
+            output.flush()
+            solved += 1
+            failed += "error" in line
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"{solved} instances ({failed} failed) in {time.perf_counter() - start:.2f} s", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
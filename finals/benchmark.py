@@ -0,0 +1,279 @@
+# Benchmark suite: seeded instances of every model in the project, timed and
+# compared with a stored baseline.
+#
+#     python benchmark.py                      # run, compare with benchmark_baseline.json
+#     python benchmark.py --update             # run and store the results as the baseline
+#     python benchmark.py --only tsp --repeat 5
+#
+# Every configuration runs in its own fresh process, so the peak RSS belongs
+# to that configuration alone. A configuration regresses when its build or
+# solve time, node count or peak RSS grows by more than --tolerance over the
+# baseline (and by more than a small absolute amount, to ignore timer noise).
+# Times are medians over --repeat runs (5 by default) in that process, after
+# one untimed warm-up run; a slower time is checked in CONFIRM more processes
+# before it is reported.
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import gurobipy as gp
+import numpy as np
+import scipy.sparse as sp
+
+from backends import BACKENDS, solve_problem
+import distance_engine
+from distance_engine import distance_dict, euclidean_matrix
+from food_database import table_diet_problem
+from linear_model import build_linear_model, linear_problem
+from solver_env import set_defaults
+from tsp_model import solve_tsp
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+# Per-solve time limit, so one pathological run cannot stall the suite; the
+# gap of a run that hits it is still recorded
+TIME_LIMIT = 60.0
+
+# Below these differences a change is noise, whatever the ratio. The first
+# run in a process pays for imports and Gurobi's start-up and can take twice
+# as long; after it, the medians of the small builds and solves move by a
+# millisecond or two, and the larger ones in proportion to their size.
+NOISE = {"build_time": 0.005, "solve_time": 0.005, "nodes": 10, "peak_rss_mb": 10.0}
+# Timed runs per configuration unless --repeat says otherwise
+REPEAT = 5
+TIMES = ("build_time", "solve_time")
+# The same configuration is up to a third slower in one process than in
+# another; a slower time is only reported when it holds in this many more
+CONFIRM = 2
+
+
+# Random sparse LP for the PL front: min c.x, A x >= b, 0 <= x <= 10, with
+# b chosen so that x = 1 is feasible
+def sparse_lp(n, seed, density=0.01):
+    rng = np.random.default_rng(seed)
+    rows = max(1, int(0.6 * n))
+    A = sp.random(rows, n, density, random_state=rng, format="csr", data_rvs=lambda k: rng.uniform(1, 10, k))
+    b = 0.5 * (A @ np.ones(n))
+    return linear_problem(rng.uniform(1, 10, n), A, [">="] * rows, b, ub=np.full(n, 10.0), name="sparse_lp")
+
+
+# Multi-dimensional 0/1 knapsack for the PLNE front (uncorrelated values:
+# with correlated ones 1000 items do not close within minutes)
+def knapsack_milp(n, seed, dimensions=5):
+    rng = np.random.default_rng(seed)
+    weights = rng.integers(10, 100, (dimensions, n))
+    values = rng.integers(10, 100, n)
+    capacity = weights.sum(axis=1) // 3
+    return linear_problem(values, weights, ["<="] * dimensions, capacity, sense="max", vtype="B", name="knapsack")
+
+
+# Diet over a synthetic food table: 40 nutrients, 30% of the entries
+# non-zero, a minimum for every nutrient and a maximum for a few
+def diet(n, seed, nutrients=40):
+    rng = np.random.default_rng(seed)
+    matrix = rng.uniform(0, 100, (nutrients, n)) * (rng.random((nutrients, n)) < 0.3)
+    table = {
+        "prices": rng.uniform(0.5, 5, n),
+        "min": np.zeros(n),
+        "max": np.full(n, 5.0),
+        "nutrients": matrix,
+    }
+    limits = {k: (200.0, 1500.0 if k % 8 == 0 else None) for k in range(nutrients)}
+    return table_diet_problem(table, np.arange(n), limits, name="diet")
+
+
+def euclidean_points(n, seed):
+    return np.random.default_rng(seed).random((n, 2)) * 1000
+
+
+# Points in a handful of tight Gaussian clusters
+def clustered_points(n, seed, clusters=5):
+    rng = np.random.default_rng(seed)
+    centres = rng.random((clusters, 2)) * 1000
+    return centres[rng.integers(clusters, size=n)] + rng.normal(0, 30, (n, 2))
+
+
+# name: (kind, generator, size); sizes stay under the size-limited license's caps
+SUITE = {
+    f"{name}_{size}": (kind, generator, size)
+    for name, kind, generator, sizes in (
+        ("lp", "linear", sparse_lp, (200, 800, 1900)),
+        ("knapsack", "linear", knapsack_milp, (50, 200, 500)),
+        ("diet", "linear", diet, (200, 800, 1900)),
+        ("tsp_euclidean", "tsp", euclidean_points, (15, 30, 50)),
+        ("tsp_clustered", "tsp", clustered_points, (15, 30, 50)),
+    )
+    for size in sizes
+}
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_linear(problem, backend):
+    if backend != "gurobi":
+        result = solve_problem(problem, backend)
+        return {"build_time": None, "solve_time": result["runtime"], "nodes": None, "gap": None,
+                "objective": result["objective"], "status": result["status_name"]}
+    start = time.perf_counter()
+    m, _ = build_linear_model(problem)
+    m.update()
+    build_time = time.perf_counter() - start
+    m.optimize()
+    record = {
+        "build_time": build_time,
+        "solve_time": m.Runtime,
+        "nodes": int(m.NodeCount) if m.IsMIP else 0,
+        "gap": m.MIPGap if m.IsMIP and m.SolCount else 0.0,
+        "objective": m.ObjVal if m.SolCount else None,
+        "status": m.Status,
+    }
+    m.dispose()
+    return record
+
+
+def _run_tsp(points):
+    n = len(points)
+    # Time the distances of every run, not a hit in the matrix cache
+    distance_engine._memory_cache.clear()
+    start = time.perf_counter()
+    result = solve_tsp(n, distance_dict(euclidean_matrix(points)), [])
+    total = time.perf_counter() - start
+    # Everything before optimize() (distances, heuristic start, model) counts as build
+    return {
+        "build_time": total - result["solve_time"],
+        "solve_time": result["solve_time"],
+        "nodes": int(result["nodes"]),
+        "gap": result["gap"],
+        "objective": result["objective"],
+        "status": result["status"],
+    }
+
+
+def _median(records, key):
+    values = [record[key] for record in records if record[key] is not None]
+    return statistics.median(values) if values else None
+
+
+# Run one configuration, warm-up first, then `repeat` timed runs; called in a
+# fresh process
+def run_config(name, seed, backend, repeat=REPEAT):
+    set_defaults(OutputFlag=0, Threads=1, TimeLimit=TIME_LIMIT)
+    kind, generator, size = SUITE[name]
+    instance = generator(size, seed)
+    run = _run_linear if kind == "linear" else _run_tsp
+    arguments = (instance, backend) if kind == "linear" else (instance,)
+    run(*arguments)
+    records = [run(*arguments) for _ in range(repeat)]
+    summary = dict(records[0])
+    for key in TIMES:
+        summary[key] = _median(records, key)
+    summary["peak_rss_mb"] = _peak_rss_mb()
+    return summary
+
+
+def run_suite(names, seed=0, repeat=REPEAT, backend="gurobi"):
+    context = multiprocessing.get_context("spawn")
+    for name in names:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            yield name, pool.submit(run_config, name, seed, backend, repeat).result()
+
+
+# Regressions of `current` against `baseline`: (config, metric, old, new)
+def regressions(baseline, current, tolerance=0.2):
+    found = []
+    for name, record in current.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        for metric, noise in NOISE.items():
+            before, after = old.get(metric), record.get(metric)
+            if before is None or after is None:
+                continue
+            if after > before * (1 + tolerance) and after - before > noise:
+                found.append((name, metric, before, after))
+    return found
+
+
+def _metadata(seed, backend):
+    return {
+        "seed": seed,
+        "backend": backend,
+        "python": platform.python_version(),
+        "gurobi": ".".join(map(str, gp.gurobi.version())),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the LP, MILP, diet and TSP models.")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline JSON file")
+    parser.add_argument("--update", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--output", help="also write this run's results to this JSON file")
+    parser.add_argument("--only", default="", help="run the configurations whose name contains this text")
+    parser.add_argument(
+        "--repeat", type=int, default=REPEAT,
+        help=f"timed runs per configuration; times are medians (default: {REPEAT})",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", choices=list(BACKENDS), default="gurobi", help="solver for the linear models")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative growth (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    names = [name for name in SUITE if args.only in name]
+    results = {}
+    print(f"{'configuration':<20}{'build s':>10}{'solve s':>10}{'nodes':>8}{'gap':>8}{'RSS MB':>9}")
+    for name, record in run_suite(names, args.seed, args.repeat, args.backend):
+        results[name] = record
+        cells = [
+            "-" if record[key] is None else f"{record[key]:.{digits}f}"
+            for key, digits in (("build_time", 3), ("solve_time", 3), ("nodes", 0), ("gap", 4), ("peak_rss_mb", 1))
+        ]
+        print(f"{name:<20}" + "".join(f"{cell:>{width}}" for cell, width in zip(cells, (10, 10, 8, 8, 9))))
+
+    report = {"metadata": _metadata(args.seed, args.backend), "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+
+    if args.update or not os.path.exists(args.baseline):
+        with open(args.baseline, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as handle:
+        baseline = json.load(handle)
+    if baseline["metadata"].get("backend") != args.backend or baseline["metadata"].get("seed") != args.seed:
+        print("Warning: the baseline was recorded with another backend or seed")
+    found = regressions(baseline["results"], results, args.tolerance)
+    # Slower times are checked again in fresh processes, keeping the fastest
+    suspects = sorted({name for name, metric, _, _ in found if metric in TIMES})
+    for _ in range(CONFIRM if suspects else 0):
+        for name, record in run_suite(suspects, args.seed, args.repeat, args.backend):
+            for key in TIMES:
+                if record[key] is not None:
+                    results[name][key] = min(results[name][key], record[key])
+    if suspects:
+        found = regressions(baseline["results"], results, args.tolerance)
+    for name, metric, before, after in found:
+        print(f"REGRESSION {name} {metric}: {before:.4g} -> {after:.4g}")
+    if not found:
+        print(f"No regressions against {args.baseline}")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
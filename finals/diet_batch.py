@@ -0,0 +1,198 @@
+# Personalised diets for many users who share one food table.
+#
+#     python diet_batch.py foods.csv users.jsonl -o diets.jsonl --workers 4
+#
+# Every worker builds the diet LP once, with a min row and a max row for every
+# nutrient. A user only changes right-hand sides and food bounds, so each solve
+# is a dual simplex re-optimisation from the previous user's basis. One user
+# per JSON line:
+#
+#     {"id": "u1", "limits": {"Energy": [2000, 2500], "Protein": [50, null]},
+#      "min": {"Rice": 0.5}, "max": {"Sugar": 0.2}, "exclude": ["Peanuts"]}
+#
+# Nutrients without limits are free; food bounds default to the table's min/max.
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from gurobipy import GRB
+import numpy as np
+import scipy.sparse as sp
+
+from food_database import load_food_table
+from linear_model import STATUS_NAMES, build_linear_model, linear_problem
+from solver_env import set_defaults
+
+# The model of this worker process, built once by _init_worker
+_worker = {}
+
+
+# Diet LP with every nutrient as a pair of free rows: low rows first, then high rows
+def shared_diet_model(table):
+    nutrients = sp.csr_matrix(table["nutrients"])
+    count = nutrients.shape[0]
+    problem = linear_problem(
+        c=table["prices"],
+        A=sp.vstack((nutrients, nutrients), format="csr"),
+        senses=[">="] * count + ["<="] * count,
+        b=[-GRB.INFINITY] * count + [GRB.INFINITY] * count,
+        lb=table["min"],
+        ub=table["max"],
+        name="NutriOpt batch",
+    )
+    m, x = build_linear_model(problem)
+    # Dual simplex stays dual feasible when only right-hand sides and bounds
+    # change; without presolve it restarts straight from the previous basis
+    m.Params.Method = 1
+    m.Params.Presolve = 0
+    m.update()
+    rows = m.getConstrs()
+    return {
+        "model": m,
+        "x": x,
+        "low": rows[:count],
+        "high": rows[count:],
+        "nutrient_index": {name: k for k, name in enumerate(table["nutrient_names"])},
+        "food_index": {name: k for k, name in enumerate(table["foods"])},
+        "foods": table["foods"],
+        "min": table["min"],
+        "max": table["max"],
+    }
+
+
+# Right-hand sides and bounds of one user, as arrays over the whole table
+def user_arrays(shared, user):
+    count = len(shared["low"])
+    low, high = np.full(count, -GRB.INFINITY), np.full(count, GRB.INFINITY)
+    for name, (minimum, maximum) in user.get("limits", {}).items():
+        k = shared["nutrient_index"][name]
+        if minimum is not None:
+            low[k] = minimum
+        if maximum is not None:
+            high[k] = maximum
+    lb, ub = shared["min"].copy(), shared["max"].copy()
+    for name, value in user.get("min", {}).items():
+        lb[shared["food_index"][name]] = value
+    for name, value in user.get("max", {}).items():
+        ub[shared["food_index"][name]] = value
+    for name in user.get("exclude", ()):
+        lb[shared["food_index"][name]] = ub[shared["food_index"][name]] = 0.0
+    return low, high, lb, ub
+
+
+def solve_user(shared, user):
+    start = time.perf_counter()
+    line = {"id": user.get("id")}
+    try:
+        low, high, lb, ub = user_arrays(shared, user)
+    except (KeyError, TypeError, ValueError) as error:
+        line["error"] = f"{type(error).__name__}: {error}"
+        line["latency"] = time.perf_counter() - start
+        return line
+    m, x = shared["model"], shared["x"]
+    m.setAttr("RHS", shared["low"], low.tolist())
+    m.setAttr("RHS", shared["high"], high.tolist())
+    x.LB, x.UB = lb, ub
+    m.optimize()
+    line["status"] = STATUS_NAMES.get(m.Status, str(m.Status))
+    if m.Status == GRB.OPTIMAL:
+        values = x.X
+        used = np.flatnonzero(values > 1e-9)
+        line["cost"] = m.ObjVal
+        line["foods"] = {str(shared["foods"][k]): float(values[k]) for k in used}
+    line["iterations"] = int(m.IterCount)
+    line["latency"] = time.perf_counter() - start
+    return line
+
+
+def _init_worker(table, threads):
+    set_defaults(OutputFlag=0, Threads=threads)
+    _worker.update(shared_diet_model(table))
+
+
+# One chunk of users, solved in order so each one starts from the last basis
+def _solve_chunk(users):
+    return [solve_user(_worker, user) for user in users]
+
+
+def _chunks(users, size):
+    chunk = []
+    for user in users:
+        chunk.append(user)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# Solve every user on a pool of workers, each holding its own copy of the
+# model. Yields one result per user as the chunks finish.
+def solve_diets(table, users, workers=None, threads=1, chunk_size=64):
+    workers = workers or max(1, (os.cpu_count() or 1) // threads)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(table, threads),
+    ) as pool:
+        futures = [pool.submit(_solve_chunk, chunk) for chunk in _chunks(users, chunk_size)]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+# Per-user latency percentiles (in ms) and overall throughput
+def latency_report(latencies, wall_time):
+    latencies = np.asarray(latencies, dtype=float) * 1000
+    if not len(latencies):
+        return {"users": 0, "wall_time": wall_time, "throughput": 0.0}
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    return {
+        "users": len(latencies),
+        "wall_time": wall_time,
+        "throughput": len(latencies) / wall_time if wall_time > 0 else float("inf"),
+        "latency_ms": {
+            "mean": float(latencies.mean()),
+            "p50": float(p50),
+            "p90": float(p90),
+            "p99": float(p99),
+            "max": float(latencies.max()),
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Personalised diets for many users sharing one food table.")
+    parser.add_argument("foods", help="CSV or Parquet food table")
+    parser.add_argument("users", help="JSON lines file of users, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSON lines output file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: cores / threads)")
+    parser.add_argument("--threads", type=int, default=1, help="Gurobi threads per worker (default: 1)")
+    parser.add_argument("--chunk-size", type=int, default=64, help="users sent to a worker at a time")
+    args = parser.parse_args(argv)
+
+    with open(args.foods, "rb") as handle:
+        table = load_food_table(handle.read(), args.foods)
+    source = sys.stdin if args.users == "-" else open(args.users, encoding="utf-8")
+    with source:
+        users = [json.loads(line) for line in source if line.strip()]
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    latencies = []
+    start = time.perf_counter()
+    try:
+        for line in solve_diets(table, users, args.workers, args.threads, args.chunk_size):
+            output.write(json.dumps(line) + "\n")
+            latencies.append(line["latency"])
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(json.dumps(latency_report(latencies, time.perf_counter() - start)), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+# Above this many points the matrix is written to disk and memory-mapped
+# (4096 points is 64 MB of float32)
+MEMMAP_THRESHOLD = 4096
+CACHE_DIR = os.environ.get("TSP_DISTANCE_CACHE", os.path.join(tempfile.gettempdir(), "tsp_distance_cache"))
+MEMORY_CACHE_SIZE = 8
+
+# Matrices already computed in this process, shared by every rerun and session
+_memory_cache = OrderedDict()
+
+
+def coordinates_key(positions):
+    points = np.ascontiguousarray(positions, dtype=np.float64).reshape(-1, 2)
+    return hashlib.sha1(points.tobytes()).hexdigest()
+
+
+# Dense float32 Euclidean distance matrix of the positions, keyed by a hash of
+# the coordinates so the same points are never computed twice
+def euclidean_matrix(positions, memmap_threshold=MEMMAP_THRESHOLD, cache_dir=CACHE_DIR):
+    points = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+    key = coordinates_key(points)
+    if key in _memory_cache:
+        _memory_cache.move_to_end(key)
+        return _memory_cache[key]
+
+    n = len(points)
+    if n > memmap_threshold:
+        path = os.path.join(cache_dir, f"{key}.f32")
+        if not os.path.exists(path):
+            os.makedirs(cache_dir, exist_ok=True)
+            # Fill a temporary file first so other sessions never map a half-written
+            # matrix; sessions are threads of one process, so the name is unique per call
+            handle, partial = tempfile.mkstemp(prefix=f"{key}.", suffix=".tmp", dir=cache_dir)
+            os.close(handle)
+            try:
+                matrix = np.memmap(partial, dtype=np.float32, mode="w+", shape=(n, n))
+                _fill(matrix, points)
+                matrix.flush()
+                del matrix
+                os.replace(partial, path)
+            except BaseException:
+                os.remove(partial)
+                raise
+        matrix = np.memmap(path, dtype=np.float32, mode="r", shape=(n, n))
+    else:
+        matrix = np.empty((n, n), dtype=np.float32)
+        _fill(matrix, points)
+        matrix.flags.writeable = False
+
+    _memory_cache[key] = matrix
+    if len(_memory_cache) > MEMORY_CACHE_SIZE:
+        _memory_cache.popitem(last=False)
+    return matrix
+
+
+# {(i, j): distance} for every ordered pair i != j, as the MIP builders take it
+def distance_dict(matrix):
+    n = len(matrix)
+    rows, cols = np.nonzero(~np.eye(n, dtype=bool))
+    return dict(zip(zip(rows.tolist(), cols.tolist()), np.asarray(matrix[rows, cols], dtype=np.float64).tolist()))
+
+
+# Row blocks of about 4M entries keep the float64 temporaries small
+def _fill(matrix, points):
+    n = len(points)
+    block_rows = max(1, 2 ** 22 // max(n, 1))
+    for start in range(0, n, block_rows):
+        block = points[start:start + block_rows]
+        matrix[start:start + block_rows] = np.hypot(
+            block[:, 0, None] - points[None, :, 0], block[:, 1, None] - points[None, :, 1]
+        )
+
+
+# Size and min/mean/max of the off-diagonal distances, read block by block
+def matrix_summary(matrix):
+    n = len(matrix)
+    if n < 2:
+        return {"points": n, "pairs": 0, "min": 0.0, "mean": 0.0, "max": 0.0}
+    block_rows = max(1, 2 ** 22 // n)
+    low, high, total = np.inf, 0.0, 0.0
+    for start in range(0, n, block_rows):
+        block = np.array(matrix[start:start + block_rows], dtype=np.float64)
+        rows = np.arange(start, start + len(block))
+        total += block.sum()
+        high = max(high, float(block.max()))
+        block[rows - start, rows] = np.inf
+        low = min(low, float(block.min()))
+    return {"points": n, "pairs": n * (n - 1), "min": low, "mean": float(total) / (n * (n - 1)), "max": high}
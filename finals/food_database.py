@@ -0,0 +1,76 @@
+import io
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from linear_model import linear_problem
+
+# Column names recognised in an imported food table; every other numeric
+# column is a nutrient (amount per unit of food)
+NAME_COLUMNS = ("food", "name", "description")
+PRICE_COLUMN = "price"
+MIN_COLUMN = "min"
+MAX_COLUMN = "max"
+
+
+# Read a CSV or Parquet food table into NumPy arrays. The nutrients are kept
+# column by column: nutrients[k] holds nutrient k for every food, so a limit
+# row of the diet LP is one contiguous slice.
+def load_food_table(data, filename):
+    if filename.lower().endswith(".parquet"):
+        frame = pd.read_parquet(io.BytesIO(data))
+    else:
+        frame = pd.read_csv(io.BytesIO(data))
+    columns = {column.strip().lower(): column for column in frame.columns}
+    name_column = next((columns[key] for key in NAME_COLUMNS if key in columns), None)
+    if name_column is None or PRICE_COLUMN not in columns:
+        raise ValueError(f"The table needs a food name column ({', '.join(NAME_COLUMNS)}) and a price column")
+
+    special = {name_column, columns[PRICE_COLUMN], columns.get(MIN_COLUMN), columns.get(MAX_COLUMN)}
+    nutrient_columns = [
+        column for column in frame.columns
+        if column not in special and pd.api.types.is_numeric_dtype(frame[column])
+    ]
+    n = len(frame)
+
+    def bound(key, default):
+        if key not in columns:
+            return np.full(n, default)
+        return frame[columns[key]].fillna(default).to_numpy(dtype=np.float64)
+
+    return {
+        "foods": frame[name_column].astype(str).to_numpy(),
+        "prices": frame[columns[PRICE_COLUMN]].to_numpy(dtype=np.float64),
+        "min": bound(MIN_COLUMN, 0.0),
+        "max": bound(MAX_COLUMN, np.inf),
+        "nutrient_names": [str(column) for column in nutrient_columns],
+        # Missing values mean the food does not contain the nutrient
+        "nutrients": np.ascontiguousarray(frame[nutrient_columns].fillna(0.0).to_numpy(dtype=np.float64).T),
+    }
+
+
+# Diet LP straight from the table: `foods` are the row indices to include and
+# `limits` maps a nutrient index to its (low, high) total, None for no limit
+def table_diet_problem(table, foods, limits, name="NutriOpt"):
+    foods = np.asarray(foods, dtype=np.int64)
+    rows, senses, rhs = [], [], []
+    for nutrient, (low, high) in limits.items():
+        if low is not None:
+            rows.append(nutrient)
+            senses.append(">=")
+            rhs.append(low)
+        if high is not None:
+            rows.append(nutrient)
+            senses.append("<=")
+            rhs.append(high)
+    A = sp.csr_matrix(table["nutrients"][np.asarray(rows, dtype=np.int64)][:, foods])
+    return linear_problem(
+        c=table["prices"][foods],
+        A=A,
+        senses=senses,
+        b=rhs,
+        lb=table["min"][foods],
+        ub=table["max"][foods],
+        name=name,
+    )
@@ -0,0 +1,157 @@
+import math
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Mathematical formulation of a linear_problem, read from its matrix: a
+# summary of the sizes and coefficient ranges, then the constraints rendered
+# one page (or one search) at a time, only when asked for. LaTeX is the slow
+# part of a page, so large models never render more than PAGE_SIZE rows.
+
+PAGE_SIZE = 20
+# Longer expressions are cut after this many terms
+MAX_TERMS = 12
+
+_SENSE_LATEX = {"<": "\\le", ">": "\\ge", "=": "="}
+_LATEX_ESCAPES = {c: "\\" + c for c in "&%$#_{}"} | {"~": "\\textasciitilde{}", "^": "\\textasciicircum{}",
+                                                     "\\": "\\textbackslash{}"}
+
+
+def _text(name):
+    return "\\text{" + "".join(_LATEX_ESCAPES.get(c, c) for c in str(name)) + "}"
+
+
+# LaTeX of sum_k values[k] * variables[indices[k]], without the zero terms
+def _expression(indices, values, variables):
+    keep = np.flatnonzero(values)
+    terms = []
+    for k in keep[:MAX_TERMS]:
+        value = float(values[k])
+        number = f"{abs(value):g}" if abs(value) != 1 else ""
+        terms.append(("- " if value < 0 else "+ ") + number + variables[indices[k]])
+    if not terms:
+        return "0"
+    text = " ".join(terms)
+    if len(keep) > MAX_TERMS:
+        text += f" + \\cdots \\; ({len(keep) - MAX_TERMS} \\text{{ more terms}})"
+    return text[2:] if text.startswith("+") else text
+
+
+# Smallest and largest nonzero magnitudes, or None when there are none
+def _range(values):
+    values = np.abs(np.asarray(values, dtype=np.float64))
+    values = values[(values > 0) & np.isfinite(values)]
+    return (float(values.min()), float(values.max())) if len(values) else None
+
+
+# Sizes, nonzeros and coefficient ranges of the problem, as Gurobi's
+# printStats shows them
+def formulation_summary(problem):
+    A = problem["A"]
+    rows, cols = A.shape
+    return {
+        "variables": cols,
+        "constraints": rows,
+        "nonzeros": int(A.nnz),
+        "density": A.nnz / (rows * cols) if rows and cols else 0.0,
+        "types": {vtype: int(np.sum(problem["vtype"] == vtype)) for vtype in ("C", "I", "B")},
+        "ranges": {
+            "Matrix": _range(A.data),
+            "Objective": _range(problem["c"]),
+            "Bounds": _range(np.concatenate((problem["lb"], problem["ub"]))),
+            "RHS": _range(problem["b"]),
+        },
+    }
+
+
+def _summary(summary):
+    columns = st.columns(3)
+    types = ", ".join(
+        f"{count} {label}" for label, count in zip(("continuous", "integer", "binary"), summary["types"].values())
+        if count
+    )
+    columns[0].metric("Variables", summary["variables"], help=types or None)
+    columns[1].metric("Constraints", summary["constraints"])
+    columns[2].metric("Nonzeros", summary["nonzeros"], help=f"{summary['density']:.1%} of the matrix")
+    st.dataframe(
+        pd.DataFrame(
+            [(name, *(value if value else (None, None))) for name, value in summary["ranges"].items()],
+            columns=["Coefficients", "Smallest", "Largest"],
+        ),
+        hide_index=True,
+    )
+
+
+# LaTeX of the bounds and integrality: one line per distinct bound when they
+# are all alike, a generic line otherwise
+def _domain(problem, variables):
+    lb, ub = problem["lb"], problem["ub"]
+    lines = []
+    if len(lb) and np.all(lb == lb[0]) and np.all(ub == ub[0]):
+        low, high = lb[0], ub[0]
+        if np.isfinite(low) and np.isfinite(high):
+            lines.append(f"{low:g} \\le x_j \\le {high:g} \\quad \\forall j")
+        elif np.isfinite(low):
+            lines.append(f"x_j \\ge {low:g} \\quad \\forall j")
+        elif np.isfinite(high):
+            lines.append(f"x_j \\le {high:g} \\quad \\forall j")
+    elif len(lb):
+        lines.append("l_j \\le x_j \\le u_j \\quad \\forall j")
+    vtype = problem["vtype"]
+    if len(vtype) and np.all(vtype == "B"):
+        lines.append("x_j \\in \\{0, 1\\} \\quad \\forall j")
+    elif len(vtype) and np.all(vtype != "C"):
+        lines.append("x_j \\in \\mathbb{Z} \\quad \\forall j")
+    elif np.any(vtype != "C"):
+        integer = np.flatnonzero(vtype != "C")
+        names = ", ".join(variables[j] for j in integer[:MAX_TERMS])
+        if len(integer) > MAX_TERMS:
+            names += ", \\ldots"
+        lines.append(f"{names} \\in \\mathbb{{Z}}")
+    return lines
+
+
+# Formulation of `problem` under the widget keys `key`_*. `row_names` name
+# the constraints (and can be searched), `column_names` the variables;
+# `variables` gives LaTeX symbols for the variables instead (x_j by default).
+def formulation_panel(problem, key, row_names=None, column_names=None, variables=None, page_size=PAGE_SIZE):
+    A = problem["A"]
+    rows, cols = A.shape
+    if variables is None:
+        variables = [_text(name) for name in column_names] if column_names is not None else [
+            f"x_{{{j + 1}}}" for j in range(cols)
+        ]
+    row_names = [str(name) for name in row_names] if row_names is not None else [
+        f"constraint {i + 1}" for i in range(rows)
+    ]
+
+    _summary(formulation_summary(problem))
+    objective = np.asarray(problem["c"])
+    st.latex(f"\\text{{{problem['sense']}imize }} {_expression(np.arange(cols), objective, variables)}")
+
+    shown = st.toggle("Show the constraints", value=rows <= page_size, key=f"{key}_show", disabled=not rows)
+    if shown:
+        search = st.text_input("Search constraints by name or number:", key=f"{key}_search").strip().lower()
+        matches = [
+            i for i, name in enumerate(row_names) if not search or search in name.lower() or search == str(i + 1)
+        ]
+        pages = max(1, math.ceil(len(matches) / page_size))
+        page = 1
+        if pages > 1:
+            # A narrower search may leave fewer pages than the one shown
+            if st.session_state.get(f"{key}_page", 1) > pages:
+                st.session_state[f"{key}_page"] = pages
+            page = st.number_input("Page:", step=1, min_value=1, max_value=pages, key=f"{key}_page")
+            st.caption(f"{len(matches)} constraints, {pages} pages")
+        if not matches:
+            st.write("No constraint matches the search.")
+        for i in matches[(page - 1) * page_size:page * page_size]:
+            start, end = A.indptr[i], A.indptr[i + 1]
+            expression = _expression(A.indices[start:end], A.data[start:end], variables)
+            st.latex(
+                f"{_text(row_names[i])}: \\quad {expression} {_SENSE_LATEX[problem['senses'][i]]} "
+                f"{problem['b'][i]:g}"
+            )
+    for line in _domain(problem, variables):
+        st.latex(line)
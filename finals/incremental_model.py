@@ -0,0 +1,137 @@
+import time
+
+import gurobipy as gp
+from gurobipy import GRB
+import numpy as np
+import streamlit as st
+
+from linear_model import STATUS_NAMES, build_linear_model
+from telemetry import optimize_with_stats
+
+# Above this share of changed coefficients a fresh build is cheaper than the diff
+REBUILD_SHARE = 0.5
+
+
+def _build_state(problem):
+    m, x = build_linear_model(problem)
+    continuous = bool(np.all(problem["vtype"] == "C"))
+    # Without presolve an LP restarts straight from the previous basis
+    m.Params.Presolve = 0 if continuous else -1
+    m.update()
+    return {"model": m, "x": x.tolist(), "rows": m.getConstrs(), "problem": problem}
+
+
+# Changed entries of one attribute, as (objects, new values) for setAttr
+def _changed(objects, old, new):
+    index = np.flatnonzero(np.asarray(old[:len(new)]) != np.asarray(new[:len(old)]))
+    return [objects[k] for k in index], np.asarray(new)[index].tolist()
+
+
+# Bring the model in `state` up to date with `problem` through the smallest set
+# of edits: chgCoeff for coefficients, RHS/Sense/Obj/bound attributes, and
+# addVar/addLConstr/remove for variables and rows added or dropped at the end.
+# Returns the number of edits (None when the model was rebuilt).
+def sync_model(state, problem):
+    old = state["problem"]
+    m, x, rows = state["model"], state["x"], state["rows"]
+    n_old, n_new = len(old["c"]), len(problem["c"])
+    r_old, r_new = len(old["b"]), len(problem["b"])
+    n, r = min(n_old, n_new), min(r_old, r_new)
+
+    coefficient_diff = (problem["A"][:r, :n] - old["A"][:r, :n]).tocoo()
+    coefficient_diff.eliminate_zeros()
+    if coefficient_diff.nnz > REBUILD_SHARE * max(problem["A"].nnz, 1):
+        m.dispose()
+        state.update(_build_state(problem))
+        return None
+    edits = 0
+
+    # Dropped rows and variables
+    if r_new < r_old:
+        m.remove(rows[r_new:])
+        del rows[r_new:]
+        edits += r_old - r_new
+    if n_new < n_old:
+        m.remove(x[n_new:])
+        del x[n_new:]
+        edits += n_old - n_new
+
+    new_A = problem["A"]
+    for i, j in zip(coefficient_diff.row.tolist(), coefficient_diff.col.tolist()):
+        m.chgCoeff(rows[i], x[j], new_A[i, j])
+    edits += coefficient_diff.nnz
+
+    for attribute, objects, old_values, new_values in (
+        ("Obj", x, old["c"], problem["c"]),
+        ("LB", x, old["lb"], problem["lb"]),
+        ("UB", x, old["ub"], problem["ub"]),
+        ("VType", x, old["vtype"], problem["vtype"]),
+        ("RHS", rows, old["b"], problem["b"]),
+        ("Sense", rows, old["senses"], problem["senses"]),
+    ):
+        changed, values = _changed(objects, old_values, new_values)
+        if changed:
+            m.setAttr(attribute, changed, values)
+            edits += len(changed)
+    if problem["sense"] != old["sense"]:
+        m.ModelSense = GRB.MAXIMIZE if problem["sense"] == "max" else GRB.MINIMIZE
+        edits += 1
+
+    # New variables, with their coefficients in the rows that already exist
+    columns = new_A[:r].tocsc()
+    for j in range(n, n_new):
+        start, end = columns.indptr[j], columns.indptr[j + 1]
+        column = gp.Column(columns.data[start:end].tolist(), [rows[i] for i in columns.indices[start:end]])
+        x.append(m.addVar(lb=problem["lb"][j], ub=problem["ub"][j], obj=problem["c"][j],
+                          vtype=problem["vtype"][j], column=column, name=f"x[{j}]"))
+        edits += 1
+
+    # New rows over every variable
+    for i in range(r, r_new):
+        start, end = new_A.indptr[i], new_A.indptr[i + 1]
+        expression = gp.LinExpr(new_A.data[start:end].tolist(), [x[j] for j in new_A.indices[start:end]])
+        rows.append(m.addLConstr(expression, problem["senses"][i], problem["b"][i], name=f"c[{i}]"))
+        edits += 1
+
+    state["problem"] = problem
+    continuous = bool(np.all(problem["vtype"] == "C"))
+    m.Params.Presolve = 0 if continuous else -1
+    m.update()
+    return edits
+
+
+# Solve `problem` on the model kept under `state_key` in the session, editing
+# it in place rather than rebuilding it. LPs warm-start from the last basis,
+# MIPs from the last solution. `callback` is handed to optimize().
+def solve_incremental(problem, state_key="persistent_model", callback=None):
+    start = time.perf_counter()
+    state = st.session_state.get(state_key)
+    if state is None:
+        state = st.session_state[state_key] = _build_state(problem)
+        edits = None
+    else:
+        edits = sync_model(state, problem)
+    update_time = time.perf_counter() - start
+
+    m, x = state["model"], state["x"]
+    if m.IsMIP and state.get("values") is not None:
+        for var, value in zip(x, state["values"]):
+            var.Start = value
+    timings, stats = optimize_with_stats(m, callback)
+    start = time.perf_counter()
+    values = m.getAttr("X", x) if m.SolCount else None
+    state["values"] = values
+    result = {
+        "status": m.Status,
+        "status_name": STATUS_NAMES.get(m.Status, str(m.Status)),
+        "objective": m.ObjVal if m.SolCount else None,
+        "values": values,
+        "runtime": m.Runtime,
+        "iterations": m.IterCount,
+        "edits": edits,
+        "update_time": update_time,
+        "stats": stats,
+    }
+    # Building here means editing the persistent model
+    result["timings"] = {"build": update_time, **timings, "extract": time.perf_counter() - start}
+    return result
@@ -0,0 +1,126 @@
+import hashlib
+import time
+
+from gurobipy import GRB
+import numpy as np
+import scipy.sparse as sp
+
+from solver_env import new_model
+from telemetry import optimize_with_stats
+
+SENSES = {"<=": "<", "≤": "<", "<": "<", ">=": ">", "≥": ">", ">": ">", "=": "=", "==": "="}
+
+STATUS_NAMES = {
+    GRB.OPTIMAL: "optimal",
+    GRB.INFEASIBLE: "infeasible",
+    GRB.UNBOUNDED: "unbounded",
+    GRB.INF_OR_UNBD: "infeasible or unbounded",
+    GRB.TIME_LIMIT: "time limit",
+    GRB.INTERRUPTED: "interrupted",
+}
+
+
+# A linear problem is a plain dict of arrays, so it can be fingerprinted,
+# cached and handed to Gurobi's matrix API in one call:
+#   sense: "min" or "max", c: objective coefficients,
+#   A: constraint matrix (scipy CSR), senses: "<", ">" or "=" per row, b: right-hand sides,
+#   lb / ub: variable bounds (inf for none), vtype: "C", "I" or "B" per variable
+def linear_problem(c, A, senses, b, sense="min", lb=None, ub=None, vtype="C", name="model"):
+    c = np.asarray(c, dtype=np.float64).reshape(-1)
+    n = len(c)
+    b = np.asarray(b, dtype=np.float64).reshape(-1)
+    A = sp.csr_matrix(A, dtype=np.float64) if len(b) else sp.csr_matrix((0, n))
+    A.sum_duplicates()
+    A.sort_indices()
+    return {
+        "name": name,
+        "sense": sense,
+        "c": c,
+        "A": A,
+        "senses": np.array([SENSES[s] for s in senses], dtype="<U1"),
+        "b": b,
+        "lb": np.zeros(n) if lb is None else np.asarray(lb, dtype=np.float64),
+        "ub": np.full(n, np.inf) if ub is None else np.asarray(ub, dtype=np.float64),
+        "vtype": np.full(n, vtype, dtype="<U1") if isinstance(vtype, str) else np.asarray(vtype, dtype="<U1"),
+    }
+
+
+# Diet model: foods are (name, price, min, max), constraints are
+# (name, sense, limit, contributions per food). Quantities are bounded by min/max.
+def diet_problem(foods, constraints, name="NutriOpt"):
+    return linear_problem(
+        c=[food[1] for food in foods],
+        A=[contributions for _, _, _, contributions in constraints],
+        senses=[ctype for _, ctype, _, _ in constraints],
+        b=[limit for _, _, limit, _ in constraints],
+        lb=[food[2] for food in foods],
+        ub=[food[3] for food in foods],
+        name=name,
+    )
+
+
+# Resource allocation: minimise the cost while every constraint row reaches its
+# limit; no variable is left null
+def allocation_problem(costs, coefficients, limits, min_value=1e-2, name="Resource Optimization"):
+    return linear_problem(
+        c=costs,
+        A=coefficients,
+        senses=[">="] * len(limits),
+        b=limits,
+        lb=[min_value] * len(costs),
+        name=name,
+    )
+
+
+# Stable hash of everything that changes the solution (the name is left out)
+def fingerprint(problem):
+    digest = hashlib.sha256(problem["sense"].encode())
+    A = problem["A"]
+    arrays = {
+        "c": problem["c"], "b": problem["b"], "lb": problem["lb"], "ub": problem["ub"],
+        "senses": problem["senses"], "vtype": problem["vtype"],
+        "A.shape": np.array(A.shape), "A.indptr": A.indptr, "A.indices": A.indices, "A.data": A.data,
+    }
+    for key, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        digest.update(f"{key}:{array.dtype.str}:{array.shape}".encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def build_linear_model(problem):
+    m = new_model(problem["name"])
+    x = m.addMVar(
+        len(problem["c"]),
+        lb=problem["lb"],
+        ub=problem["ub"],
+        obj=problem["c"],
+        vtype=problem["vtype"],
+        name="x",
+    )
+    m.ModelSense = GRB.MAXIMIZE if problem["sense"] == "max" else GRB.MINIMIZE
+    if problem["A"].shape[0]:
+        m.addMConstr(problem["A"], x, problem["senses"], problem["b"], name="c")
+    return m, x
+
+
+def solve_linear_problem(problem):
+    start = time.perf_counter()
+    m, x = build_linear_model(problem)
+    m.update()
+    build_time = time.perf_counter() - start
+    timings, stats = optimize_with_stats(m)
+    start = time.perf_counter()
+    result = {
+        "status": m.Status,
+        "status_name": STATUS_NAMES.get(m.Status, str(m.Status)),
+        "objective": m.ObjVal if m.SolCount else None,
+        "values": x.X.tolist() if m.SolCount else None,
+        # Duals only exist for a solved LP
+        "duals": m.getAttr("Pi", m.getConstrs()) if m.Status == GRB.OPTIMAL and not m.IsMIP else None,
+        "runtime": m.Runtime,
+        "stats": stats,
+    }
+    result["timings"] = {"build": build_time, **timings, "extract": time.perf_counter() - start}
+    m.dispose()
+    return result
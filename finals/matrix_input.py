@@ -0,0 +1,114 @@
+import io
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Model inputs as grids: a whole table is one st.data_editor (or a pasted
+# CSV) instead of one widget per cell, so a rerun costs about the same
+# whatever the size of the model.
+
+
+# Labels made unique (data_editor needs unique column names)
+def _unique(labels):
+    labels = [str(label) for label in labels]
+    if len(set(labels)) == len(labels):
+        return labels
+    return [f"{label} ({k + 1})" for k, label in enumerate(labels)]
+
+
+# `defaults` with the cells of `frame` copied in where both have them: rows
+# by position, columns by label, or by position for a renamed column
+def _resized(frame, defaults):
+    resized = defaults.copy()
+    rows = min(len(frame), len(defaults))
+    for j, column in enumerate(defaults.columns):
+        if column in frame.columns:
+            source = frame[column]
+        elif j < frame.shape[1] and frame.columns[j] not in defaults.columns:
+            source = frame.iloc[:, j]
+        else:
+            continue
+        if pd.api.types.is_numeric_dtype(source) == pd.api.types.is_numeric_dtype(defaults[column]):
+            resized.iloc[:rows, j] = source.iloc[:rows].to_numpy()
+    return resized
+
+
+# CSV text read into the shape of `defaults`; a header row and a first
+# column of row names are dropped when present, and the columns in
+# `options` only take the values listed there. Raises ValueError.
+def _parse_csv(text, defaults, options):
+    frame = pd.read_csv(io.StringIO(text), header=None, dtype=str, skipinitialspace=True)
+    rows, columns = defaults.shape
+    if len(frame) == rows + 1:
+        frame = frame.iloc[1:]
+    if frame.shape[1] == columns + 1:
+        frame = frame.iloc[:, 1:]
+    if frame.shape != (rows, columns):
+        raise ValueError(f"expected {rows} rows of {columns} values, got {frame.shape[0]} of {frame.shape[1]}")
+    parsed = defaults.copy()
+    for j, column in enumerate(defaults.columns):
+        values = frame.iloc[:, j].str.strip()
+        if pd.api.types.is_numeric_dtype(defaults[column]):
+            values = pd.to_numeric(values, errors="raise")
+        elif column in options and not values.isin(options[column]).all():
+            raise ValueError(f"{column} must be one of {', '.join(options[column])}")
+        parsed[column] = values.to_numpy()
+    return parsed
+
+
+def _apply_paste(key, defaults, options):
+    state = st.session_state[key]
+    try:
+        state["frame"] = state["base"] = _parse_csv(st.session_state[f"{key}_csv"], defaults, options)
+        state["version"] += 1
+        state["error"] = None
+    except ValueError as error:
+        state["error"] = f"Could not read the pasted values: {error}"
+
+
+# One editable grid shaped like `defaults` (a DataFrame of default values).
+# Cells already edited are kept by position when the shape or the labels
+# change. `options` lists the values allowed in a column (picked from a
+# drop-down). With `paste`, the grid can also be filled from pasted CSV
+# text. Returns the edited DataFrame.
+def grid_editor(key, defaults, paste=True, options=None, **editor_args):
+    options = options or {}
+    state = st.session_state.get(key)
+    if state is None:
+        state = st.session_state[key] = {"frame": defaults, "base": defaults, "version": 0, "error": None}
+    frame = state["frame"]
+    if (frame.shape != defaults.shape or list(frame.index) != list(defaults.index)
+            or list(frame.columns) != list(defaults.columns)):
+        # The editor starts over from the current values under a new key
+        state["frame"] = state["base"] = _resized(frame, defaults)
+        state["version"] += 1
+
+    column_config = {
+        column: st.column_config.SelectboxColumn(options=values, required=True) for column, values in options.items()
+    }
+    state["frame"] = st.data_editor(state["base"], key=f"{key}_grid_{state['version']}", num_rows="fixed",
+                                    column_config=column_config, **editor_args)
+    if paste:
+        with st.expander("Paste values (CSV)"):
+            st.text_area(
+                f"{len(defaults)} rows of {defaults.shape[1]} comma-separated values, e.g. copied from a spreadsheet:",
+                key=f"{key}_csv",
+            )
+            st.button("Use pasted values", key=f"{key}_paste", on_click=_apply_paste, args=(key, defaults, options))
+        if state["error"]:
+            st.error(state["error"])
+    return state["frame"]
+
+
+# Numeric matrix with one row per `row_names` and one column per
+# `column_names`, as a float NumPy array (empty cells read as `default`)
+def matrix_editor(key, row_names, column_names, default=0.0, **editor_args):
+    defaults = pd.DataFrame(
+        np.full((len(row_names), len(column_names)), float(default)),
+        index=_unique(row_names),
+        columns=_unique(column_names),
+    )
+    frame = grid_editor(key, defaults, **editor_args)
+    return np.nan_to_num(frame.to_numpy(dtype=np.float64), nan=float(default))
+
@@ -1,90 +1,197 @@
 import streamlit as st
 import gurobipy as gp
-from gurobipy import Model, GRB
+from gurobipy import GRB
+import numpy as np
+import pandas as pd
 
-# Gurobi Model
-m = gp.Model()
+from food_database import load_food_table, table_diet_problem
+from formulation_view import formulation_panel
+from linear_model import diet_problem
+from matrix_input import grid_editor, matrix_editor
+from solve_cache import cache_badge, cached_result, metrics_panel, select_backend, solve_cached, store_summary
+from sweep import sweep_panel
+from telemetry import add_result, lap, log_metrics, start_metrics
+
+
+# Parsed once per file and shared by every session
+@st.cache_data(max_entries=4, show_spinner="Loading the food table...")
+def load_table(data, filename):
+    return load_food_table(data, filename)
+
+
+# Timings of this run, by phase
+metrics = start_metrics("nutriopt")
 
 # Title
 st.title("NutriOpt: Adaptive Diet Optimization for Personalized Goals")
 
+backend = select_backend()
+food_source = st.radio("Food data:", ["Enter foods", "Import a food table"], key="food_source")
+
+# Import mode: a whole food database (CSV/Parquet), the user only picks foods and nutrient limits
+if food_source == "Import a food table":
+    uploaded = st.file_uploader(
+        "CSV or Parquet file, one row per food: name, price, optional min/max and one column per nutrient",
+        type=["csv", "parquet"],
+        key="food_table",
+    )
+    if uploaded is None:
+        st.stop()
+    try:
+        table = load_table(uploaded.getvalue(), uploaded.name)
+    except ValueError as error:
+        st.error(str(error))
+        st.stop()
+    food_names, nutrient_names = table["foods"], table["nutrient_names"]
+    st.write(f"{len(food_names)} foods, {len(nutrient_names)} nutrients")
+
+    if st.checkbox("Include every food", value=True, key="all_foods"):
+        selected = np.arange(len(food_names))
+    else:
+        selected = np.array(st.multiselect(
+            "Foods to include:", range(len(food_names)), format_func=lambda k: food_names[k], key="selected_foods"
+        ), dtype=np.int64)
+
+    st.header("Nutrient Limits")
+    st.caption("Leave a cell empty for no limit.")
+    limit_table = st.data_editor(
+        pd.DataFrame({"Nutrient": nutrient_names, "Min": np.nan, "Max": np.nan}),
+        column_config={"Min": st.column_config.NumberColumn(), "Max": st.column_config.NumberColumn()},
+        disabled=["Nutrient"],
+        hide_index=True,
+        key="nutrient_limits",
+    )
+    limits = {
+        k: (None if pd.isna(low) else float(low), None if pd.isna(high) else float(high))
+        for k, (low, high) in enumerate(zip(limit_table["Min"], limit_table["Max"]))
+        if not (pd.isna(low) and pd.isna(high))
+    }
+    problem = table_diet_problem(table, selected, limits)
+    metrics["page"] = "nutriopt_table"
+    lap(metrics, "parse")
+    # Rows in the order table_diet_problem adds them
+    row_names = [
+        f"{nutrient_names[k]} {sign}"
+        for k, (low, high) in limits.items()
+        for sign, limit in (("≥", low), ("≤", high)) if limit is not None
+    ]
+    st.write(f"Minimize the total cost of {len(selected)} foods under {len(problem['b'])} nutrient limits")
+    with st.expander("Mathematical Formulation"):
+        formulation_panel(problem, "table_formulation", row_names=row_names, column_names=food_names[selected])
+
+    pressed = st.button("Solve", key="solve_table")
+    result = cached_result(problem, cache_name="nutriopt_cache", backend=backend)
+    solved = pressed and result is None
+    lap(metrics, "render")
+    if solved:
+        try:
+            result = solve_cached(problem, cache_name="nutriopt_cache", backend=backend)
+        except gp.GurobiError as error:
+            # e.g. thousands of foods on a size-limited license
+            st.error(f"Gurobi error: {error}")
+            st.stop()
+    add_result(metrics, result, solved)
+
+    if result is not None:
+        if result["status"] == GRB.OPTIMAL:
+            quantities = np.asarray(result["values"])
+            used = quantities > 1e-9
+            st.subheader("Optimal Solution")
+            st.dataframe(pd.DataFrame({"Food": food_names[selected][used], "Quantity": quantities[used]}), hide_index=True)
+            totals = table["nutrients"][:, selected] @ quantities
+            st.dataframe(pd.DataFrame({"Nutrient": nutrient_names, "Total": totals}), hide_index=True)
+            st.write(f"Total Cost: {result['objective']:.2f}")
+        else:
+            st.write("No optimal solution found.")
+
+    cache_badge(result)
+    lap(metrics, "render")
+    if solved:
+        log_metrics(metrics)
+    metrics_panel(metrics)
+    store_summary()
+    sweep_panel(problem, row_names, list(food_names[selected]), key="table_sweep")
+    st.stop()
+
 # Number of Foods
-num_foods = st.number_input("Enter the number of foods:", value=3, step=1)
+num_foods = st.number_input("Enter the number of foods:", value=3, step=1, min_value=1)
 
 # Food Input Table
 st.header("Food Details")
-foods = []
-for i in range(num_foods):
-    cols = st.columns(4)
-    with cols[0]:
-        food_name = st.text_input(f"Food {i+1} Name:", value=f"Food{i+1}", key=f"food_name_{i}")
-    with cols[1]:
-        price = st.number_input(f"Price for {food_name}:", value=1.0, key=f"food_price_{i}")
-        
-    with cols[2]:
-        min_qty = st.number_input(f"Minimum Quantity for {food_name}:", value=0.0, key=f"min_qty_{i}")
-    with cols[3]:
-        max_qty = st.number_input(f"Maximum Quantity for {food_name}:", value=10.0, key=f"max_qty_{i}")
-    
-    foods.append((food_name, price, min_qty, max_qty))
-
-    #foods.append((food_name, price))
-
-# Add Gurobi Variables for Foods
-variables = [m.addVar(vtype='C', name=food[0]) for food in foods]
+food_table = grid_editor(
+    "diet_foods",
+    pd.DataFrame({
+        "Food": [f"Food{i+1}" for i in range(num_foods)],
+        "Price": 1.0,
+        "Minimum Quantity": 0.0,
+        "Maximum Quantity": 10.0,
+    }),
+    hide_index=True,
+)
+foods = list(zip(
+    food_table["Food"].astype(str),
+    food_table["Price"].fillna(0.0).astype(float),
+    food_table["Minimum Quantity"].fillna(0.0).astype(float),
+    food_table["Maximum Quantity"].fillna(np.inf).astype(float),
+))
 
 # Number of Constraints
-num_constraints = st.number_input("Enter the number of constraints:", value=2, step=1)
+num_constraints = st.number_input("Enter the number of constraints:", value=2, step=1, min_value=0)
 
 # Constraint Input Table
 st.header("Constraint Details")
-constraints = []
-for i in range(num_constraints):
-    cols = st.columns(3)
-    with cols[0]:
-        constraint_name = st.text_input(f"Constraint {i+1} Name:", value=f"Constraint{i+1}", key=f"constraint_name_{i}")
-    with cols[1]:
-        constraint_type = st.selectbox(f"Type for {constraint_name}:", ["≤", "≥", "="], key=f"constraint_type_{i}")
-    with cols[2]:
-        limit = st.number_input(f"Limit for {constraint_name}:", value=100.0, key=f"constraint_limit_{i}")
-    constraint_contributions = []
-    for j, food in enumerate(foods):
-        contrib = st.number_input(f"{food[0]} contribution to {constraint_name}:", value=1.0, key=f"contrib_{i}_{j}")
-        constraint_contributions.append(contrib)
-    constraints.append((constraint_name, constraint_type, limit, constraint_contributions))
-
-# Set Objective Function
-m.setObjective(sum(variables[j] * foods[j][1] for j in range(num_foods)), GRB.MINIMIZE)
-
-# Add Constraints to Gurobi
-for name, ctype, limit, contributions in constraints:
-    expr = sum(variables[j] * contributions[j] for j in range(num_foods))
-    if ctype == "≤":
-        m.addConstr(expr <= limit, name=name)
-    elif ctype == "≥":
-        m.addConstr(expr >= limit, name=name)
-    elif ctype == "=":
-        m.addConstr(expr == limit, name=name)
-
-# Add Bounds for Foods
-for j, food in enumerate(foods):
-    m.addConstr(variables[j] >= food[2], name=f"{food[0]}_min")
-    m.addConstr(variables[j] <= food[3], name=f"{food[0]}_max")
+constraint_table = grid_editor(
+    "diet_constraints",
+    pd.DataFrame({
+        "Constraint": [f"Constraint{i+1}" for i in range(num_constraints)],
+        "Type": "≤",
+        "Limit": 100.0,
+    }),
+    hide_index=True,
+    options={"Type": ["≤", "≥", "="]},
+)
+# Contribution of each food (columns) to each constraint (rows)
+st.write("**Contributions**")
+contributions = matrix_editor(
+    "diet_contributions", constraint_table["Constraint"].astype(str), [food[0] for food in foods], default=1.0
+)
+constraints = list(zip(
+    constraint_table["Constraint"].astype(str),
+    constraint_table["Type"].fillna("≤"),
+    constraint_table["Limit"].fillna(0.0).astype(float),
+    contributions,
+))
+
+problem = diet_problem(foods, constraints)
+lap(metrics, "parse")
 
 # Display Model
 st.subheader("Mathematical Formulation")
 st.write("Objective: Minimize the total cost")
-for name, ctype, limit, contributions in constraints:
-    st.write(f"{name}: {' + '.join([f'{contrib} * {foods[j][0]}' for j, contrib in enumerate(contributions)])} {ctype} {limit}")
+formulation_panel(problem, "diet_formulation", row_names=[c[0] for c in constraints], column_names=[food[0] for food in foods])
 
 # Solve the Model
-if st.button("Solve"):
-    m.optimize()
+pressed = st.button("Solve")
+result = cached_result(problem, cache_name="nutriopt_cache", backend=backend)
+solved = pressed and result is None
+lap(metrics, "render")
+if solved:
+    result = solve_cached(problem, cache_name="nutriopt_cache", backend=backend)
+add_result(metrics, result, solved)
 
-    if m.status == GRB.OPTIMAL:
+if result is not None:
+    if result["status"] == GRB.OPTIMAL:
         st.subheader("Optimal Solution")
-        for v in m.getVars():
-            st.write(f"{v.varName}: {v.x:.2f}")
-        st.write(f"Total Cost: {m.objVal:.2f}")
+        for food, value in zip(foods, result["values"]):
+            st.write(f"{food[0]}: {value:.2f}")
+        st.write(f"Total Cost: {result['objective']:.2f}")
     else:
         st.write("No optimal solution found.")
+
+cache_badge(result)
+lap(metrics, "render")
+if solved:
+    log_metrics(metrics)
+metrics_panel(metrics)
+store_summary()
+sweep_panel(problem, [c[0] for c in constraints], [food[0] for food in foods], key="diet_sweep")
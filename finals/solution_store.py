@@ -0,0 +1,313 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from gurobipy import GRB
+import numpy as np
+
+from linear_model import fingerprint
+
+# Solutions shared by every app and process on this machine, keyed by the
+# canonical hash of the problem
+STORE_PATH = os.environ.get("RO_SOLUTION_STORE", os.path.join(tempfile.gettempdir(), "ro_solutions.sqlite"))
+# Least recently used solutions are evicted above this many bytes on disk
+MAX_BYTES = int(float(os.environ.get("RO_SOLUTION_STORE_MB", "64")) * 1024 * 1024)
+# Solutions also kept in this process, most recently used last
+MEMORY_ENTRIES = 256
+# Memory hits are written to the file with its next transaction, or on their
+# own once this many seconds have passed since the last write
+FLUSH_SECONDS = 5.0
+# Floats are compared on this many significant digits
+DIGITS = 9
+# Rounds of colour refinement used to order rows and columns
+ROUNDS = 3
+# Results that any later solve would repeat. A solve stopped by its time limit
+# (or cancelled) could do better with more time, so it is never kept.
+FINAL_STATUSES = (GRB.OPTIMAL, GRB.INFEASIBLE, GRB.UNBOUNDED, GRB.INF_OR_UNBD)
+
+_memory = OrderedDict()
+_lock = threading.Lock()
+# Per store file: memory hits not written yet (their count and the last use
+# of each key), and when they were last written
+_pending = {}
+_flushed = {}
+
+
+# Floats rounded to DIGITS significant digits, -0.0 as 0.0 and Gurobi's
+# infinity as inf, so that equal inputs give equal bytes
+def _rounded(values, digits=DIGITS):
+    values = np.asarray(values, dtype=np.float64)
+    out = values + 0.0
+    finite = np.isfinite(values) & (values != 0)
+    scale = 10.0 ** (digits - 1 - np.floor(np.log10(np.abs(values[finite]))))
+    out[finite] = np.round(values[finite] * scale) / scale + 0.0
+    out[out >= GRB.INFINITY] = np.inf
+    out[out <= -GRB.INFINITY] = -np.inf
+    return out
+
+
+def _bits(values):
+    return np.ascontiguousarray(values, dtype=np.float64).view(np.uint64)
+
+
+# splitmix64 finaliser, applied elementwise (uint64 arithmetic wraps around)
+def _mix(values):
+    with np.errstate(over="ignore"):
+        z = np.asarray(values, dtype=np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+
+
+# Rank of each element's signature; depends on the values only, never on their order
+def _labels(*signatures):
+    if len(signatures[0]) == 0:
+        return np.zeros(0, dtype=np.uint64)
+    return np.unique(np.column_stack(signatures), axis=0, return_inverse=True)[1].reshape(-1).astype(np.uint64)
+
+
+# Sum of the mixed (value, label of the other end) pairs of each row of the
+# entries: a signature of the multiset, whatever the order of the entries
+def _neighbourhood(size, index, other_labels, value_bits):
+    signature = np.zeros(size, dtype=np.uint64)
+    np.add.at(signature, index, _mix(value_bits ^ _mix(other_labels)))
+    return signature
+
+
+# Canonical form of a linear problem: rows and columns sorted by signatures
+# that only depend on the data (colour refinement over the coefficient
+# matrix), floats rounded, the name dropped. Returns the hash of that form
+# with the backend, and the row and column order (canonical position ->
+# original index). Rows or columns that refinement cannot tell apart keep
+# their relative order, so a permutation of those gives another hash, never
+# a wrong hit: the hash always covers the permuted data itself.
+def canonical_linear(problem, backend="gurobi"):
+    A = problem["A"].tocoo()
+    data = _rounded(A.data)
+    keep = data != 0
+    entry_rows, entry_cols, data = A.row[keep], A.col[keep], data[keep]
+    c, lb, ub, b = (_rounded(problem[key]) for key in ("c", "lb", "ub", "b"))
+    vtype, senses = problem["vtype"], problem["senses"]
+
+    col = _labels(_bits(c), _bits(lb), _bits(ub), np.asarray(vtype, dtype="<U1").view(np.uint32))
+    row = _labels(np.asarray(senses, dtype="<U1").view(np.uint32), _bits(b))
+    for _ in range(ROUNDS):
+        row, col = (
+            _labels(row, _neighbourhood(len(row), entry_rows, col[entry_cols], _bits(data))),
+            _labels(col, _neighbourhood(len(col), entry_cols, row[entry_rows], _bits(data))),
+        )
+    rows, cols = np.argsort(row, kind="stable"), np.argsort(col, kind="stable")
+
+    matrix = problem["A"].tocsr(copy=True)
+    matrix.data = _rounded(matrix.data)
+    matrix = matrix[rows][:, cols].tocsr()
+    matrix.eliminate_zeros()
+    matrix.sort_indices()
+    canonical = {
+        "sense": problem["sense"], "c": c[cols], "A": matrix, "senses": senses[rows], "b": b[rows],
+        "lb": lb[cols], "ub": ub[cols], "vtype": vtype[cols],
+    }
+    return f"linear:{backend}:{fingerprint(canonical)}", rows, cols
+
+
+# Canonical form of a TSP instance: the nodes sorted by signatures of their
+# outgoing and incoming distances, blocked routes and missing arcs as inf.
+# `options` (formulation, ...) go into the hash. Returns the hash and the
+# node order (canonical position -> original node).
+def canonical_tsp(num_vars, distances, blocked_routes, options=()):
+    matrix = np.full((num_vars, num_vars), np.inf)
+    if distances:
+        arcs = np.array(list(distances.keys()))
+        matrix[arcs[:, 0], arcs[:, 1]] = list(distances.values())
+    for i, j in blocked_routes:
+        matrix[i, j] = np.inf
+    matrix = _rounded(matrix)
+    np.fill_diagonal(matrix, 0.0)
+
+    rows, cols = np.nonzero(~np.eye(num_vars, dtype=bool))
+    value_bits = _bits(matrix[rows, cols])
+    label = np.zeros(num_vars, dtype=np.uint64)
+    for _ in range(ROUNDS):
+        outgoing = _neighbourhood(num_vars, rows, label[cols], value_bits)
+        incoming = _neighbourhood(num_vars, cols, label[rows], value_bits)
+        label = _labels(label, outgoing, incoming)
+    order = np.argsort(label, kind="stable")
+
+    digest = hashlib.sha256(json.dumps([num_vars, list(options)]).encode())
+    digest.update(np.ascontiguousarray(matrix[np.ix_(order, order)]).tobytes())
+    return f"tsp:{digest.hexdigest()}", order
+
+
+# Result of the original problem <-> result of the canonical one: values
+# follow the columns, duals the rows
+def linear_to_canonical(result, rows, cols):
+    result = dict(result)
+    if result.get("values") is not None:
+        result["values"] = np.asarray(result["values"])[cols].tolist()
+    if result.get("duals") is not None:
+        result["duals"] = np.asarray(result["duals"])[rows].tolist()
+    return result
+
+
+def linear_from_canonical(result, rows, cols):
+    result = dict(result)
+    for key, order in (("values", cols), ("duals", rows)):
+        if result.get(key) is not None:
+            values = np.empty(len(order))
+            values[order] = result[key]
+            result[key] = values.tolist()
+    return result
+
+
+def tsp_to_canonical(result, order):
+    position = np.empty(len(order), dtype=int)
+    position[order] = np.arange(len(order))
+    return dict(result, itinerary=[(int(position[i]), int(position[j])) for i, j in result["itinerary"]])
+
+
+def tsp_from_canonical(result, order):
+    return dict(result, itinerary=[(int(order[i]), int(order[j])) for i, j in result["itinerary"]])
+
+
+# One transaction on the store, committed on success and always closed
+@contextmanager
+def _connect(path):
+    connection = sqlite3.connect(path, timeout=10)
+    try:
+        with connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS solutions "
+                "(key TEXT PRIMARY KEY, value TEXT, size INTEGER, created REAL, last_used REAL)"
+            )
+            connection.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)")
+            yield connection
+    finally:
+        connection.close()
+
+
+def _count(connection, name, amount=1):
+    connection.execute(
+        "INSERT INTO counters VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+        (name, amount),
+    )
+
+
+def _take_pending(path):
+    with _lock:
+        _flushed[path] = time.monotonic()
+        return _pending.pop(path, None)
+
+
+# Write the memory hits taken from _pending: the count, and last_used of
+# their keys, so solutions answered from memory are not evicted as unused
+def _flush(connection, pending):
+    if pending is None:
+        return
+    _count(connection, "memory_hits", pending["hits"])
+    connection.executemany(
+        "UPDATE solutions SET last_used = MAX(last_used, ?) WHERE key = ?",
+        [(used, key) for key, used in pending["used"].items()],
+    )
+
+
+def _remember(key, value):
+    with _lock:
+        _memory[key] = value
+        _memory.move_to_end(key)
+        if len(_memory) > MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+
+
+# Stored solution under `key`: (where, value) with where "memory" or "disk",
+# or None. Every lookup is counted for the hit rate; a memory hit is only
+# noted, and written with the next transaction (see _flush). The store is
+# best effort: if the file cannot be used, only the memory cache answers.
+def lookup(key, path=STORE_PATH):
+    with _lock:
+        value = _memory.get(key)
+        if value is not None:
+            _memory.move_to_end(key)
+            pending = _pending.setdefault(path, {"hits": 0, "used": {}})
+            pending["hits"] += 1
+            pending["used"][key] = time.time()
+            if time.monotonic() - _flushed.get(path, -FLUSH_SECONDS) < FLUSH_SECONDS:
+                return "memory", value
+    try:
+        with _connect(path) as connection:
+            _flush(connection, _take_pending(path))
+            if value is not None:
+                return "memory", value
+            row = connection.execute("SELECT value FROM solutions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                _count(connection, "misses")
+                return None
+            _count(connection, "disk_hits")
+            connection.execute("UPDATE solutions SET last_used = ? WHERE key = ?", (time.time(), key))
+    except sqlite3.Error:
+        return None if value is None else ("memory", value)
+    value = json.loads(row[0])
+    _remember(key, value)
+    return "disk", value
+
+
+def _json_default(value):
+    # NumPy scalars from the solvers' statistics
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+# Keep `value` under `key` in memory and on disk, then evict the least
+# recently used solutions until the file's solutions fit in `max_bytes`
+def store(key, value, path=STORE_PATH, max_bytes=MAX_BYTES):
+    _remember(key, value)
+    text = json.dumps(value, default=_json_default)
+    now = time.time()
+    try:
+        with _connect(path) as connection:
+            _flush(connection, _take_pending(path))
+            connection.execute(
+                "INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?)", (key, text, len(text), now, now)
+            )
+            total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM solutions").fetchone()[0]
+            if total > max_bytes:
+                evicted = []
+                for old_key, size in connection.execute("SELECT key, size FROM solutions ORDER BY last_used, created"):
+                    if total <= max_bytes:
+                        break
+                    evicted.append((old_key,))
+                    total -= size
+                connection.executemany("DELETE FROM solutions WHERE key = ?", evicted)
+    except sqlite3.Error:
+        pass
+
+
+# Hits, misses and size of the store, over every app that shares it, plus
+# this process's memory hits not written yet
+def store_stats(path=STORE_PATH):
+    try:
+        with _connect(path) as connection:
+            counters = dict(connection.execute("SELECT name, value FROM counters"))
+            entries, size = connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM solutions").fetchone()
+    except sqlite3.Error:
+        return None
+    with _lock:
+        pending = _pending.get(path)
+        counters["memory_hits"] = counters.get("memory_hits", 0) + (pending["hits"] if pending else 0)
+    hits = counters.get("memory_hits", 0) + counters.get("disk_hits", 0)
+    lookups = hits + counters.get("misses", 0)
+    return {
+        "memory_hits": counters.get("memory_hits", 0),
+        "disk_hits": counters.get("disk_hits", 0),
+        "misses": counters.get("misses", 0),
+        "hit_rate": hits / lookups if lookups else None,
+        "entries": entries,
+        "bytes": size,
+    }
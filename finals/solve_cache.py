@@ -0,0 +1,120 @@
+from collections import OrderedDict
+
+import pandas as pd
+import streamlit as st
+
+from backends import BACKENDS, solve_problem
+from linear_model import fingerprint
+from solution_store import (FINAL_STATUSES, canonical_linear, canonical_tsp, linear_from_canonical,
+                            linear_to_canonical, lookup, store, store_stats, tsp_from_canonical, tsp_to_canonical)
+from telemetry import PHASES
+
+# Results kept per session; older ones are dropped first
+CACHE_SIZE = 32
+
+# Only meaningful to the session that solved: not kept in the shared store
+SESSION_FIELDS = ("edits", "update_time")
+
+
+def _session_cache(cache_name):
+    if cache_name not in st.session_state:
+        st.session_state[cache_name] = OrderedDict()
+    return st.session_state[cache_name]
+
+
+# Result for these exact inputs if they were solved before in this session, else None
+def cached_result(problem, cache_name="solve_cache", backend="gurobi"):
+    cache = _session_cache(cache_name)
+    key = (fingerprint(problem), backend)
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+    return None
+
+
+# Solve on request. Identical inputs are answered from the session cache,
+# then from the solution store shared by every app (any ordering of the same
+# rows and columns counts as identical); a stored result is marked with
+# "cache": "memory" or "disk". `solve` replaces the plain solve, e.g. with one
+# that edits a persistent model. A solve that was interrupted or hit a time
+# limit is returned but not kept, so the next request solves again.
+def solve_cached(problem, cache_name="solve_cache", solve=None, backend="gurobi"):
+    cache = _session_cache(cache_name)
+    key = (fingerprint(problem), backend)
+    if key not in cache:
+        store_key, rows, cols = canonical_linear(problem, backend)
+        found = lookup(store_key)
+        if found is not None:
+            where, value = found
+            result = dict(linear_from_canonical(value, rows, cols), cache=where)
+        else:
+            result = solve_problem(problem, backend) if solve is None else solve(problem)
+            if result["status"] not in FINAL_STATUSES:
+                return result
+            shared = {name: value for name, value in result.items() if name not in SESSION_FIELDS}
+            store(store_key, linear_to_canonical(shared, rows, cols))
+        cache[key] = result
+        if len(cache) > CACHE_SIZE:
+            cache.popitem(last=False)
+    cache.move_to_end(key)
+    return cache[key]
+
+
+# `solve()` of a TSP instance through the solution store; `options` are
+# whatever else changes the result (formulation, warm start, ...). Only
+# final results are stored.
+def tsp_cached(num_vars, distances, blocked_routes, options, solve):
+    store_key, order = canonical_tsp(num_vars, distances, blocked_routes, options)
+    found = lookup(store_key)
+    if found is not None:
+        where, value = found
+        return dict(tsp_from_canonical(value, order), cache=where)
+    result = solve()
+    if result["status"] in FINAL_STATUSES:
+        store(store_key, tsp_to_canonical(result, order))
+    return result
+
+
+# Marks a result that came out of the solution store instead of a solve
+def cache_badge(result):
+    if result is not None and result.get("cache"):
+        st.caption(f"Served instantly from the solution cache ({result['cache']}): no solve was needed.")
+
+
+# Hit rate of the solution store, over every app that shares it
+def store_summary():
+    stats = store_stats()
+    if stats is None or stats["hit_rate"] is None:
+        return
+    hits = stats["memory_hits"] + stats["disk_hits"]
+    st.sidebar.caption(
+        f"Solution cache: {stats['hit_rate']:.0%} hit rate ({hits} of {hits + stats['misses']} lookups), "
+        f"{stats['entries']} solutions, {stats['bytes'] / 1024:.0f} KB"
+    )
+
+
+# Sidebar choice of solver backend, remembered for the session
+def select_backend():
+    return st.sidebar.selectbox("Solver:", list(BACKENDS), format_func=BACKENDS.get, key="backend")
+
+
+# Collapsible panel with the time of each phase and the solver statistics
+def metrics_panel(metrics):
+    with st.expander("Timings and solver statistics"):
+        phases = metrics["phases"]
+        st.dataframe(
+            pd.DataFrame({
+                "Phase": [phase for phase in PHASES if phase in phases],
+                "Time (ms)": [phases[phase] * 1000 for phase in PHASES if phase in phases],
+            }),
+            hide_index=True,
+        )
+        if metrics.get("cached"):
+            st.caption("The result came from the cache: no solver phases ran on this rerun.")
+        stats = metrics.get("stats")
+        if stats:
+            presolve = stats.get("presolve") or {}
+            rows = {key: value for key, value in stats.items() if key != "presolve" and value is not None}
+            rows.update({f"presolve {key.replace('_', ' ')}": value for key, value in presolve.items()})
+            st.dataframe(pd.DataFrame({"Statistic": list(rows), "Value": [str(value) for value in rows.values()]}),
+                         hide_index=True)
@@ -0,0 +1,230 @@
+# Local HTTP/JSON solve service for the diet, allocation, LP/PLNE and TSP
+# models, for other services that cannot go through the Streamlit pages.
+#
+#     python solve_service.py --port 8765 --workers 2 --queue 16 --timeout 60
+#
+# The payloads are the instances of batch_solve.py ("kind": "diet",
+# "allocation", "lp" or "tsp"; the PL and PLNE fronts are "lp" with vtype "C"
+# or "I"), with an optional "timeout" in seconds:
+#
+#     POST /jobs          submit an instance -> 202 {"id": ..., "status": "queued"}
+#                         503 with Retry-After when the queue is full
+#     GET  /jobs/<id>     poll -> {"id", "status", "result"?, "error"?}
+#                         status: queued, running, done, failed or timeout
+#     GET  /health        workers, queued and running jobs
+#
+# Each worker is a process with its own Gurobi environments (solver_env.py),
+# started once and reused for every job it runs. A job gets its timeout as
+# Gurobi's TimeLimit, so a solve that hits it still returns its best solution;
+# a worker that has not answered TIMEOUT_GRACE seconds later is killed and
+# replaced.
+import argparse
+import json
+import multiprocessing
+import queue
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from gurobipy import GRB
+
+from backends import BACKENDS
+from batch_solve import BUILDERS, solve_instance
+from solver_env import set_defaults
+
+KINDS = set(BUILDERS) | {"tsp"}
+# Seconds a worker may overrun a job's TimeLimit before it is killed
+TIMEOUT_GRACE = 5.0
+# Finished jobs kept for polling; the oldest are forgotten first
+JOB_HISTORY = 1000
+
+
+# Worker process: one Gurobi environment for its whole life, one job at a time
+def _worker_main(connection, threads, backend):
+    set_defaults(OutputFlag=0, Threads=threads)
+    while True:
+        job = connection.recv()
+        if job is None:
+            return
+        instance, timeout = job
+        set_defaults(TimeLimit=timeout if timeout else GRB.INFINITY)
+        connection.send(solve_instance(instance, backend))
+
+
+class SolveService:
+    def __init__(self, workers=2, threads=1, queue_size=16, timeout=60.0, backend="gurobi"):
+        self.threads, self.timeout, self.backend = threads, timeout, backend
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.running = 0
+        self.restarts = 0
+        self.context = multiprocessing.get_context("spawn")
+        self.supervisors = [threading.Thread(target=self._supervise, daemon=True) for _ in range(workers)]
+        for supervisor in self.supervisors:
+            supervisor.start()
+
+    def _start_worker(self):
+        parent, child = self.context.Pipe()
+        process = self.context.Process(target=_worker_main, args=(child, self.threads, self.backend), daemon=True)
+        process.start()
+        child.close()
+        return process, parent
+
+    def _update(self, job_id, **fields):
+        with self.lock:
+            self.jobs[job_id].update(fields)
+
+    # One thread per worker process: feed it jobs from the queue, and replace
+    # it when it dies or overruns a job's timeout
+    def _supervise(self):
+        process, connection = self._start_worker()
+        while True:
+            job_id, instance, timeout = self.queue.get()
+            with self.lock:
+                self.running += 1
+            self._update(job_id, status="running", started=time.time())
+            try:
+                connection.send((instance, timeout))
+                if connection.poll(timeout + TIMEOUT_GRACE if timeout else None):
+                    result = connection.recv()
+                    status = "failed" if "error" in result else "done"
+                    self._update(job_id, status=status, result=result, finished=time.time())
+                    continue
+                self._update(job_id, status="timeout", finished=time.time(),
+                             error=f"no answer within {timeout + TIMEOUT_GRACE:.0f} s")
+            except (EOFError, OSError) as error:
+                self._update(job_id, status="failed", finished=time.time(), error=f"worker died: {error}")
+            finally:
+                with self.lock:
+                    self.running -= 1
+            process.kill()
+            process.join()
+            self.restarts += 1
+            process, connection = self._start_worker()
+
+    # Queue an instance; returns the job, or None when the queue is full
+    def submit(self, instance):
+        # A job may ask for less time than the service allows, never more
+        timeout = float(instance.get("timeout") or self.timeout)
+        if self.timeout:
+            timeout = min(timeout, self.timeout)
+        job_id = uuid.uuid4().hex
+        job = {"id": job_id, "kind": instance["kind"], "status": "queued", "submitted": time.time()}
+        with self.lock:
+            self.jobs[job_id] = job
+            while len(self.jobs) > JOB_HISTORY:
+                oldest = next(iter(self.jobs))
+                if self.jobs[oldest]["status"] in ("queued", "running"):
+                    break
+                del self.jobs[oldest]
+        try:
+            self.queue.put_nowait((job_id, instance, timeout))
+        except queue.Full:
+            with self.lock:
+                del self.jobs[job_id]
+            return None
+        return dict(job)
+
+    def job(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return None if job is None else dict(job)
+
+    def health(self):
+        with self.lock:
+            return {
+                "workers": len(self.supervisors),
+                "running": self.running,
+                "queued": self.queue.qsize(),
+                "capacity": self.queue.maxsize,
+                "restarts": self.restarts,
+            }
+
+
+class Handler(BaseHTTPRequestHandler):
+    service = None
+
+    def _reply(self, status, body, headers=()):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            return self._reply(HTTPStatus.NOT_FOUND, {"error": "not found"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            instance = json.loads(self.rfile.read(length))
+            if not isinstance(instance, dict):
+                raise ValueError("the payload must be a JSON object")
+            if instance.get("kind") not in KINDS:
+                raise ValueError(f"kind must be one of {', '.join(sorted(KINDS))}")
+            if instance.get("timeout") is not None:
+                float(instance["timeout"])
+        except (ValueError, TypeError) as error:
+            return self._reply(HTTPStatus.BAD_REQUEST, {"error": str(error)})
+        job = self.service.submit(instance)
+        if job is None:
+            return self._reply(HTTPStatus.SERVICE_UNAVAILABLE, {"error": "queue full, retry later"},
+                               [("Retry-After", "1")])
+        self._reply(HTTPStatus.ACCEPTED, job, [("Location", f"/jobs/{job['id']}")])
+
+    def do_GET(self):
+        path = self.path.rstrip("/")
+        if path == "/health":
+            return self._reply(HTTPStatus.OK, self.service.health())
+        if path.startswith("/jobs/"):
+            job = self.service.job(path[len("/jobs/"):])
+            if job is not None:
+                return self._reply(HTTPStatus.OK, job)
+        self._reply(HTTPStatus.NOT_FOUND, {"error": "not found"})
+
+    def log_message(self, format, *args):
+        # One line per request on stderr, as http.server does, unless --quiet
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def serve(host="127.0.0.1", port=8765, quiet=False, **options):
+    handler = type("ServiceHandler", (Handler,), {"service": SolveService(**options)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.quiet = quiet
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the diet, allocation, LP and TSP solvers over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=2, help="solver processes (default: 2)")
+    parser.add_argument("--threads", type=int, default=1, help="Gurobi threads per worker (default: 1)")
+    parser.add_argument("--queue", type=int, default=16, help="jobs waiting for a worker before 503 (default: 16)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="longest allowed solve in seconds (default: 60)")
+    parser.add_argument("--backend", choices=list(BACKENDS), default="gurobi", help="solver for the linear instances")
+    parser.add_argument("--quiet", action="store_true", help="do not log every request")
+    args = parser.parse_args(argv)
+
+    server = serve(args.host, args.port, args.quiet, workers=args.workers, threads=args.threads,
+                   queue_size=args.queue, timeout=args.timeout, backend=args.backend)
+    print(f"Serving on http://{args.host}:{args.port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
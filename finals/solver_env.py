@@ -0,0 +1,77 @@
+import atexit
+import threading
+import weakref
+
+import gurobipy as gp
+
+# Gurobi environments shared by every model built in this process. An
+# environment is started once (license checkout included) and kept until the
+# process exits. Gurobi allows one thread at a time on an environment and
+# its models, so a model keeps its environment until the model is garbage
+# collected; only then can another thread build on it.
+
+# Parameters of every environment, unless changed with set_defaults
+DEFAULT_PARAMS = {"OutputFlag": 0}
+
+_idle = []
+_started = []
+_lock = threading.Lock()
+
+
+def _start_env():
+    env = gp.Env(empty=True)
+    for name, value in DEFAULT_PARAMS.items():
+        env.setParam(name, value)
+    env.start()
+    return env
+
+
+# Change the default parameters of the environments, and so of every model
+# built after the call (e.g. Threads in a worker process, or a TimeLimit for
+# the next solves)
+def set_defaults(**params):
+    with _lock:
+        DEFAULT_PARAMS.update(params)
+
+
+# An idle environment with the current defaults, or a new one when every
+# environment is in use
+def _checkout():
+    with _lock:
+        env = _idle.pop() if _idle else None
+        params = dict(DEFAULT_PARAMS)
+    if env is None:
+        env = _start_env()
+        with _lock:
+            _started.append(env)
+    else:
+        for name, value in params.items():
+            env.setParam(name, value)
+    return env
+
+
+def _checkin(env):
+    with _lock:
+        if env in _started:
+            _idle.append(env)
+
+
+# Empty model on an environment of the pool; every model builder goes through
+# here. The environment goes back to the pool with the model.
+def new_model(name=""):
+    env = _checkout()
+    m = gp.Model(name, env=env)
+    weakref.finalize(m, _checkin, env)
+    return m
+
+
+# Release every environment (and its license); called when the process exits
+@atexit.register
+def close_envs():
+    with _lock:
+        envs = list(_started)
+        _idle.clear()
+        _started.clear()
+    for env in envs:
+        env.dispose()
+
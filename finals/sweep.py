@@ -0,0 +1,105 @@
+import time
+
+import gurobipy as gp
+from gurobipy import GRB
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from linear_model import STATUS_NAMES, build_linear_model
+
+
+# Parametric sweep of one constraint limit (row) or one objective coefficient
+# (variable) over `values`, on a single model. Each solve starts from the
+# previous basis. While a value stays inside the sensitivity range of the last
+# solve (SARHSLow/SARHSUp for a limit, SAObjLow/SAObjUp for a cost) the basis
+# is still optimal, so the objective is read off the dual value (or the
+# variable's value) instead of solving again. Ranging needs an LP: MIPs are
+# solved at every step.
+#
+# Yields one dict per value: parameter, status, objective, marginal (the
+# objective change per unit of the parameter), solved, iterations, time.
+def sweep(problem, values, row=None, variable=None):
+    if (row is None) == (variable is None):
+        raise ValueError("Sweep either a constraint row or an objective variable")
+    m, x = build_linear_model(problem)
+    m.Params.Presolve = 0
+    m.update()
+    target = m.getConstrs()[row] if row is not None else x[variable].item()
+    ranging = bool(np.all(problem["vtype"] == "C"))
+    base = None
+
+    for value in values:
+        value = float(value)
+        start = time.perf_counter()
+        step = {"parameter": value, "solved": False, "iterations": 0}
+        if base is not None and base["low"] <= value <= base["up"]:
+            step["status"] = STATUS_NAMES[GRB.OPTIMAL]
+            step["objective"] = base["objective"] + base["marginal"] * (value - base["value"])
+            step["marginal"] = base["marginal"]
+        else:
+            if row is not None:
+                target.RHS = value
+            else:
+                target.Obj = value
+            m.optimize()
+            step.update(solved=True, iterations=int(m.IterCount), status=STATUS_NAMES.get(m.Status, str(m.Status)))
+            step["objective"] = m.ObjVal if m.SolCount else None
+            step["marginal"] = None
+            base = None
+            if m.Status == GRB.OPTIMAL:
+                if ranging:
+                    marginal = target.Pi if row is not None else target.X
+                    low, up = (target.SARHSLow, target.SARHSUp) if row is not None else (target.SAObjLow, target.SAObjUp)
+                    base = {"value": value, "objective": m.ObjVal, "marginal": marginal, "low": low, "up": up}
+                    step["marginal"] = marginal
+        step["time"] = time.perf_counter() - start
+        yield step
+    m.dispose()
+
+
+# Expander that sweeps a limit or a cost of `problem` and plots the objective
+def sweep_panel(problem, row_names, variable_names, key, objective_label="Cost"):
+    with st.expander("Parametric sweep"):
+        target = st.radio("Vary:", ["Constraint limit", "Objective coefficient"], horizontal=True, key=f"{key}_target")
+        if target == "Constraint limit":
+            if not len(row_names):
+                st.write("The model has no constraints.")
+                return
+            index = st.selectbox("Constraint:", range(len(row_names)), format_func=row_names.__getitem__,
+                                 key=f"{key}_row")
+            current = float(problem["b"][index])
+        else:
+            index = st.selectbox("Variable:", range(len(variable_names)), format_func=variable_names.__getitem__,
+                                 key=f"{key}_variable")
+            current = float(problem["c"][index])
+        cols = st.columns(3)
+        with cols[0]:
+            first = st.number_input("From:", value=current / 2 if current else 0.0, key=f"{key}_from")
+        with cols[1]:
+            last = st.number_input("To:", value=current * 1.5 if current else 10.0, key=f"{key}_to")
+        with cols[2]:
+            count = st.number_input("Steps:", value=21, step=1, min_value=2, max_value=1000, key=f"{key}_steps")
+        if not st.button("Run sweep", key=f"{key}_run"):
+            return
+
+        values = np.linspace(first, last, int(count))
+        try:
+            if target == "Constraint limit":
+                steps = list(sweep(problem, values, row=index))
+            else:
+                steps = list(sweep(problem, values, variable=index))
+        except gp.GurobiError as error:
+            st.error(f"Gurobi error: {error}")
+            return
+        frame = pd.DataFrame(steps).rename(columns={
+            "parameter": "Parameter", "objective": objective_label, "marginal": "Marginal", "status": "Status",
+            "solved": "Solved", "iterations": "Iterations", "time": "Time (s)",
+        })[["Parameter", objective_label, "Marginal", "Status", "Solved", "Iterations", "Time (s)"]]
+        st.line_chart(frame, x="Parameter", y=objective_label)
+        solved = int(frame["Solved"].sum())
+        st.write(
+            f"{solved} of {len(frame)} steps solved, the others read off the sensitivity ranges; "
+            f"total time {frame['Time (s)'].sum():.4f} s"
+        )
+        st.dataframe(frame, hide_index=True)
@@ -0,0 +1,100 @@
+import json
+import os
+import tempfile
+import time
+
+from gurobipy import GRB
+
+# One JSON object per line, appended by every page that solved something
+METRICS_LOG = os.environ.get("RO_METRICS_LOG", os.path.join(tempfile.gettempdir(), "ro_metrics.jsonl"))
+
+PHASES = ("parse", "build", "presolve", "solve", "extract", "render")
+
+
+def start_metrics(page):
+    return {"page": page, "phases": {}, "stats": None, "_last": time.perf_counter()}
+
+
+# Time since the previous lap (or the start) is booked to `phase`
+def lap(metrics, phase):
+    now = time.perf_counter()
+    metrics["phases"][phase] = metrics["phases"].get(phase, 0.0) + now - metrics["_last"]
+    metrics["_last"] = now
+
+
+# Solver phases and statistics of a result, booked into the page metrics. A
+# result served from a cache was solved on an earlier run: it is marked as
+# such and its timings are left out.
+def add_result(metrics, result, solved):
+    from_store = bool(solved and result.get("cache"))
+    metrics["cached"] = result is not None and (not solved or from_store)
+    if from_store:
+        metrics["cache"] = result["cache"]
+    elif solved:
+        metrics["phases"].update(result.get("timings", {}))
+        metrics["stats"] = result.get("stats")
+        metrics["backend"] = result.get("backend", "gurobi")
+    metrics["_last"] = time.perf_counter()
+
+
+# Presolve reductions and the time presolve ended, kept on the model
+def _presolve_callback(model, where):
+    if where == GRB.Callback.PRESOLVE:
+        model._presolve = {
+            "rows_removed": model.cbGet(GRB.Callback.PRE_ROWDEL),
+            "columns_removed": model.cbGet(GRB.Callback.PRE_COLDEL),
+            "senses_changed": model.cbGet(GRB.Callback.PRE_SENCHG),
+            "bounds_changed": model.cbGet(GRB.Callback.PRE_BNDCHG),
+            "coefficients_changed": model.cbGet(GRB.Callback.PRE_COECHG),
+        }
+    elif model._presolve_end is None and where in (GRB.Callback.SIMPLEX, GRB.Callback.BARRIER, GRB.Callback.MIP):
+        model._presolve_end = model.cbGet(GRB.Callback.RUNTIME)
+
+
+# MIPGap of a MIP with an incumbent, None when Gurobi has none to give: an
+# unbounded MIP has solutions but no gap
+def _mip_gap(m):
+    if not (m.IsMIP and m.SolCount) or m.Status == GRB.UNBOUNDED:
+        return None
+    try:
+        return m.MIPGap
+    except AttributeError:
+        return None
+
+
+# optimize() with the presolve/solve split and Gurobi's statistics:
+# returns ({"presolve": s, "solve": s}, stats). `callback` also runs on every
+# callback call, e.g. to report progress.
+def optimize_with_stats(m, callback=None):
+    m._presolve, m._presolve_end = None, None
+    if callback is None:
+        m.optimize(_presolve_callback)
+    else:
+        m.optimize(lambda model, where: (_presolve_callback(model, where), callback(model, where)))
+    runtime = m.Runtime
+    presolve = runtime if m._presolve_end is None else m._presolve_end
+    stats = {
+        "runtime": runtime,
+        "nodes": int(m.NodeCount) if m.IsMIP else 0,
+        "iterations": int(m.IterCount),
+        "barrier_iterations": int(m.BarIterCount),
+        "gap": _mip_gap(m),
+        "variables": m.NumVars,
+        "constraints": m.NumConstrs,
+        "nonzeros": m.NumNZs,
+        "presolve": m._presolve,
+    }
+    return {"presolve": presolve, "solve": runtime - presolve}, stats
+
+
+# Append the metrics of one page run to the log; the log is best effort and
+# never stops a page
+def log_metrics(metrics, path=METRICS_LOG):
+    record = {key: value for key, value in metrics.items() if not key.startswith("_")}
+    record["timestamp"] = time.time()
+    try:
+        with open(path, "a", encoding="utf-8") as handle:
+            handle.write(json.dumps(record) + "\n")
+    except OSError:
+        pass
+    return record
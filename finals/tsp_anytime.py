@@ -0,0 +1,269 @@
+import itertools
+import math
+import random
+import time
+from collections import deque
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+# Seconds between two calls of the `stop` function of anytime_tsp
+STOP_POLL = 0.05
+
+
+# Order the points along a Hilbert curve, a cheap O(n log n) starting tour
+def hilbert_order(positions, order=16):
+    points = np.asarray(positions, dtype=float)
+    side = 2 ** order
+    low = points.min(axis=0)
+    span = max(float((points.max(axis=0) - low).max()), 1e-12)
+    scaled = ((points - low) / span * (side - 1)).astype(np.int64)
+    x, y = scaled[:, 0].copy(), scaled[:, 1].copy()
+    d = np.zeros(len(points), dtype=np.int64)
+    s = side // 2
+    while s > 0:
+        rx = ((x & s) > 0).astype(np.int64)
+        ry = ((y & s) > 0).astype(np.int64)
+        d += s * s * ((3 * rx) ^ ry)
+        flip = (ry == 0) & (rx == 1)
+        x = np.where(flip, side - 1 - x, x)
+        y = np.where(flip, side - 1 - y, y)
+        swap = ry == 0
+        x, y = np.where(swap, y, x), np.where(swap, x, y)
+        s //= 2
+    return np.argsort(d, kind="stable")
+
+
+def euclidean_tour_length(positions, tour):
+    points = np.asarray(positions, dtype=float)[np.asarray(tour)]
+    return float(np.hypot(*(np.roll(points, -1, axis=0) - points).T).sum())
+
+
+# Anytime 2-opt/Or-opt local search over k-nearest-neighbour candidate lists
+# with don't-look bits, restarted from double-bridge kicks until the time
+# budget runs out. Works on coordinates, so no n x n matrix is ever built.
+#
+# Blocked routes are avoided in both directions here: that keeps every move
+# symmetric and costs next to nothing on instances with thousands of stops.
+#
+# This is a generator: it yields a snapshot every `report_every` seconds when
+# the best tour improved, and a final snapshot with done=True. The search
+# starts from `initial_tour` when given, else from the Hilbert curve order.
+# `stop`, a function polled every STOP_POLL seconds, ends the search early
+# when it returns True (the final snapshot still comes).
+def anytime_tsp(positions, blocked_routes=(), time_limit=10.0, neighbours=8, report_every=1.0, seed=0,
+                initial_tour=None, stop=None):
+    start_time = time.perf_counter()
+    deadline = start_time + time_limit
+    next_poll = start_time
+
+    # The time budget is spent or `stop` asked to end; a stop moves the deadline
+    def expired():
+        nonlocal deadline, next_poll
+        now = time.perf_counter()
+        if now >= deadline:
+            return True
+        if stop is not None and now >= next_poll:
+            next_poll = now + STOP_POLL
+            if stop():
+                deadline = now
+                return True
+        return False
+
+    points = np.asarray(positions, dtype=float)
+    n = len(points)
+    if n < 5:
+        # Too small for the moves below: try every tour
+        tours = [[0, *rest] for rest in itertools.permutations(range(1, n))] or [[]]
+        best = min(tours, key=lambda t: (blocked_arcs(t, blocked_routes), euclidean_tour_length(points, t) if t else 0))
+        yield _snapshot(points, best, start_time, True, blocked_routes)
+        return
+
+    xs, ys = points[:, 0].tolist(), points[:, 1].tolist()
+    blocked = set()
+    for from_index, to_index in blocked_routes:
+        blocked.add((from_index, to_index))
+        blocked.add((to_index, from_index))
+    diagonal = math.hypot(*(points.max(axis=0) - points.min(axis=0)).tolist())
+    penalty = n * (diagonal + 1.0)
+
+    def dist(a, b):
+        d = math.hypot(xs[a] - xs[b], ys[a] - ys[b])
+        if blocked and (a, b) in blocked:
+            d += penalty
+        return d
+
+    k = min(neighbours, n - 1)
+    _, candidates = cKDTree(points).query(points, k=k + 1)
+    neighbour_lists = [[c for c in row if c != a][:k] for a, row in enumerate(candidates.tolist())]
+
+    tour = hilbert_order(points) if initial_tour is None else np.array(initial_tour, dtype=np.int64)
+    pos = np.empty(n, dtype=np.int64)
+    pos[tour] = np.arange(n)
+
+    def succ(c):
+        return int(tour[(pos[c] + 1) % n])
+
+    def pred(c):
+        return int(tour[(pos[c] - 1) % n])
+
+    # Reverse tour[i..j] (cyclic), flipping whichever side of the tour is shorter
+    def reverse(i, j):
+        inner = (j - i) % n + 1
+        if 2 * inner > n:
+            i, j = (j + 1) % n, (i - 1) % n
+        if i <= j:
+            idx = np.arange(i, j + 1)
+        else:
+            idx = np.concatenate((np.arange(i, n), np.arange(0, j + 1)))
+        tour[idx] = tour[idx][::-1]
+        pos[tour[idx]] = idx
+
+    def two_opt_move(a):
+        for forward in (True, False):
+            b = succ(a) if forward else pred(a)
+            d_ab = dist(a, b)
+            for c in neighbour_lists[a]:
+                d_ac = dist(a, c)
+                if d_ac >= d_ab:
+                    break
+                d = succ(c) if forward else pred(c)
+                if c == b or d == a:
+                    continue
+                delta = d_ac + dist(b, d) - d_ab - dist(c, d)
+                if delta < -1e-10:
+                    if forward:
+                        reverse(pos[b], pos[c])
+                    else:
+                        reverse(pos[a], pos[d])
+                    return delta, (a, b, c, d)
+        return 0.0, ()
+
+    def or_opt_move(a):
+        for length in (1, 2, 3):
+            segment = [int(tour[(pos[a] + offset) % n]) for offset in range(length)]
+            first, last = segment[0], segment[-1]
+            p, q = pred(first), succ(last)
+            if q == p or q in segment:
+                break
+            gain = dist(p, first) + dist(last, q) - dist(p, q)
+            if gain <= 1e-10:
+                continue
+            for end, other in ((first, last), (last, first)):
+                for c in neighbour_lists[end]:
+                    d_c = dist(end, c)
+                    if d_c >= gain:
+                        break
+                    if c in segment:
+                        continue
+                    for after in (True, False):
+                        e = succ(c) if after else pred(c)
+                        if e in segment:
+                            continue
+                        delta = d_c + dist(other, e) - dist(c, e) - gain
+                        if delta < -1e-10:
+                            move_segment(segment, c, after, end == first)
+                            return delta, (p, q, first, last, c, e)
+        return 0.0, ()
+
+    # Cut the segment out and put it next to c, with `end` touching c
+    def move_segment(segment, c, after, first_touches_c):
+        nonlocal tour
+        rotated = np.roll(tour, -pos[segment[0]])
+        rest = rotated[len(segment):]
+        ic = int(np.flatnonzero(rest == c)[0])
+        block = np.array(segment)
+        if after:
+            if not first_touches_c:
+                block = block[::-1]
+            tour = np.concatenate((rest[:ic + 1], block, rest[ic + 1:]))
+        else:
+            if first_touches_c:
+                block = block[::-1]
+            tour = np.concatenate((rest[:ic], block, rest[ic:]))
+        pos[tour] = np.arange(n)
+
+    def double_bridge(rng):
+        nonlocal tour
+        max_len = max(1, min(50, (n - 2) // 3))
+        first_len, second_len = rng.randint(1, max_len), rng.randint(1, max_len)
+        rotated = np.roll(tour, -rng.randrange(n))
+        a, b, c = rotated[0], rotated[1:1 + first_len], rotated[1 + first_len:1 + first_len + second_len]
+        rest = rotated[1 + first_len + second_len:]
+        delta = (
+            dist(int(a), int(c[0])) + dist(int(c[-1]), int(b[0])) + dist(int(b[-1]), int(rest[0]))
+            - dist(int(a), int(b[0])) - dist(int(b[-1]), int(c[0])) - dist(int(c[-1]), int(rest[0]))
+        )
+        tour = np.concatenate(([a], c, b, rest))
+        pos[tour] = np.arange(n)
+        return delta, [int(v) for v in (a, b[0], b[-1], c[0], c[-1], rest[0])]
+
+    length = sum(dist(int(tour[i]), int(tour[(i + 1) % n])) for i in range(n))
+    best_tour, best_length = tour.copy(), length
+    yield _snapshot(points, best_tour, start_time, False)
+    last_report = time.perf_counter()
+    reported_length = best_length
+
+    rng = random.Random(seed)
+    active = deque(tour.tolist())
+    queued = [True] * n
+    while not expired():
+        # Local search until every don't-look bit is set
+        while active:
+            a = active.popleft()
+            queued[a] = False
+            delta, touched = two_opt_move(a)
+            if not touched:
+                delta, touched = or_opt_move(a)
+            if touched:
+                length += delta
+                for city in touched:
+                    if not queued[city]:
+                        queued[city] = True
+                        active.append(city)
+            if expired():
+                break
+
+        if length < best_length - 1e-9:
+            best_tour, best_length = tour.copy(), length
+        else:
+            # Kick did not pay off: back to the best tour
+            tour = best_tour.copy()
+            pos[tour] = np.arange(n)
+            length = best_length
+
+        now = time.perf_counter()
+        if now - last_report >= report_every and best_length < reported_length - 1e-9:
+            yield _snapshot(points, best_tour, start_time, False)
+            last_report, reported_length = now, best_length
+
+        if now >= deadline:
+            break
+        delta, touched = double_bridge(rng)
+        length += delta
+        for city in touched:
+            if not queued[city]:
+                queued[city] = True
+                active.append(city)
+
+    # Travel the tour in the direction that uses fewer one-way blocked routes
+    best_tour = best_tour.tolist()
+    if blocked_arcs(best_tour[::-1], blocked_routes) < blocked_arcs(best_tour, blocked_routes):
+        best_tour = best_tour[::-1]
+    yield _snapshot(points, best_tour, start_time, True, blocked_routes)
+
+
+def blocked_arcs(tour, blocked_routes):
+    arcs = set(zip(tour, tour[1:] + tour[:1]))
+    return sum(1 for route in set(map(tuple, blocked_routes)) if route in arcs)
+
+
+def _snapshot(points, tour, start_time, done, blocked_routes=()):
+    tour = [int(city) for city in tour]
+    return {
+        "tour": tour,
+        "length": euclidean_tour_length(points, tour) if len(tour) > 1 else 0.0,
+        "elapsed": time.perf_counter() - start_time,
+        "blocked_used": blocked_arcs(tour, blocked_routes),
+        "done": done,
+    }
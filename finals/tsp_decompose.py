@@ -0,0 +1,164 @@
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import gurobipy as gp
+from gurobipy import GRB
+import numpy as np
+from scipy.cluster.vq import kmeans2
+
+from distance_engine import distance_dict, euclidean_matrix
+from solver_env import set_defaults
+from tsp_anytime import anytime_tsp, hilbert_order
+from tsp_heuristics import check_routes, heuristic_tour
+from tsp_model import solve_tsp
+from worker_processes import CONTEXT
+
+CLUSTER_METHODS = {
+    "kmeans": "k-means",
+    "hilbert": "Space-filling curve",
+}
+
+
+# Split the points into groups of about cluster_size, either with k-means or
+# by cutting the Hilbert curve order into consecutive runs
+def split_clusters(positions, cluster_size, method="kmeans", seed=0):
+    points = np.asarray(positions, dtype=float)
+    n = len(points)
+    count = max(1, math.ceil(n / cluster_size))
+    if count == 1:
+        return [np.arange(n)]
+    if method == "hilbert":
+        return np.array_split(hilbert_order(points), count)
+    if method == "kmeans":
+        _, labels = kmeans2(points, count, minit="++", seed=seed)
+        clusters = [np.flatnonzero(labels == label) for label in range(count)]
+        return [cluster for cluster in clusters if len(cluster)]
+    raise ValueError(f"Unknown cluster method: {method}")
+
+
+def _init_worker(threads):
+    # Each worker gets its own share of the cores
+    set_defaults(OutputFlag=0, Threads=threads)
+
+
+# Solve one cluster: exact MIP when it is small enough, the anytime heuristic
+# otherwise (or when the MIP fails, e.g. on a size-limited license)
+def solve_cluster(points, blocked_routes, mip_limit, time_limit):
+    start = time.perf_counter()
+    n = len(points)
+    if n <= 3:
+        return list(range(n)), "trivial", time.perf_counter() - start
+    if n <= mip_limit:
+        distances = distance_dict(euclidean_matrix(points))
+        try:
+            result = solve_tsp(n, distances, blocked_routes, "auto")
+        except gp.GurobiError:
+            result = None
+        if result is not None and result["status"] == GRB.OPTIMAL:
+            successor = dict(result["itinerary"])
+            tour = [0]
+            while len(tour) < n:
+                tour.append(successor[tour[-1]])
+            return tour, "MIP", time.perf_counter() - start
+    *_, snapshot = anytime_tsp(points, blocked_routes, time_limit=time_limit)
+    return snapshot["tour"], "heuristic", time.perf_counter() - start
+
+
+# Join the cluster tours in the order of a tour over their centroids. Each
+# cycle is opened at the point (and direction) that is cheapest to reach
+# from the end of the path so far.
+def stitch(points, cluster_tours, blocked_routes=()):
+    if len(cluster_tours) == 1:
+        return list(cluster_tours[0])
+    blocked_from = {}
+    for from_index, to_index in blocked_routes:
+        blocked_from.setdefault(from_index, set()).add(to_index)
+    penalty = len(points) * float(np.ptp(points, axis=0).sum() + 1.0)
+
+    centroids = np.array([points[tour].mean(axis=0) for tour in cluster_tours])
+    centroid_matrix = np.hypot(*(centroids[:, None, :] - centroids[None, :, :]).transpose(2, 0, 1))
+    np.fill_diagonal(centroid_matrix, penalty)
+    order, _ = heuristic_tour(centroid_matrix) if len(cluster_tours) > 2 else (np.arange(2), None)
+
+    # Open the first cycle next to the second cluster
+    first = np.asarray(cluster_tours[order[0]])
+    k = int(np.argmin(np.hypot(*(points[first] - centroids[order[1]]).T)))
+    path = list(np.roll(first, -(k + 1)))
+
+    for c in order[1:]:
+        cycle = np.asarray(cluster_tours[c])
+        end = path[-1]
+        reach = np.hypot(*(points[cycle] - points[end]).T)
+        for target in blocked_from.get(end, ()):
+            reach[cycle == target] += penalty
+        d_prev = np.hypot(*(points[cycle] - points[np.roll(cycle, 1)]).T)
+        d_next = np.hypot(*(points[cycle] - points[np.roll(cycle, -1)]).T)
+        forward, backward = reach - d_prev, reach - d_next
+        if forward.min() <= backward.min():
+            k = int(np.argmin(forward))
+            path.extend(np.roll(cycle, -k).tolist())
+        else:
+            k = int(np.argmin(backward))
+            path.extend(np.roll(cycle[::-1], -(len(cycle) - 1 - k)).tolist())
+    return [int(city) for city in path]
+
+
+# Cluster, solve the clusters in parallel, stitch, then polish the joined
+# tour with 2-opt/Or-opt. A generator like anytime_tsp: the snapshots stream
+# the polishing phase and the final one carries the per-phase statistics.
+# A blocked route that is not a pair of stops raises ValueError.
+def solve_decomposed(positions, blocked_routes=(), cluster_size=200, method="kmeans", mip_limit=40,
+                     workers=None, cluster_time=2.0, polish_time=5.0, report_every=1.0):
+    points = np.asarray(positions, dtype=float)
+    blocked_routes = check_routes(len(points), blocked_routes)
+    workers = workers or os.cpu_count() or 1
+    timings = {}
+
+    start = time.perf_counter()
+    clusters = split_clusters(points, cluster_size, method)
+    timings["split"] = time.perf_counter() - start
+
+    # Blocked routes inside a cluster go to its sub-problem, in local indices
+    local = {}
+    for cluster_index, cluster in enumerate(clusters):
+        for local_index, city in enumerate(cluster.tolist()):
+            local[city] = (cluster_index, local_index)
+    cluster_blocked = [[] for _ in clusters]
+    for from_index, to_index in blocked_routes:
+        (c_from, i), (c_to, j) = local[from_index], local[to_index]
+        if c_from == c_to:
+            cluster_blocked[c_from].append((i, j))
+
+    start = time.perf_counter()
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=CONTEXT,
+        initializer=_init_worker,
+        initargs=(threads,),
+    ) as pool:
+        futures = [
+            pool.submit(solve_cluster, points[cluster], cluster_blocked[index], mip_limit, cluster_time)
+            for index, cluster in enumerate(clusters)
+        ]
+        solved = [future.result() for future in futures]
+    timings["clusters"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cluster_tours = [cluster[tour] for cluster, (tour, _, _) in zip(clusters, solved)]
+    joined = stitch(points, cluster_tours, blocked_routes)
+    timings["stitch"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for snapshot in anytime_tsp(points, blocked_routes, time_limit=polish_time,
+                                report_every=report_every, initial_tour=joined):
+        if snapshot["done"]:
+            timings["polish"] = time.perf_counter() - start
+            snapshot["timings"] = timings
+            snapshot["clusters"] = [
+                {"size": len(cluster), "method": how, "time": elapsed}
+                for cluster, (_, how, elapsed) in zip(clusters, solved)
+            ]
+        yield snapshot
@@ -0,0 +1,137 @@
+import math
+import os
+import time
+
+from gurobipy import GRB
+import numpy as np
+
+from tsp_heuristics import tour_arcs
+
+# Held-Karp dynamic programming: exact, in O(2^n n^2) time and O(2^n n)
+# memory, with no model to build and no license to check out. Faster than
+# the MIP on small instances; solve_tsp's "auto" formulation picks it up to
+# DP_MAX_NODES points when dp_memory fits in the memory budget. On random
+# Euclidean instances the lazy DFJ MIP is as fast from 14 points on (12 ms
+# each) and far faster at 18 (15 ms against 345 ms).
+DP_MAX_NODES = 13
+# Share of the available memory the tables may take
+DP_MEMORY_FRACTION = 0.5
+# Used when the available memory cannot be read
+DP_FALLBACK_MEMORY = 1 << 30
+
+
+# Bytes of the cost and predecessor tables for `num_vars` points, plus the
+# temporaries of the largest layer of subsets
+def dp_memory(num_vars):
+    if num_vars < 3:
+        return 0
+    nodes = num_vars - 1
+    largest_layer = math.comb(nodes, nodes // 2)
+    return (1 << nodes) * nodes * (8 + 1) + 3 * largest_layer * nodes * 8
+
+
+def available_memory():
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return DP_FALLBACK_MEMORY
+
+
+# Whether Held-Karp should run: at most `max_nodes` points (None for no
+# limit) and tables within the memory budget
+def dp_fits(num_vars, max_nodes=DP_MAX_NODES):
+    if max_nodes is not None and num_vars > max_nodes:
+        return False
+    return dp_memory(num_vars) <= DP_MEMORY_FRACTION * available_memory()
+
+
+# Masks of every subset of `nodes` bits, grouped by their number of bits
+def _layers(nodes):
+    masks = np.arange(1 << nodes, dtype=np.int64)
+    sizes = np.zeros(len(masks), dtype=np.int64)
+    for bit in range(nodes):
+        sizes += (masks >> bit) & 1
+    order = np.argsort(sizes, kind="stable")
+    bounds = np.searchsorted(sizes[order], np.arange(nodes + 2))
+    return [order[bounds[size]:bounds[size + 1]] for size in range(nodes + 1)]
+
+
+# Optimal tour over the (possibly asymmetric) distances dict, blocked routes
+# and missing arcs counting as infinite. Point 0 starts the tour; point k is
+# bit k - 1 of the subset masks. Returns the same dict as optimize_tsp, with
+# status INFEASIBLE when every tour uses an infinite arc. Raises MemoryError
+# rather than start tables that do not fit in the memory budget.
+def held_karp(num_vars, distances, blocked_routes=()):
+    start = time.perf_counter()
+    result = {
+        "formulation": "dp",
+        "status": GRB.INFEASIBLE,
+        "objective": None,
+        "itinerary": [],
+        "cuts": 0,
+        "solve_time": 0.0,
+        "nodes": 0,
+        "arcs": len(distances),
+        "symmetric": False,
+        "heuristic": None,
+        "heuristic_time": 0.0,
+        "heuristic_gap": None,
+        "gap": None,
+    }
+    needed = dp_memory(num_vars)
+    budget = DP_MEMORY_FRACTION * available_memory()
+    if needed > budget:
+        raise MemoryError(
+            f"Held-Karp on {num_vars} points needs {needed / 2**20:.0f} MiB, "
+            f"more than the {budget / 2**20:.0f} MiB budget"
+        )
+
+    D = np.full((num_vars, num_vars), np.inf)
+    if distances:
+        arcs = np.array(list(distances.keys()), dtype=np.int64)
+        D[arcs[:, 0], arcs[:, 1]] = list(distances.values())
+    for from_index, to_index in blocked_routes:
+        D[from_index, to_index] = np.inf
+
+    if num_vars < 3:
+        tour = list(range(num_vars))
+        length = float(sum(D[i, j] for i, j in tour_arcs(tour))) if num_vars == 2 else 0.0
+    else:
+        nodes = num_vars - 1
+        # cost[mask, j]: shortest path from 0 through the points of mask, ending at point j + 1
+        cost = np.full((1 << nodes, nodes), np.inf)
+        parent = np.full((1 << nodes, nodes), -1, dtype=np.int8)
+        singles = np.arange(nodes)
+        cost[1 << singles, singles] = D[0, 1:]
+        inner = D[1:, 1:]
+        for layer in _layers(nodes)[2:]:
+            for j in range(nodes):
+                masks = layer[(layer >> j) & 1 == 1]
+                previous = masks ^ (1 << j)
+                # Paths ending at a point outside `previous` are inf already
+                totals = cost[previous] + inner[:, j]
+                best = np.argmin(totals, axis=1)
+                cost[masks, j] = totals[np.arange(len(masks)), best]
+                parent[masks, j] = best
+        full = (1 << nodes) - 1
+        closing = cost[full] + D[1:, 0]
+        last = int(np.argmin(closing))
+        length = float(closing[last])
+        tour, mask = [], full
+        while last >= 0:
+            tour.append(last + 1)
+            mask, last = mask ^ (1 << last), int(parent[mask, last])
+        tour = [0] + tour[::-1]
+
+    result["solve_time"] = time.perf_counter() - start
+    if np.isfinite(length):
+        result.update(status=GRB.OPTIMAL, objective=length, itinerary=tour_arcs(tour) if num_vars > 1 else [],
+                      gap=0.0)
+    return result
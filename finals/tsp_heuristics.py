@@ -0,0 +1,130 @@
+import numpy as np
+
+
+# Dense distance matrix from the {(i, j): distance} dict used by the pages.
+# Blocked routes (and the diagonal) get a finite penalty larger than any
+# feasible tour, so the heuristics avoid them whenever they can.
+def distance_matrix(num_vars, distances, blocked_routes=()):
+    D = np.zeros((num_vars, num_vars))
+    for (i, j), dist in distances.items():
+        D[i, j] = dist
+    penalty = blocked_penalty(D)
+    np.fill_diagonal(D, penalty)
+    for from_index, to_index in blocked_routes:
+        D[from_index, to_index] = penalty
+    return D
+
+
+# Blocked routes as (from, to) pairs of distinct stops 0..num_vars - 1, or a
+# ValueError naming the first route that is not one
+def check_routes(num_vars, blocked_routes):
+    routes = []
+    for route in blocked_routes:
+        try:
+            from_index, to_index = route
+        except (TypeError, ValueError):
+            raise ValueError(f"Blocked route {route!r} is not a (from, to) pair") from None
+        if not all(isinstance(index, (int, np.integer)) for index in (from_index, to_index)):
+            raise ValueError(f"Blocked route {route!r} is not a pair of stop indices")
+        if not (0 <= from_index < num_vars and 0 <= to_index < num_vars):
+            raise ValueError(f"Blocked route {from_index}-{to_index} is not between stops 0 to {num_vars - 1}")
+        if from_index == to_index:
+            raise ValueError(f"Blocked route {from_index}-{to_index} starts and ends at the same stop")
+        routes.append((int(from_index), int(to_index)))
+    return routes
+
+
+def blocked_penalty(D):
+    return (len(D) + 1) * (float(np.max(D)) + 1.0)
+
+
+def tour_arcs(tour):
+    return [(int(tour[k]), int(tour[(k + 1) % len(tour)])) for k in range(len(tour))]
+
+
+def tour_length(D, tour):
+    tour = np.asarray(tour)
+    return float(D[tour, np.roll(tour, -1)].sum())
+
+
+def nearest_neighbour(D, start=0):
+    n = len(D)
+    visited = np.zeros(n, dtype=bool)
+    tour = [start]
+    visited[start] = True
+    for _ in range(n - 1):
+        row = np.where(visited, np.inf, D[tour[-1]])
+        city = int(np.argmin(row))
+        tour.append(city)
+        visited[city] = True
+    return np.array(tour)
+
+
+# 2-opt: reverse tour[i+1..j]. Prefix sums of the forward and backward arc
+# costs keep the move exact for asymmetric matrices, and every j is scored
+# at once for a given i.
+def two_opt(D, tour):
+    tour = np.array(tour)
+    n = len(tour)
+    improved = True
+    while improved:
+        improved = False
+        nxt = np.roll(tour, -1)
+        fwd = np.concatenate(([0.0], np.cumsum(D[tour, nxt])))
+        bwd = np.concatenate(([0.0], np.cumsum(D[nxt, tour])))
+        for i in range(n - 2):
+            j = np.arange(i + 2, n if i > 0 else n - 1)
+            if len(j) == 0:
+                continue
+            a, b = tour[i], tour[i + 1]
+            c, d = tour[j], nxt[j]
+            delta = (
+                D[a, c] + D[b, d] + (bwd[j] - bwd[i + 1])
+                - D[a, b] - D[c, d] - (fwd[j] - fwd[i + 1])
+            )
+            k = int(np.argmin(delta))
+            if delta[k] < -1e-9:
+                tour[i + 1:j[k] + 1] = tour[i + 1:j[k] + 1][::-1].copy()
+                improved = True
+                break
+    return tour
+
+
+# Or-opt: move a segment of 1 to max_segment cities to the best other
+# position in the tour, scoring all insertion points at once.
+def or_opt(D, tour, max_segment=3):
+    tour = np.array(tour)
+    n = len(tour)
+    improved = True
+    while improved:
+        improved = False
+        for length in range(1, min(max_segment, n - 3) + 1):
+            for i in range(n):
+                rotated = np.roll(tour, -i)
+                segment, rest = rotated[:length], rotated[length:]
+                first, last = segment[0], segment[-1]
+                prev, nxt = rest[-1], rest[0]
+                removal_gain = D[prev, first] + D[last, nxt] - D[prev, nxt]
+                a, b = rest[:-1], rest[1:]
+                insertion_cost = D[a, first] + D[last, b] - D[a, b]
+                k = int(np.argmin(insertion_cost))
+                if insertion_cost[k] - removal_gain < -1e-9:
+                    tour = np.concatenate((rest[:k + 1], segment, rest[k + 1:]))
+                    improved = True
+                    break
+            if improved:
+                break
+    return tour
+
+
+# Nearest neighbour construction followed by 2-opt and Or-opt until neither improves
+def heuristic_tour(D, start=0):
+    tour = nearest_neighbour(D, start)
+    length = tour_length(D, tour)
+    while True:
+        tour = or_opt(D, two_opt(D, tour))
+        new_length = tour_length(D, tour)
+        if new_length >= length - 1e-9:
+            break
+        length = new_length
+    return tour, length
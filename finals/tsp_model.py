@@ -0,0 +1,449 @@
+import math
+import time
+
+import gurobipy as gp
+from gurobipy import GRB
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+
+from linear_model import linear_problem
+from solver_env import new_model
+from tsp_anytime import anytime_tsp
+from tsp_dp import dp_fits, held_karp
+from tsp_heuristics import distance_matrix, heuristic_tour, tour_arcs
+
+FORMULATIONS = {
+    "dfj": "Lazy DFJ cuts (callback)",
+    "mtz": "Miller-Tucker-Zemlin (MTZ)",
+    "dp": "Held-Karp dynamic programming (no MIP)",
+}
+
+
+# "auto": Held-Karp when the instance is small enough for its tables, else
+# the MIP with lazy DFJ cuts; any other formulation is kept
+def pick_formulation(num_vars, formulation="auto"):
+    if formulation != "auto":
+        return formulation
+    return "dp" if dp_fits(num_vars) else "dfj"
+
+
+# Split the arcs of an integer solution into its cycles (each node has one successor)
+def find_subtours(num_vars, arcs):
+    successor = {i: j for i, j in arcs}
+    unvisited = set(range(num_vars))
+    cycles = []
+    while unvisited:
+        start = unvisited.pop()
+        cycle = [start]
+        node = successor.get(start)
+        while node is not None and node != start:
+            unvisited.discard(node)
+            cycle.append(node)
+            node = successor.get(node)
+        cycles.append(cycle)
+    return cycles
+
+
+# Same for the edges of an undirected solution, where every node has degree 2
+def find_edge_subtours(num_vars, edges):
+    neighbours = {i: [] for i in range(num_vars)}
+    for i, j in edges:
+        neighbours[i].append(j)
+        neighbours[j].append(i)
+    unvisited = set(range(num_vars))
+    cycles = []
+    while unvisited:
+        start = min(unvisited)
+        unvisited.remove(start)
+        cycle, previous, node = [start], None, start
+        while True:
+            following = [j for j in neighbours[node] if j != previous]
+            if not following or following[0] == start:
+                break
+            previous, node = node, following[0]
+            unvisited.discard(node)
+            cycle.append(node)
+        cycles.append(cycle)
+    return cycles
+
+
+# Symmetric instance: every distance equals its reverse and every blocked
+# route is blocked both ways, so the direction of travel does not matter
+def is_symmetric(distances, blocked_routes=(), tolerance=1e-9):
+    blocked = set(map(tuple, blocked_routes))
+    if any((j, i) not in blocked for i, j in blocked):
+        return False
+    return all(abs(dist - distances.get((j, i), math.inf)) <= tolerance for (i, j), dist in distances.items())
+
+
+# Lazy constraint callback: cut off every subtour of an integer incumbent
+def subtour_callback(model, where):
+    if where != GRB.Callback.MIPSOL:
+        return
+    values = model.cbGetSolution(model._x)
+    selected = [arc for arc, value in values.items() if value > 0.5]
+    split = find_edge_subtours if model._symmetric else find_subtours
+    for cycle in split(model._num_vars, selected):
+        if len(cycle) == model._num_vars:
+            continue
+        # DFJ: at most |S| - 1 arcs (or edges) may stay inside the set S
+        model.cbLazy(
+            gp.quicksum(model._x[(i, j)] for i in cycle for j in cycle if (i, j) in model._x)
+            <= len(cycle) - 1
+        )
+        model._cuts += 1
+        model._cycles.append(cycle)
+
+
+# Assignment part of build_tsp_model as a linear_problem, e.g. to show its
+# formulation: one binary per arc, a leave and an enter row per node (rows
+# 2i and 2i + 1), blocked arcs fixed to 0. Returns the problem and the arcs in
+# column order.
+def assignment_problem(num_vars, distances, blocked_routes=()):
+    arcs = list(distances)
+    tails, heads = np.array(arcs, dtype=np.int64).reshape(-1, 2).T
+    columns = np.arange(len(arcs))
+    A = coo_matrix(
+        (np.ones(2 * len(arcs)), (np.concatenate((2 * tails, 2 * heads + 1)), np.concatenate((columns, columns)))),
+        shape=(2 * num_vars, len(arcs)),
+    )
+    blocked = set(map(tuple, blocked_routes))
+    ub = np.array([0.0 if arc in blocked else 1.0 for arc in arcs])
+    problem = linear_problem(
+        list(distances.values()), A, ["="] * (2 * num_vars), np.ones(2 * num_vars), ub=ub, vtype="B", name="TSP"
+    )
+    return problem, arcs
+
+
+def build_tsp_model(num_vars, distances, blocked_routes, formulation="dfj", start_tour=None):
+    m = new_model("TSP")
+
+    x = m.addVars(
+        distances.keys(),
+        vtype=GRB.BINARY,
+        name="x"
+    )
+    # Set objective function
+    m.setObjective(
+        gp.quicksum(distances[(i, j)] * x[(i, j)] for i, j in distances),
+        GRB.MINIMIZE,
+    )
+
+    # Add constraints
+    for i in range(num_vars):
+        # Ensure each variable is left once
+        m.addConstr(x.sum(i, "*") == 1, name=f"leave_{i}")
+        # Ensure each variable is entered once
+        m.addConstr(x.sum("*", i) == 1, name=f"enter_{i}")
+
+    m._x = x
+    m._num_vars = num_vars
+    m._symmetric = False
+    m._cuts = 0
+    m._cycles = []
+
+    if formulation == "mtz":
+        u = m.addVars(num_vars, vtype=GRB.CONTINUOUS, name="u")
+        # Subtour elimination constraints, city 0 is the starting point
+        for i, j in x:
+            if i != 0 and j != 0:
+                m.addConstr(u[i] - u[j] + num_vars * x[(i, j)] <= num_vars - 1, name=f"subtour_{i}_{j}")
+                m._cuts += 1
+    elif formulation == "dfj":
+        # Subtours are cut off lazily by subtour_callback
+        m.Params.LazyConstraints = 1
+    else:
+        raise ValueError(f"Unknown TSP formulation: {formulation}")
+
+    # Add constraints for blocked routes
+    for from_index, to_index in blocked_routes:
+        m.addConstr(x[(from_index, to_index)] == 0, name=f"blocked_route_{from_index}_{to_index}")
+
+    # MIP start from a heuristic tour
+    if start_tour is not None:
+        start_arcs = set(tour_arcs(start_tour))
+        for arc in x:
+            x[arc].Start = 1 if arc in start_arcs else 0
+
+    return m, x
+
+
+# Undirected model for symmetric instances: one binary per edge i < j and a
+# degree of 2 at every node, half the variables of the directed model and a
+# tighter relaxation. Subtours are always cut lazily (MTZ needs a direction).
+def build_symmetric_tsp_model(num_vars, distances, blocked_routes, start_tour=None):
+    m = new_model("TSP")
+
+    blocked = set(map(tuple, blocked_routes))
+    edges = [(i, j) for i, j in distances if i < j and (i, j) not in blocked]
+    x = m.addVars(edges, vtype=GRB.BINARY, name="x")
+    m.setObjective(gp.quicksum(distances[edge] * x[edge] for edge in edges), GRB.MINIMIZE)
+
+    # Every variable is joined to exactly two others
+    for i in range(num_vars):
+        m.addConstr(x.sum(i, "*") + x.sum("*", i) == 2, name=f"degree_{i}")
+
+    m._x = x
+    m._num_vars = num_vars
+    m._symmetric = True
+    m._cuts = 0
+    m._cycles = []
+    m.Params.LazyConstraints = 1
+
+    if start_tour is not None:
+        start_edges = {(min(i, j), max(i, j)) for i, j in tour_arcs(start_tour)}
+        for edge in x:
+            x[edge].Start = 1 if edge in start_edges else 0
+
+    return m, x
+
+
+# Heuristic tour to warm start the MIP, or None if it could not avoid the blocked routes
+def warm_start_tour(num_vars, distances, blocked_routes):
+    D = distance_matrix(num_vars, distances, blocked_routes)
+    tour, length = heuristic_tour(D)
+    if set(tour_arcs(tour)) & set(blocked_routes):
+        return None, None
+    return tour, length
+
+
+# symmetric=None picks the undirected model by itself when the instance allows
+# it. The "dp" formulation (or "auto" on a small instance) needs no model.
+def solve_tsp(num_vars, distances, blocked_routes, formulation="dfj", warm_start=True, symmetric=None,
+              callback=None):
+    formulation = pick_formulation(num_vars, formulation)
+    if formulation == "dp":
+        return held_karp(num_vars, distances, blocked_routes)
+    start = time.perf_counter()
+    start_tour, heuristic_length = None, None
+    if warm_start:
+        start_tour, heuristic_length = warm_start_tour(num_vars, distances, blocked_routes)
+    heuristic_time = time.perf_counter() - start
+
+    if symmetric is None:
+        symmetric = formulation == "dfj" and num_vars > 2 and is_symmetric(distances, blocked_routes)
+    if symmetric:
+        m, x = build_symmetric_tsp_model(num_vars, distances, blocked_routes, start_tour)
+    else:
+        m, x = build_tsp_model(num_vars, distances, blocked_routes, formulation, start_tour)
+    result = optimize_tsp(m, x, formulation, callback)
+    result.update(heuristic=heuristic_length, heuristic_time=heuristic_time)
+    return with_heuristic_gap(result)
+
+
+# `callback` runs on every callback call, after the subtour cuts. A solve
+# stopped early (time limit, terminate()) still returns its best tour.
+def optimize_tsp(m, x, formulation, callback=None):
+    start = time.perf_counter()
+    if formulation == "dfj" and callback is not None:
+        m.optimize(lambda model, where: (subtour_callback(model, where), callback(model, where)))
+    elif formulation == "dfj":
+        m.optimize(subtour_callback)
+    else:
+        m.optimize(callback)
+    solve_time = time.perf_counter() - start
+
+    result = {
+        "formulation": formulation,
+        "status": m.status,
+        "objective": None,
+        "itinerary": [],
+        "cuts": m._cuts,
+        "solve_time": solve_time,
+        "nodes": m.NodeCount,
+        "arcs": len(x),
+        "symmetric": m._symmetric,
+        "heuristic": None,
+        "heuristic_time": 0.0,
+        "heuristic_gap": None,
+        "gap": None,
+    }
+    if m.SolCount:
+        result["objective"] = m.objVal
+        result["gap"] = m.MIPGap
+        selected = [arc for arc in x if x[arc].x > 0.5]
+        if m._symmetric:
+            # Travel the cycle in one direction
+            selected = tour_arcs(find_edge_subtours(m._num_vars, selected)[0])
+        result["itinerary"] = selected
+    return result
+
+
+def with_heuristic_gap(result):
+    if result["objective"] is not None and result["heuristic"] is not None and result["objective"] > 0:
+        result["heuristic_gap"] = max(0.0, (result["heuristic"] - result["objective"]) / result["objective"])
+    return result
+
+
+# Sparse candidate arcs: both directions of every k-nearest-neighbour pair
+# from a KD-tree plus the arcs of a heuristic tour, without the blocked routes
+def candidate_arcs(positions, k, tour=None, blocked_routes=()):
+    points = np.asarray(positions, dtype=float)
+    k = min(k, len(points) - 1)
+    _, neighbours = cKDTree(points).query(points, k=k + 1)
+    arcs = set()
+    for i, row in enumerate(neighbours.tolist()):
+        for j in row:
+            if i != j:
+                arcs.add((i, j))
+                arcs.add((j, i))
+    if tour is not None:
+        arcs.update(tour_arcs(tour))
+    arcs.difference_update(map(tuple, blocked_routes))
+    return arcs
+
+
+# LP relaxation over the candidate arcs with DFJ cuts: the given subtours plus
+# any set found disconnected in the LP support. Every missing arc with a
+# negative reduced cost is priced in (and added to `arcs`) until the LP is
+# optimal for the full graph. Returns the LP bound and a function giving the
+# reduced costs of one row of arcs, or None when the arcs admit no assignment.
+def subtour_lp(points, arcs, blocked, subtours=()):
+    n = len(points)
+    lp = new_model("TSP pricing")
+    lp.Params.OutputFlag = 0
+    y = lp.addVars(arcs, obj={arc: euclidean(points, arc) for arc in arcs}, name="y")
+    leave = [lp.addConstr(y.sum(i, "*") == 1) for i in range(n)]
+    enter = [lp.addConstr(y.sum("*", i) == 1) for i in range(n)]
+    cuts, members = [], []
+
+    def add_cut(subset):
+        inside = np.zeros(n, dtype=bool)
+        inside[list(subset)] = True
+        expr = gp.quicksum(var for (i, j), var in y.items() if inside[i] and inside[j])
+        cuts.append(lp.addConstr(expr <= len(subset) - 1))
+        members.append(inside)
+
+    for subset in subtours:
+        add_cut(subset)
+
+    while True:
+        lp.optimize()
+        if lp.status != GRB.OPTIMAL:
+            return None
+
+        # Separate subtours from the components of the LP support
+        found = False
+        arcs_list = list(y.keys())
+        values = np.array([var.X for var in y.values()])
+        rows = np.array([i for i, _ in arcs_list])
+        cols = np.array([j for _, j in arcs_list])
+        for threshold in (0.99, 0.5, 0.2, 1e-6):
+            keep = values >= threshold
+            graph = coo_matrix((values[keep], (rows[keep], cols[keep])), shape=(n, n))
+            count, labels = connected_components(graph, directed=True, connection="weak")
+            if count == 1:
+                continue
+            for label in range(count):
+                inside = labels == label
+                if inside.sum() < 2:
+                    continue
+                within = values[inside[rows] & inside[cols]].sum()
+                if within > inside.sum() - 1 + 1e-6:
+                    add_cut(np.flatnonzero(inside).tolist())
+                    found = True
+            if found:
+                break
+        if found:
+            continue
+
+        u = np.array([c.Pi for c in leave])
+        v = np.array([c.Pi for c in enter])
+        w = np.array([c.Pi for c in cuts])
+        membership = np.array(members) if members else np.zeros((0, n), dtype=bool)
+
+        # Reduced cost c_ij - u_i - v_j - sum of the duals of the cuts holding i and j
+        def reduced_costs(i):
+            row = np.hypot(*(points - points[i]).T) - u[i] - v
+            holding = membership[:, i]
+            if holding.any():
+                row -= w[holding] @ membership[holding]
+            return row
+
+        priced = missing_arcs(n, arcs, blocked, reduced_costs, 0.0)
+        if not priced:
+            return lp.objVal, reduced_costs
+        arcs.update(priced)
+        for i, j in priced:
+            holding = [c for c, inside in zip(cuts, members) if inside[i] and inside[j]]
+            column = gp.Column([1.0, 1.0] + [1.0] * len(holding), [leave[i], enter[j]] + holding)
+            y[(i, j)] = lp.addVar(obj=euclidean(points, (i, j)), column=column, name=f"y[{i},{j}]")
+
+
+# Missing arcs whose reduced cost is below the threshold, one row at a time
+# so memory stays O(n)
+def missing_arcs(n, arcs, blocked, reduced_costs, threshold):
+    found = set()
+    for i in range(n):
+        for j in np.flatnonzero(reduced_costs(i) < threshold - 1e-9).tolist():
+            if j != i and (i, j) not in arcs and (i, j) not in blocked:
+                found.add((i, j))
+    return found
+
+
+def euclidean(points, arc):
+    i, j = arc
+    return math.hypot(*(points[i] - points[j]).tolist())
+
+
+# MIP over the sparse candidate arcs. After each solve, every missing arc whose
+# reduced cost in the assignment LP could still beat the incumbent
+# (LP bound + reduced cost < objective) is added back and the model re-solved,
+# so the final tour is optimal for the full graph.
+def solve_tsp_sparse(positions, blocked_routes, formulation="dfj", k=5, warm_start=True, callback=None):
+    points = np.asarray(positions, dtype=float)
+    n = len(points)
+    blocked = set(map(tuple, blocked_routes))
+
+    start = time.perf_counter()
+    start_tour, heuristic_length = None, None
+    if warm_start:
+        *_, snapshot = anytime_tsp(points, blocked_routes, time_limit=min(1.0, 1e-3 * n))
+        if snapshot["blocked_used"] == 0:
+            start_tour, heuristic_length = snapshot["tour"], snapshot["length"]
+    heuristic_time = time.perf_counter() - start
+
+    arcs = candidate_arcs(points, k, start_tour, blocked)
+    all_arcs = n * (n - 1) - len(blocked)
+    pricing_rounds, total_time = 0, 0.0
+    while True:
+        distances = {arc: euclidean(points, arc) for arc in arcs}
+        m, x = build_tsp_model(n, distances, [], formulation, start_tour)
+        result = optimize_tsp(m, x, formulation, callback)
+        total_time += result["solve_time"]
+        if result["status"] == GRB.INTERRUPTED:
+            break
+        if result["objective"] is None:
+            if len(arcs) < all_arcs:
+                # The candidate graph has no tour at all: fall back to every arc
+                arcs = {(i, j) for i in range(n) for j in range(n) if i != j} - blocked
+                continue
+            break
+
+        size = len(arcs)
+        relaxation = subtour_lp(points, arcs, blocked, m._cycles)
+        if relaxation is not None:
+            lp_bound, reduced_costs = relaxation
+            arcs.update(missing_arcs(n, arcs, blocked, reduced_costs, result["objective"] - lp_bound))
+        if len(arcs) == size:
+            break
+        pricing_rounds += 1
+        start_tour = tour_from_arcs(result["itinerary"])
+
+    result.update(
+        solve_time=total_time,
+        pricing_rounds=pricing_rounds,
+        heuristic=heuristic_length,
+        heuristic_time=heuristic_time,
+    )
+    return with_heuristic_gap(result)
+
+
+def tour_from_arcs(arcs):
+    successor = dict(arcs)
+    tour = [0]
+    while len(tour) < len(successor):
+        tour.append(successor[tour[-1]])
+    return tour
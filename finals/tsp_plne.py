@@ -1,12 +1,158 @@
+import os
+import time
 import streamlit as st
 import gurobipy as gp
-from gurobipy import Model, GRB
-import math
-import matplotlib.pyplot as plt
+from gurobipy import GRB
+import numpy as np
+import pandas as pd
+
+from background_solve import job_panel, job_running, start_job
+from distance_engine import distance_dict, euclidean_matrix, matrix_summary
+from solve_cache import cache_badge, store_summary, tsp_cached
+from tsp_anytime import anytime_tsp
+from formulation_view import formulation_panel
+from tsp_dp import DP_MAX_NODES
+from tsp_heuristics import check_routes
+from tsp_model import FORMULATIONS, assignment_problem, pick_formulation, solve_tsp, solve_tsp_sparse, tour_from_arcs
+from tsp_race import PORTFOLIO, race_tsp
 
 # Title
 st.title("TSP Optimization Problem Solver")
 
+solver_mode = st.radio("Solver mode:", ["Exact (MIP)", "Heuristic (large instances)"], key="solver_mode")
+
+# Heuristic mode: thousands of points, anytime local search with a time budget
+if solver_mode == "Heuristic (large instances)":
+    st.header("Large Traveling Salesman Problem (TSP)")
+    source = st.radio("Points:", ["Upload CSV", "Random points"], key="points_source")
+    positions = None
+    if source == "Upload CSV":
+        uploaded = st.file_uploader("CSV file with x and y columns", type="csv", key="points_csv")
+        if uploaded is not None:
+            try:
+                positions = pd.read_csv(uploaded)[["x", "y"]].to_numpy(dtype=float)
+            except KeyError:
+                st.error("The CSV file needs an x and a y column.")
+            except ValueError as error:
+                st.error(f"Could not read the points: {error}")
+            if positions is not None and (len(positions) < 3 or not np.isfinite(positions).all()):
+                st.error("The CSV file needs at least 3 points, each with a number in x and y.")
+                positions = None
+    else:
+        num_points = st.number_input("Number of points:", value=1000, step=1000, min_value=5, max_value=50000)
+        seed = st.number_input("Seed:", value=0, step=1, min_value=0)
+        positions = np.random.default_rng(int(seed)).random((int(num_points), 2)) * 1000
+
+    # Checked before anything is solved: a bad line is reported, not run
+    blocked_text = st.text_area("Blocked routes, one `from,to` pair of point indices per line:", key="blocked_text")
+    blocked_routes, route_errors = [], []
+    for number, line in enumerate(blocked_text.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            from_index, to_index = (int(value) for value in line.split(","))
+        except ValueError:
+            route_errors.append(f"Line {number}: `{line.strip()}` is not a `from,to` pair of point indices.")
+            continue
+        blocked_routes.append((from_index, to_index))
+    if positions is not None and not route_errors:
+        try:
+            check_routes(len(positions), blocked_routes)
+        except ValueError as error:
+            route_errors.append(f"{error}.")
+    for error in route_errors:
+        st.error(error)
+    SPARSE_MIP = "Exact MIP over candidate arcs (pricing)"
+    engine = st.radio(
+        "Engine:", ["Anytime local search", "Cluster decomposition (parallel)", SPARSE_MIP], key="engine"
+    )
+    if engine == "Cluster decomposition (parallel)":
+        # Loaded on first use, with its clustering and process pool
+        from tsp_decompose import CLUSTER_METHODS, solve_decomposed
+        cluster_method = st.selectbox(
+            "Clustering:", list(CLUSTER_METHODS), format_func=CLUSTER_METHODS.get, key="cluster_method"
+        )
+        cluster_size = st.number_input("Points per cluster:", value=200, step=50, min_value=10, key="cluster_size")
+        mip_limit = st.number_input("Solve clusters up to this size exactly (MIP):", value=40, step=5, min_value=0)
+        workers = st.number_input("Worker processes:", value=os.cpu_count() or 1, step=1, min_value=1)
+        cluster_time = st.number_input("Heuristic budget per cluster (seconds):", value=1.0, step=0.5, min_value=0.1)
+    elif engine == SPARSE_MIP:
+        # Variables for the k nearest neighbour arcs only; pricing adds back
+        # the missing arcs that could still improve the tour
+        k_nearest = st.number_input("Nearest neighbours per point (k):", value=5, step=1, min_value=1, key="k_nearest")
+    time_limit = st.number_input("Time budget (seconds):", value=10.0, step=5.0, min_value=1.0)
+
+    if positions is not None and st.button("Run Heuristic", disabled=bool(route_errors)):
+        import matplotlib.pyplot as plt
+        if engine == "Cluster decomposition (parallel)":
+            runs = solve_decomposed(
+                positions, blocked_routes, cluster_size=cluster_size, method=cluster_method, mip_limit=mip_limit,
+                workers=workers, cluster_time=cluster_time, polish_time=time_limit,
+            )
+        elif engine == SPARSE_MIP:
+            started = time.perf_counter()
+            deadline = started + time_limit
+
+            # The time budget stops the MIP, which keeps its best tour
+            def stop_at_deadline(model, where):
+                if time.perf_counter() > deadline:
+                    model.terminate()
+
+            try:
+                result = solve_tsp_sparse(positions, blocked_routes, "dfj", k_nearest, callback=stop_at_deadline)
+            except gp.GurobiError as error:
+                # e.g. thousands of candidate arcs on a size-limited license
+                st.error(f"Gurobi error: {error}")
+                st.stop()
+            if not result["itinerary"]:
+                st.error("No tour found within the time budget.")
+                st.stop()
+            runs = [{
+                "tour": tour_from_arcs(result["itinerary"]),
+                "length": result["objective"],
+                "elapsed": time.perf_counter() - started,
+                "blocked_used": 0,
+                "result": result,
+            }]
+        else:
+            runs = anytime_tsp(positions, blocked_routes, time_limit=time_limit)
+        progress = st.empty()
+        for snapshot in runs:
+            # Stream the best tour found so far
+            with progress.container():
+                st.write(f"Best tour: {snapshot['length']:.2f} after {snapshot['elapsed']:.1f} s")
+                tour = snapshot["tour"] + snapshot["tour"][:1]
+                fig, ax = plt.subplots(figsize=(8, 6))
+                ax.plot(positions[tour, 0], positions[tour, 1], "r-", lw=0.5)
+                ax.scatter(positions[:, 0], positions[:, 1], color="blue", s=2, zorder=5)
+                ax.set_title("TSP Itinerary")
+                st.pyplot(fig)
+                plt.close(fig)
+        st.success(f"Best tour found: {snapshot['length']:.2f}")
+        if "timings" in snapshot:
+            methods = [cluster["method"] for cluster in snapshot["clusters"]]
+            st.write(
+                f"{len(methods)} clusters: {methods.count('MIP')} solved by MIP, "
+                f"{methods.count('heuristic')} by the heuristic"
+            )
+            st.table({phase: f"{seconds:.2f} s" for phase, seconds in snapshot["timings"].items()})
+        if "result" in snapshot:
+            result = snapshot["result"]
+            if result["status"] == GRB.OPTIMAL:
+                st.write("Proved optimal for the complete graph.")
+            elif result["gap"] is not None:
+                st.warning(f"Stopped at the time budget, within {result['gap']:.2%} of the bound.")
+            st.write(
+                f"{result['arcs']} of {len(positions) * (len(positions) - 1)} arcs in the model after "
+                f"{result['pricing_rounds']} pricing rounds"
+            )
+        if snapshot["blocked_used"]:
+            st.warning(f"The tour still uses {snapshot['blocked_used']} blocked route(s).")
+        st.download_button(
+            "Download tour", "\n".join(map(str, snapshot["tour"])), file_name="tour.csv"
+        )
+    st.stop()
+
 # Number of variables
 st.header("Traveling Salesman Problem (TSP)")
 num_vars = st.number_input("Enter the number of variables:", value=3, step=1, min_value=2, max_value=10)
@@ -28,16 +174,25 @@ for i in range(num_vars):
 
 # Calculate Distance Matrix
 st.subheader("Calculated Distance Matrix")
-distances = {}
-for i in range(num_vars):
-    for j in range(num_vars):
-        if i != j:
-            dist = math.sqrt(
-                (variable_positions[i][0] - variable_positions[j][0]) ** 2 +
-                (variable_positions[i][1] - variable_positions[j][1]) ** 2
-            )
-            distances[(i, j)] = dist
-            st.write(f"Distance from {variable_names[i]} to {variable_names[j]}: {dist:.2f}")
+distance_table = euclidean_matrix(variable_positions)
+distances = distance_dict(distance_table)
+
+summary = matrix_summary(distance_table)
+st.write(
+    f"{summary['points']} points, {summary['pairs']} routes, "
+    f"distances from {summary['min']:.2f} to {summary['max']:.2f} (mean {summary['mean']:.2f})"
+)
+with st.expander("Show distance table"):
+    page_size = 50
+    page = st.number_input(
+        "Page:", value=1, step=1, min_value=1, max_value=(num_vars - 1) // page_size + 1, key="distance_page"
+    )
+    first = (page - 1) * page_size
+    st.dataframe(pd.DataFrame(
+        distance_table[first:first + page_size],
+        index=variable_names[first:first + page_size],
+        columns=variable_names,
+    ).round(2))
 
 # blocked routes
 st.subheader("Blocked Routes")
@@ -73,24 +228,22 @@ st.header("Mathematical Formulation ")
 objective_function = "Minimize: \\sum_{i \\neq j} d_{ij} x_{ij}"
 st.latex(objective_function)
 
-# Constraints
-st.write("Subject to:")
-constraints_text = []
-for i in range(num_vars):
-    # Constraint for visiting each variable exactly once
-    constraints_text.append(f"\\sum_{{j \\neq {i}}} x_{{i,j}} = 1")
-    constraints_text.append(f"\\sum_{{j \\neq {i}}} x_{{j,i}} = 1")
-
-# Display constraints dynamically
-for constraint in constraints_text:
-    st.latex(constraint)
-
-st.latex("x_{ij} \\in \\{0, 1\\} \\quad \\forall i, j")
+# Each variable is left once and entered once; subtours are eliminated below.
+# The rows are read from the model's matrix and rendered on demand.
+assignment, arcs = assignment_problem(num_vars, distances, blocked_routes)
+formulation_panel(
+    assignment,
+    "tsp_formulation",
+    row_names=[f"{kind} {name}" for name in variable_names for kind in ("leave", "enter")],
+    variables=[f"x_{{{i},{j}}}" for i, j in arcs],
+)
 
 col1, col2, col3 = st.columns([1, 3, 1])
 
 # Function to plot positions and itinerary
 def plot_itinerary(variable_positions, variable_names, itinerary):
+    # matplotlib is only loaded once there is a tour to draw
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(8, 6))
     x_coords = [pos[0] for pos in variable_positions]
     y_coords = [pos[1] for pos in variable_positions]
@@ -113,56 +266,126 @@ def plot_itinerary(variable_positions, variable_names, itinerary):
     plt.grid(True)
     st.pyplot(plt)
 
+# Subtour elimination method
+st.subheader("Subtour Elimination")
+AUTOMATIC = f"Automatic (Held-Karp up to {DP_MAX_NODES} points, lazy DFJ cuts above)"
+RACE = "Race several configurations"
+formulation_choice = st.selectbox(
+    "Formulation:", [AUTOMATIC] + list(FORMULATIONS.values()) + ["Compare all", RACE], key="formulation"
+)
+race_configs, race_deadline = (), None
+if formulation_choice == RACE:
+    # Every configuration runs in its own process on a share of the cores; the
+    # heuristic's tours are handed to the MIP runs as they improve
+    race_configs = st.multiselect(
+        "Configurations:", list(PORTFOLIO), default=list(PORTFOLIO), format_func=lambda name: PORTFOLIO[name]["label"],
+        key="race_configs",
+    )
+    race_deadline = st.number_input("Deadline (seconds):", value=30.0, step=5.0, min_value=1.0, key="race_deadline")
+    warm_start = False
+else:
+    warm_start = st.checkbox("Warm start with nearest neighbour + 2-opt/Or-opt", value=True, key="warm_start")
+
+# What a solve depends on, to recognise a result of since-edited inputs
+solve_inputs = (variable_positions, blocked_routes, formulation_choice, warm_start, tuple(race_configs), race_deadline)
+
 #"Solve TSP" button
 with col2:
-    if st.button("Solve TSP"):
-        m = Model("TSP")
+    # The solve runs in the background, with live progress and a Cancel button
+    if st.button("Solve TSP", disabled=job_running("tsp_job") or (formulation_choice == RACE and not race_configs)):
+        if formulation_choice == AUTOMATIC:
+            formulations = [pick_formulation(num_vars)]
+        elif formulation_choice == "Compare all":
+            formulations = list(FORMULATIONS)
+        else:
+            formulations = [key for key, label in FORMULATIONS.items() if label == formulation_choice]
 
-        x = m.addVars(
-            distances.keys(),
-            vtype=GRB.BINARY,
-            name="x"
-        )
-        # Set objective function
-        m.setObjective(
-            gp.quicksum(distances[(i, j)] * x[(i, j)] for i in range(num_vars) for j in range(num_vars) if i != j),
-            GRB.MINIMIZE,
-        )
+        # Instances solved before, by any session, come from the solution cache
+        def solve(callback):
+            return [
+                tsp_cached(
+                    num_vars, distances, blocked_routes, (formulation, warm_start),
+                    lambda: solve_tsp(num_vars, distances, blocked_routes, formulation, warm_start, callback=callback),
+                )
+                for formulation in formulations
+            ]
 
-        # Add constraints
-        for i in range(num_vars):
-            # Ensure each variable is left once
-            m.addConstr(gp.quicksum(x[(i, j)] for j in range(num_vars) if i != j) == 1, name=f"leave_{i}")
-            # Ensure each variable is entered once
-            m.addConstr(gp.quicksum(x[(j, i)] for j in range(num_vars) if i != j) == 1, name=f"enter_{i}")
-        
-        # subtour elimination
-        u = m.addVars(num_vars, vtype=GRB.CONTINUOUS, name="u")
-
-        # Subtour elimination constraints
-        for i in range(1, num_vars):  # Start from 1 since city 0 is the starting point
-            for j in range(1, num_vars):
-                if i != j:
-                    m.addConstr(u[i] - u[j] + num_vars * x[(i, j)] <= num_vars - 1, name=f"subtour_{i}_{j}")
-         # Add constraints for blocked routes
-        for from_index, to_index in blocked_routes:
-            m.addConstr(x[(from_index, to_index)] == 0, name=f"blocked_route_{from_index}_{to_index}")
-
-        # Solve the problem
-        m.optimize()
+        if formulation_choice == RACE:
+            # Timings decide the winner, so a race never comes from the solution cache
+            def solve(callback):
+                return race_tsp(variable_positions, distances, blocked_routes, race_configs, race_deadline, callback)
 
+        start_job("tsp_job", solve, solve_inputs)
+
+    results = job_panel("tsp_job", solve_inputs)
+    if results is not None and formulation_choice == RACE:
+        # One row per configuration, then the winner's tour below
+        race = results
+        st.table([
+            {
+                "Configuration": run["label"],
+                "Result": (
+                    "Winner" if k == race["winner"] else "Failed" if "error" in run
+                    else "Proved optimal" if run.get("status") == GRB.OPTIMAL else "Stopped"
+                ),
+                "Objective": "-" if run.get("objective") is None else f"{run['objective']:.2f}",
+                "Gap": "-" if run.get("gap") is None else f"{run['gap']:.2%}",
+                "Nodes": int(run.get("nodes", 0)),
+                "Finished after (s)": "-" if run["finished"] is None else f"{run['finished']:.2f}",
+            }
+            for k, run in enumerate(race["runs"])
+        ])
+        for run in race["runs"]:
+            if "error" in run:
+                st.caption(f"{run['label']}: {run['error']}")
+        if race["winner"] is None:
+            results = None
+            st.error("No configuration found a tour before the deadline.")
+        else:
+            winner = race["runs"][race["winner"]]
+            if race["reason"] == "optimal":
+                st.info(f"{winner['label']} won: it proved optimality after {winner['finished']:.2f} s.")
+            else:
+                ending = "the deadline passed" if race["reason"] == "deadline" else "the race was cancelled"
+                st.info(f"{winner['label']} won with the best tour found when {ending}.")
+            results = [winner]
+    elif results is not None:
+        # Cut count and solve time for each formulation
+        st.table([
+            {
+                "Formulation": FORMULATIONS[result["formulation"]],
+                "Model": "-" if result["formulation"] == "dp" else "Undirected" if result["symmetric"] else "Directed",
+                "Subtour constraints": result["cuts"],
+                "Solve time (s)": f"{result['solve_time']:.3f}",
+                "Nodes": int(result["nodes"]),
+                "Arcs": result["arcs"],
+                "Objective": "-" if result["objective"] is None else f"{result['objective']:.2f}",
+                "Gap": "-" if result["gap"] is None else f"{result['gap']:.2%}",
+                "Heuristic": "-" if result["heuristic"] is None else f"{result['heuristic']:.2f}",
+                "Heuristic gap": "-" if result["heuristic_gap"] is None else f"{result['heuristic_gap']:.2%}",
+                "Heuristic time (s)": f"{result['heuristic_time']:.3f}",
+            }
+            for result in results
+        ])
+
+    if results:
         # Display results
-        if m.status == GRB.OPTIMAL:
+        result = results[0]
+        if result["status"] == GRB.OPTIMAL:
             st.success("Optimal Solution Found!")
-            st.latex(f"\\text{{Objective Value: {m.objVal:.2f}}}")
-            itinerary = []
-            for i in range(num_vars):
-                for j in range(num_vars):
-                    if i != j and x[(i, j)].x > 0.5:
-                        st.write(f"Travel from {variable_names[i]} to {variable_names[j]}")
-                        itinerary.append((i, j))
-            
+        elif result["itinerary"] and result["gap"] is not None:
+            st.warning(f"Stopped before proving optimality: best tour found, within {result['gap']:.2%} of the bound.")
+        elif result["itinerary"]:
+            st.warning("Best tour found, not proved optimal.")
+        if result["itinerary"]:
+            st.latex(f"\\text{{Objective Value: {result['objective']:.2f}}}")
+            itinerary = result["itinerary"]
+            for i, j in itinerary:
+                st.write(f"Travel from {variable_names[i]} to {variable_names[j]}")
+
             # Plot the solution
             plot_itinerary(variable_positions, variable_names, itinerary)
         else:
-            st.error("No optimal solution found.")
\ No newline at end of file
+            st.error("No optimal solution found.")
+        cache_badge(result)
+store_summary()
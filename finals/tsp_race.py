@@ -0,0 +1,236 @@
+import math
+import os
+import queue
+import time
+
+from gurobipy import GRB
+
+from solver_env import set_defaults
+from tsp_anytime import anytime_tsp
+from tsp_heuristics import tour_arcs
+from tsp_model import find_edge_subtours, find_subtours, solve_tsp, warm_start_tour
+from worker_processes import CONTEXT
+
+# Configurations raced by default: MIP formulations and settings, and one
+# pure heuristic that feeds its tours to the MIP runs
+PORTFOLIO = {
+    "dfj": {"label": "Lazy DFJ cuts", "formulation": "dfj", "params": {}},
+    "dfj_feasibility": {"label": "Lazy DFJ, MIPFocus 1", "formulation": "dfj", "params": {"MIPFocus": 1}},
+    "dfj_cuts": {"label": "Lazy DFJ, aggressive cuts", "formulation": "dfj", "params": {"Cuts": 2}},
+    "mtz": {"label": "MTZ", "formulation": "mtz", "params": {}},
+    "mtz_bound": {"label": "MTZ, MIPFocus 2", "formulation": "mtz", "params": {"MIPFocus": 2}},
+    "held_karp": {"label": "Held-Karp DP", "formulation": "dp", "params": {}},
+    "heuristic": {"label": "Anytime local search", "formulation": None, "params": {}},
+}
+# Seconds between two progress reports of the race
+POLL_INTERVAL = 0.2
+# Seconds the stopped runs get to send their best tour before they are killed
+STOP_GRACE = 2.0
+
+
+# Length of `tour` on the instance, trying both directions; None when
+# neither direction avoids the blocked and missing arcs
+def _tour_cost(tour, distances, blocked):
+    best = None
+    for candidate in (list(tour), list(tour[::-1])):
+        arcs = tour_arcs(candidate)
+        if any(arc in blocked or arc not in distances for arc in arcs):
+            continue
+        length = sum(distances[arc] for arc in arcs)
+        if best is None or length < best[0]:
+            best = (length, candidate)
+    return best
+
+
+# Offer a tour of run `index` to every run: kept if it beats the shared best
+def _publish(shared, index, tour, distances, blocked):
+    cost = _tour_cost(tour, distances, blocked)
+    if cost is None:
+        return
+    length, tour = cost
+    with shared["length"].get_lock():
+        if length < shared["length"].value - 1e-9:
+            shared["tour"][:] = tour
+            shared["length"].value = length
+            shared["owner"].value = index
+            shared["version"].value += 1
+
+
+# Callback of a MIP run: stops once the race is over, publishes its own
+# tours and injects the shared best tour when it beats the run's incumbent
+def _race_callback(index, shared, distances, blocked):
+    injected = [0]
+
+    def callback(model, where):
+        if shared["stop"].is_set():
+            model.terminate()
+            return
+        if where == GRB.Callback.MIP:
+            shared["bounds"][index] = model.cbGet(GRB.Callback.MIP_OBJBND)
+            shared["nodes"][index] = model.cbGet(GRB.Callback.MIP_NODCNT)
+        elif where == GRB.Callback.MIPSOL:
+            values = model.cbGetSolution(model._x)
+            selected = [arc for arc, value in values.items() if value > 0.5]
+            split = find_edge_subtours if model._symmetric else find_subtours
+            cycles = split(model._num_vars, selected)
+            if len(cycles) == 1:
+                _publish(shared, index, cycles[0], distances, blocked)
+        elif where == GRB.Callback.MIPNODE and model.cbGet(GRB.Callback.MIPNODE_STATUS) == GRB.OPTIMAL:
+            version = shared["version"].value
+            if version == injected[0]:
+                return
+            injected[0] = version
+            with shared["length"].get_lock():
+                length, tour = shared["length"].value, list(shared["tour"])
+            if length >= model.cbGet(GRB.Callback.MIPNODE_OBJBST) - 1e-9:
+                return
+            arcs = set(tour_arcs(tour))
+            if model._symmetric:
+                arcs = {(min(i, j), max(i, j)) for i, j in arcs}
+            # MTZ's order variables are left for Gurobi to complete
+            model.cbSetSolution(list(model._x.values()), [1.0 if arc in arcs else 0.0 for arc in model._x])
+            model.cbUseSolution()
+
+    return callback
+
+
+# The runs get the race's deadline as a wall-clock time, so the seconds
+# spent starting their process count against their time limit
+def _run_mip(index, config, num_vars, distances, blocked_routes, threads, deadline, shared, results):
+    try:
+        time_limit = max(0.0, deadline - time.time())
+        set_defaults(OutputFlag=0, Threads=threads, TimeLimit=time_limit, **config["params"])
+        callback = _race_callback(index, shared, distances, set(blocked_routes))
+        # solve_tsp runs the callback after its own subtour cuts
+        result = solve_tsp(num_vars, distances, blocked_routes, config["formulation"], warm_start=False,
+                           callback=callback)
+        results.put((index, result))
+    except Exception as error:
+        results.put((index, {"error": f"{type(error).__name__}: {error}"}))
+
+
+# The heuristic run: a quick nearest neighbour + 2-opt tour on the distances,
+# then anytime local search on the coordinates until the race is over
+def _run_heuristic(index, positions, distances, blocked_routes, deadline, shared, results):
+    start = time.perf_counter()
+    blocked = set(blocked_routes)
+    try:
+        tour, _ = warm_start_tour(len(positions), distances, blocked_routes)
+        if tour is not None:
+            _publish(shared, index, tour, distances, blocked)
+        # The search checks the stop flag between moves, not only when it improves
+        for snapshot in anytime_tsp(positions, blocked_routes, time_limit=max(0.0, deadline - time.time()),
+                                    report_every=POLL_INTERVAL, stop=shared["stop"].is_set):
+            _publish(shared, index, snapshot["tour"], distances, blocked)
+            tour = snapshot["tour"]
+        cost = None if tour is None else _tour_cost(tour, distances, blocked)
+        results.put((index, {
+            "status": None,
+            "objective": None if cost is None else cost[0],
+            "itinerary": [] if cost is None else tour_arcs(cost[1]),
+            "gap": None,
+            "nodes": 0,
+            "solve_time": time.perf_counter() - start,
+        }))
+    except Exception as error:
+        results.put((index, {"error": f"{type(error).__name__}: {error}"}))
+
+
+# Race the PORTFOLIO configurations named in `configs` on one instance, each
+# in its own process with a share of the cores. The first MIP run to prove
+# optimality wins and the others are stopped; at the deadline (`time_limit`
+# seconds) every run is stopped and the best tour wins, the tour a run shared
+# before it was killed included. `callback` is a
+# background_solve progress callback: it gets the shared incumbent and the
+# best bound, and may cancel the race. Returns {"runs", "winner", "reason"}
+# with one entry per configuration; the winner is an index into runs.
+def race_tsp(positions, distances, blocked_routes, configs=tuple(PORTFOLIO), time_limit=30.0, callback=None):
+    num_vars = len(positions)
+    blocked_routes = [tuple(route) for route in blocked_routes]
+    configs = list(configs)
+    mips = [name for name in configs if PORTFOLIO[name]["formulation"] is not None]
+    threads = max(1, ((os.cpu_count() or 1) - (len(configs) - len(mips))) // max(1, len(mips)))
+
+    # The runs start without the page (worker_processes.py)
+    shared = {
+        "length": CONTEXT.Value("d", math.inf),
+        "tour": CONTEXT.Array("i", num_vars, lock=False),
+        "owner": CONTEXT.Value("i", -1, lock=False),
+        "version": CONTEXT.Value("i", 0, lock=False),
+        "bounds": CONTEXT.Array("d", [-math.inf] * len(configs), lock=False),
+        "nodes": CONTEXT.Array("d", len(configs), lock=False),
+        "stop": CONTEXT.Event(),
+    }
+    results = CONTEXT.Queue()
+    deadline = time.time() + time_limit
+    processes = []
+    for index, name in enumerate(configs):
+        config = PORTFOLIO[name]
+        if config["formulation"] is None:
+            target = _run_heuristic
+            args = (index, [tuple(p) for p in positions], distances, blocked_routes, deadline, shared, results)
+        else:
+            target = _run_mip
+            args = (index, config, num_vars, distances, blocked_routes, threads, deadline, shared, results)
+        processes.append(CONTEXT.Process(target=target, args=args, daemon=True))
+
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    runs = [{"config": name, "label": PORTFOLIO[name]["label"], "finished": None} for name in configs]
+    winner, reason = None, "deadline"
+
+    def receive(timeout):
+        index, result = results.get(timeout=timeout)
+        runs[index].update(result, finished=time.perf_counter() - start)
+        return index
+
+    try:
+        while any(run["finished"] is None for run in runs):
+            remaining = start + time_limit - time.perf_counter()
+            if remaining <= 0:
+                break
+            if callback is not None and callback.cancelled():
+                reason = "cancelled"
+                break
+            try:
+                index = receive(min(POLL_INTERVAL, remaining))
+            except queue.Empty:
+                if callback is not None:
+                    length = shared["length"].value
+                    bound = max(shared["bounds"])
+                    callback.report(time.perf_counter() - start, None if math.isinf(length) else length,
+                                    None if math.isinf(bound) else bound, sum(shared["nodes"]))
+                continue
+            if runs[index].get("status") == GRB.OPTIMAL:
+                winner, reason = index, "optimal"
+                break
+        # Everyone else stops and sends what it has
+        shared["stop"].set()
+        grace = time.perf_counter() + STOP_GRACE
+        while any(run["finished"] is None for run in runs) and time.perf_counter() < grace:
+            try:
+                index = receive(max(0.0, grace - time.perf_counter()))
+            except queue.Empty:
+                break
+            # Process start-up can eat the whole deadline of a short race
+            if winner is None and runs[index].get("status") == GRB.OPTIMAL:
+                winner, reason = index, "optimal"
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.kill()
+            process.join()
+
+    # A run killed before it reported still owns the best tour it shared
+    owner = shared["owner"].value
+    if owner >= 0 and runs[owner].get("objective") is None and "error" not in runs[owner]:
+        tour = list(shared["tour"])
+        runs[owner].update(status=None, objective=shared["length"].value, itinerary=tour_arcs(tour), gap=None,
+                           nodes=shared["nodes"][owner])
+    if winner is None:
+        scored = [k for k, run in enumerate(runs) if run.get("objective") is not None and run.get("itinerary")]
+        if scored:
+            winner = min(scored, key=lambda k: (runs[k]["objective"], runs[k]["finished"] is None,
+                                                runs[k]["finished"] or 0.0))
+    return {"runs": runs, "winner": winner, "reason": reason}
@@ -0,0 +1,48 @@
+import multiprocessing
+import os
+import threading
+from multiprocessing import spawn
+
+# "spawn" processes for the parallel modes the pages start (tsp_decompose,
+# tsp_race). A spawned child first runs the parent's __main__ module again,
+# and under Streamlit __main__ is whichever page ran last, so every worker
+# would run a whole page before its task. Processes of CONTEXT start without
+# it, with this directory on their path: their task must be a function of an
+# importable module, never of a page.
+
+_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+_SPAWN = multiprocessing.get_context("spawn")
+_launching = threading.local()
+_preparation_data = spawn.get_preparation_data
+
+
+# What a child gets to set itself up. Only the thread starting a process of
+# CONTEXT sees a change, so every other process starts as before.
+def _worker_preparation_data(name):
+    data = _preparation_data(name)
+    if getattr(_launching, "active", False):
+        data.pop("init_main_from_name", None)
+        data.pop("init_main_from_path", None)
+        data["sys_path"] = [_DIRECTORY] + [path for path in data["sys_path"] if path != _DIRECTORY]
+    return data
+
+
+spawn.get_preparation_data = _worker_preparation_data
+
+
+class WorkerProcess(_SPAWN.Process):
+    @staticmethod
+    def _Popen(process_obj):
+        _launching.active = True
+        try:
+            return _SPAWN.Process._Popen(process_obj)
+        finally:
+            _launching.active = False
+
+
+class WorkerContext(type(_SPAWN)):
+    Process = WorkerProcess
+
+
+# Pass as mp_context to ProcessPoolExecutor, or use its Process, Queue, Value...
+CONTEXT = WorkerContext()
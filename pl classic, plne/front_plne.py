@@ -1,129 +1,120 @@
+import os
+import sys
+import pandas as pd
 import streamlit as st
-import gurobipy as gp
-# print program started
-print("#"*10, "Program Started", "#"*10)
-# Global Variables
-m = gp.Model()
+from gurobipy import GRB
+
+FINALS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "finals")
+if FINALS_DIR not in sys.path:
+   sys.path.append(FINALS_DIR)
+from linear_model import fingerprint, linear_problem
+from incremental_model import solve_incremental
+from background_solve import job_panel, job_running, start_job
+from formulation_view import formulation_panel
+from matrix_input import grid_editor, matrix_editor
+from solve_cache import cache_badge, cached_result, metrics_panel, select_backend, solve_cached, store_summary
+from telemetry import add_result, lap, log_metrics, start_metrics
+
+# Timings of this run, by phase
+metrics = start_metrics("front_plne")
+
 # Title
 st.title("Magic PLNE Gurobi Optimizer")
 
 # Number of Variables
 st.header("Number of Variables:")
-num_vars = st.number_input("Enter the number of variables:", value=3, step=1)
-## Setting Gurobi Variables
-variables = []
-for i in range(num_vars):
-   variables.append(m.addVar(vtype='I', name=f"x{i+1}"))
+num_vars = st.number_input("Enter the number of variables:", value=3, step=1, min_value=1)
+variable_labels = [f"x {i+1}" for i in range(num_vars)]
 
 # Objective Function
 st.header("Objective Function:")
-cols = st.columns(num_vars+1)
 
 # Select objective (Max or Min) selectbox
-objective = cols[0].selectbox("Objective:", ["Max", "Min"])
-
-objective_function_text = ""
-objective_coefficients = []
-for i in range(num_vars):
-   value = cols[i+1].number_input(f"x {i+1}", value=1, )
-   if value == "1":
-      objective_function_text += f" + x_{i+1}"
-   elif value == "-1":
-      objective_function_text += f" -x_{i+1}"
-   elif value == "0":
-      continue
-   elif int(value) < 0:
-      objective_function_text += f" {value}x_{i+1}"
-   else:
-      objective_function_text += f" + {value}x_{i+1}"
-   objective_coefficients.append(int(value))
-
-# Set objective function in Gurobi
-if objective == "Max":
-   m.setObjective(sum([variables[i] * objective_coefficients[i] for i in range(num_vars)]), gp.GRB.MAXIMIZE)
-else:
-   m.setObjective(sum([variables[i] * objective_coefficients[i] for i in range(num_vars)]), gp.GRB.MINIMIZE)
-
-
-#objective_function_text = objective_function_text[:-2]
+objective = st.selectbox("Objective:", ["Max", "Min"])
 
-if objective_function_text[1] == "+":
-   objective_function_text = objective_function_text[2:]
+# Coefficients of the objective, one grid row
+objective_coefficients = matrix_editor("plne_objective", ["c"], variable_labels, default=1)[0]
 
 # Constraints
 st.header("Constraints:")
-num_constraints = st.number_input("Enter the number of constraints:", value=2, step=1)
-constraints = []
-for i in range(num_constraints):
-   cols = st.columns(num_vars+2)
-   constraint_text = ""
-   constraint_coefficients = []
-   for j in range(num_vars):
-      print("#"*100)
-      value = cols[j].number_input(f"x {j+1}", value=0, key=f"constraint_{i}{j+1}")
-      print("Value is", value)
-      if value == "1":
-         constraint_text += f" + x_{j+1}"
-      elif value == "-1":
-         constraint_text += f" -x_{j+1}"
-      elif value == "0":
-         pass
-      elif int(value) < 0:
-         constraint_text += f" {value}x_{j+1}"
-      else:
-         constraint_text += f" + {value}x_{j+1}"
-      constraint_coefficients.append(int(value))
-      print("##################################", len(constraint_coefficients), num_vars, value)
-   
-   
-   # <= or >=
-   value = cols[num_vars].selectbox("", ["≤", "≥"], key=f"constraint_{i}sign")
-   constraint_text += "\\le " if value == "≤" else "\\ge "
-   # RHS
-   rhs = cols[num_vars+1].number_input("", value=1, key=f"constraint_{i}rhs")
-   constraint_text += str(rhs)
-   if constraint_text[1] == "+":
-      constraint_text = constraint_text[2:]
-   constraints.append(constraint_text)
-   # Add constraint to Gurobi
-   if value == "≤":
-      m.addConstr(sum([variables[j] * constraint_coefficients[j] for j in range(num_vars)]) <= int(rhs))
-   else:
-      m.addConstr(sum([variables[j] * constraint_coefficients[j] for j in range(num_vars)]) >= int(rhs))
-
-
-# Solve the problem
-m.optimize()
-
-
-# Print the problem
+num_constraints = st.number_input("Enter the number of constraints:", value=2, step=1, min_value=0)
+# One grid row per constraint: coefficients, sign and right-hand side
+constraint_table = grid_editor(
+   "plne_constraints",
+   pd.DataFrame(
+      {**{label: 0.0 for label in variable_labels}, "Sign": "≤", "RHS": 1.0},
+      index=[f"constraint {i+1}" for i in range(num_constraints)],
+   ),
+   options={"Sign": ["≤", "≥"]},
+)
+constraints_coefficients = constraint_table[variable_labels].fillna(0.0).to_numpy(dtype=float)
+constraints_senses = ["<=" if sign == "≤" else ">=" for sign in constraint_table["Sign"]]
+constraints_rhs = constraint_table["RHS"].fillna(0.0).to_numpy(dtype=float)
+
+
+# Model inputs; Gurobi only runs when "Solve" is pressed
+problem = linear_problem(
+   c=objective_coefficients,
+   A=constraints_coefficients,
+   senses=constraints_senses,
+   b=constraints_rhs,
+   sense=objective.lower(),
+   vtype="I",
+)
+
+lap(metrics, "parse")
+
+# Print the problem: sizes and ranges, the constraints a page at a time
 st.header("The Problem:")
-objective_function_text = objective.lower() + "imize \\\\" + objective_function_text
-st.latex(f"{objective_function_text}")
-
-st.latex("\\text{subject to} \\\\")
-for i in range(num_constraints):
-   st.latex(f"{constraints[i]}")
-
-positive_str = ""
-for i in range(num_vars):
-   positive_str += f",x_{i}"
-positive_str = positive_str[1:] + "\\ge 0"
-st.latex(positive_str)
+formulation_panel(problem, "plne_formulation", row_names=constraint_table.index)
 
 
 # Print the solution
 st.header("The Solution:")
-print("#"*4,m,"#"*4)
-try:
-   if(m.ObjVal):
-      st.latex(f"\\text{{Optimal objective value: }} {m.ObjVal}")
-      solution_text = ""
-      for i in range(num_vars):
-         solution_text += f"x_{i+1} = {variables[i].X}\\\\  "
-      solution_text = solution_text[:-2]
-      st.latex(f"\\text{{Solution values: }} \\\\ {solution_text}")
-   else:
-      st.latex("NO available solution")
-except:
-   st.latex(f"\\text{{No Solution }}")
+backend = select_backend()
+pressed = st.button("Solve", disabled=job_running("plne_job"))
+# Unchanged inputs: show the earlier result instead of solving again
+result = cached_result(problem, backend=backend)
+if pressed and result is None:
+   # The solve runs in the background, with live progress and a Cancel button.
+   # With Gurobi the model stays in the session and is edited rather than rebuilt.
+   def solve(callback):
+      incremental = (lambda changed: solve_incremental(changed, "plne_model", callback)) if backend == "gurobi" else None
+      return solve_cached(problem, solve=incremental, backend=backend)
+   start_job("plne_job", solve, fingerprint(problem))
+lap(metrics, "render")
+finished = job_panel("plne_job", fingerprint(problem))
+solved = finished is not None
+if solved:
+   result = finished
+add_result(metrics, result, solved)
+
+if result is None:
+   st.write("Press Solve to optimize the problem above.")
+elif result["status"] == GRB.OPTIMAL:
+   st.latex(f"\\text{{Optimal objective value: }} {result['objective']}")
+   solution_text = ""
+   for i in range(num_vars):
+      solution_text += f"x_{i+1} = {result['values'][i]}\\\\  "
+   solution_text = solution_text[:-2]
+   st.latex(f"\\text{{Solution values: }} \\\\ {solution_text}")
+   if result.get("edits") is not None:
+      st.caption(f"Model updated with {result['edits']} edits in {result['update_time'] * 1000:.1f} ms, solved in {result['runtime'] * 1000:.1f} ms")
+elif result["status"] in (GRB.TIME_LIMIT, GRB.INTERRUPTED) and result["values"] is not None:
+   # Stopped early: the best solution found so far
+   st.warning(f"Stopped before proving optimality ({result['status_name']}): best solution found")
+   st.latex(f"\\text{{Best objective value: }} {result['objective']}")
+   solution_text = ""
+   for i in range(num_vars):
+      solution_text += f"x_{i+1} = {result['values'][i]}\\\\  "
+   solution_text = solution_text[:-2]
+   st.latex(f"\\text{{Solution values: }} \\\\ {solution_text}")
+else:
+   st.latex(f"\\text{{No Solution ({result['status_name']})}}")
+
+cache_badge(result)
+lap(metrics, "render")
+if solved:
+   log_metrics(metrics)
+metrics_panel(metrics)
+store_summary()
@@ -0,0 +1,35 @@
+import types
+
+from gurobipy import GRB
+import pytest
+import scipy.optimize
+
+from backends import solve_problem
+from linear_model import linear_problem
+from solution_store import FINAL_STATUSES
+
+
+def _lp():
+    return linear_problem([1, 2], [[1, 1], [1, -1]], [">=", "<="], [2, 1])
+
+
+def test_highs_matches_gurobi():
+    gurobi, highs = solve_problem(_lp(), "gurobi"), solve_problem(_lp(), "highs")
+    assert highs["status"] == gurobi["status"] == GRB.OPTIMAL
+    assert highs["objective"] == pytest.approx(gurobi["objective"])
+
+
+@pytest.mark.parametrize("code", [1, 4, 99])
+def test_failed_highs_solves_are_never_final(monkeypatch, code):
+    failed = types.SimpleNamespace(status=code, x=None, fun=None, message="numerical difficulties", nit=3)
+    monkeypatch.setattr(scipy.optimize, "linprog", lambda *args, **kwargs: failed)
+    result = solve_problem(_lp(), "highs")
+    assert result["status"] not in FINAL_STATUSES
+    assert result["objective"] is None
+
+
+def test_infeasible_highs_solve_is_final():
+    problem = linear_problem([1], [[1], [1]], [">=", "<="], [2, 1])
+    result = solve_problem(problem, "highs")
+    assert result["status"] == GRB.INFEASIBLE
+    assert result["status"] in FINAL_STATUSES
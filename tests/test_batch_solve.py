@@ -0,0 +1,40 @@
+import json
+
+from batch_solve import read_instances, solve_batch, solve_instance
+
+SQUARE = [[0, 0], [1, 0], [1, 1], [0, 1]]
+
+
+def test_out_of_range_route_is_an_error_line():
+    line = solve_instance({"id": "t", "kind": "tsp", "positions": SQUARE, "blocked_routes": [[0, 7]]})
+    assert line["error"].startswith("ValueError")
+
+
+def test_any_exception_is_an_error_line():
+    line = solve_instance({"id": "p", "kind": "tsp", "positions": [[0, 0], [1]]})
+    assert "error" in line and line["id"] == "p"
+
+
+def test_unreadable_lines_become_error_lines(tmp_path):
+    path = tmp_path / "instances.jsonl"
+    path.write_text("\n".join([
+        json.dumps({"id": "a", "kind": "tsp", "positions": SQUARE}),
+        '{"id": "broken"',
+        "[1, 2]",
+        json.dumps({"id": "b", "kind": "tsp", "positions": SQUARE, "blocked_routes": [[0, 7]]}),
+    ]))
+    instances = list(read_instances(str(path)))
+    assert [instance["id"] for instance in instances] == ["a", f"{path}:2", f"{path}:3", "b"]
+
+    lines = {line["id"]: line for line in solve_batch(instances, workers=1)}
+    assert lines["a"]["optimal"] and lines["a"]["objective"] == 4.0
+    assert lines[f"{path}:2"]["error"].startswith("JSONDecodeError")
+    assert lines[f"{path}:3"]["error"].startswith("TypeError")
+    assert lines["b"]["error"].startswith("ValueError")
+
+
+def test_unreadable_json_file_is_one_error_line(tmp_path):
+    path = tmp_path / "broken.json"
+    path.write_text("{")
+    [line] = read_instances(str(tmp_path))
+    assert line["id"] == str(path) and "error" in line
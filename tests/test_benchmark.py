@@ -0,0 +1,27 @@
+from benchmark import NOISE, regressions
+
+BASELINE = {"lp_200": {"build_time": 0.05, "solve_time": 2.0, "nodes": 0, "peak_rss_mb": 120.0}}
+
+
+def test_growth_beyond_tolerance_and_noise_is_a_regression():
+    current = {"lp_200": dict(BASELINE["lp_200"], solve_time=3.0)}
+    assert regressions(BASELINE, current) == [("lp_200", "solve_time", 2.0, 3.0)]
+
+
+def test_timer_noise_on_a_small_build_is_not_a_regression():
+    baseline = {"lp_200": dict(BASELINE["lp_200"], build_time=0.001)}
+    current = {"lp_200": dict(BASELINE["lp_200"], build_time=0.001 + NOISE["build_time"] / 2)}
+    assert regressions(baseline, current) == []
+
+
+def test_a_few_milliseconds_on_a_small_build_is_a_regression():
+    # Every build of the suite takes 3 to 55 ms
+    current = {"lp_200": dict(BASELINE["lp_200"], build_time=0.05 + 2 * NOISE["build_time"])}
+    assert [metric for _, metric, _, _ in regressions(BASELINE, current)] == ["build_time"]
+    assert NOISE["build_time"] < 0.01 and NOISE["solve_time"] < 0.01
+
+
+def test_tolerance_and_missing_values():
+    current = {"lp_200": dict(BASELINE["lp_200"], solve_time=2.3, nodes=None), "tsp_new": {"solve_time": 9.0}}
+    assert regressions(BASELINE, current) == []
+    assert regressions(BASELINE, current, tolerance=0.1) == [("lp_200", "solve_time", 2.0, 2.3)]
@@ -0,0 +1,63 @@
+from gurobipy import GRB
+import numpy as np
+import pytest
+
+from diet_batch import shared_diet_model, solve_user, user_arrays
+
+TABLE = {
+    "foods": ["Rice", "Beans", "Sugar"],
+    "prices": np.array([1.0, 2.0, 0.5]),
+    "nutrient_names": ["Energy", "Protein"],
+    # nutrients[k] holds nutrient k for every food
+    "nutrients": np.array([[300.0, 250.0, 400.0], [5.0, 20.0, 0.0]]),
+    "min": np.zeros(3),
+    "max": np.full(3, 10.0),
+}
+
+
+def _shared():
+    return {
+        "low": [None, None],
+        "nutrient_index": {"Energy": 0, "Protein": 1},
+        "food_index": {"Rice": 0, "Beans": 1, "Sugar": 2},
+        "min": TABLE["min"],
+        "max": TABLE["max"],
+    }
+
+
+def test_user_arrays_fills_limits_and_leaves_the_rest_free():
+    low, high, lb, ub = user_arrays(_shared(), {"limits": {"Energy": [2000, None], "Protein": [None, 80]}})
+    assert low.tolist() == [2000, -GRB.INFINITY]
+    assert high.tolist() == [GRB.INFINITY, 80]
+    assert lb.tolist() == [0, 0, 0]
+    assert ub.tolist() == [10, 10, 10]
+
+
+def test_user_arrays_food_bounds_do_not_touch_the_shared_table():
+    shared = _shared()
+    _, _, lb, ub = user_arrays(shared, {"min": {"Rice": 0.5}, "max": {"Beans": 2}, "exclude": ["Sugar"]})
+    assert lb.tolist() == [0.5, 0, 0]
+    assert ub.tolist() == [10, 2, 0]
+    assert shared["min"].tolist() == [0, 0, 0]
+    assert shared["max"].tolist() == [10, 10, 10]
+
+
+def test_user_arrays_rejects_unknown_names():
+    with pytest.raises(KeyError):
+        user_arrays(_shared(), {"limits": {"Iron": [1, None]}})
+    with pytest.raises(KeyError):
+        user_arrays(_shared(), {"exclude": ["Bread"]})
+
+
+def test_solve_user_reoptimises_the_shared_model():
+    shared = shared_diet_model(TABLE)
+    first = solve_user(shared, {"id": "a", "limits": {"Energy": [2000, None], "Protein": [50, None]}})
+    assert first["status"] == "optimal"
+    energy = sum(amount * TABLE["nutrients"][0][TABLE["foods"].index(food)] for food, amount in first["foods"].items())
+    assert energy >= 2000 - 1e-6
+    # The next user starts from the same model: excluding Sugar cannot make the diet cheaper
+    second = solve_user(shared, {"id": "b", "limits": {"Energy": [2000, None], "Protein": [50, None]},
+                                 "exclude": ["Sugar"]})
+    assert second["cost"] >= first["cost"] - 1e-9
+    assert "Sugar" not in second["foods"]
+    assert "error" in solve_user(shared, {"id": "c", "limits": {"Iron": [1, None]}})
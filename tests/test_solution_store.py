@@ -0,0 +1,126 @@
+import json
+import time
+
+from gurobipy import GRB
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+import solution_store
+import solve_cache
+from linear_model import linear_problem
+from solution_store import (canonical_linear, canonical_tsp, linear_from_canonical, linear_to_canonical, store,
+                            store_stats, tsp_from_canonical, tsp_to_canonical)
+
+
+def _problem(seed=0, rows=6, cols=5):
+    rng = np.random.default_rng(seed)
+    A = sp.random(rows, cols, density=0.6, random_state=seed, format="csr") * 10
+    return linear_problem(
+        rng.integers(1, 9, cols), A.toarray(), ["<=", ">="] * (rows // 2), rng.integers(1, 20, rows),
+        ub=rng.integers(5, 15, cols), vtype="I",
+    )
+
+
+def _permuted(problem, rows, cols):
+    return linear_problem(
+        problem["c"][cols], problem["A"].toarray()[rows][:, cols], problem["senses"][rows], problem["b"][rows],
+        sense=problem["sense"], lb=problem["lb"][cols], ub=problem["ub"][cols], vtype=problem["vtype"][cols],
+        name="renamed",
+    )
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_linear_hash_ignores_row_and_column_order(seed):
+    problem = _problem(seed)
+    rng = np.random.default_rng(100 + seed)
+    rows, cols = rng.permutation(6), rng.permutation(5)
+    assert canonical_linear(problem)[0] == canonical_linear(_permuted(problem, rows, cols))[0]
+
+
+def test_linear_hash_sees_data_and_backend():
+    problem = _problem()
+    key = canonical_linear(problem)[0]
+    changed = _problem()
+    changed["b"][0] += 1
+    assert canonical_linear(changed)[0] != key
+    assert canonical_linear(problem, backend="highs")[0] != key
+
+
+def test_stored_linear_result_maps_back_to_any_ordering():
+    problem = _problem()
+    values, duals = np.arange(5.0), np.arange(6.0) * 10
+    _, rows, cols = canonical_linear(problem)
+    stored = linear_to_canonical({"values": values, "duals": duals}, rows, cols)
+
+    perm_rows, perm_cols = np.array([3, 0, 5, 1, 4, 2]), np.array([4, 2, 0, 3, 1])
+    _, other_rows, other_cols = canonical_linear(_permuted(problem, perm_rows, perm_cols))
+    restored = linear_from_canonical(stored, other_rows, other_cols)
+    assert restored["values"] == values[perm_cols].tolist()
+    assert restored["duals"] == duals[perm_rows].tolist()
+
+
+def _tsp(seed, n=7):
+    points = np.random.default_rng(seed).random((n, 2)) * 100
+    return {(i, j): float(np.hypot(*(points[i] - points[j]))) for i in range(n) for j in range(n) if i != j}
+
+
+def test_tsp_hash_ignores_node_labels_and_maps_tours_back():
+    distances, blocked = _tsp(1), [(0, 3)]
+    relabel = [4, 6, 0, 2, 5, 1, 3]
+    renamed = {(relabel[i], relabel[j]): value for (i, j), value in distances.items()}
+    key, order = canonical_tsp(7, distances, blocked, ("dfj", True))
+    other_key, other_order = canonical_tsp(7, renamed, [(relabel[0], relabel[3])], ("dfj", True))
+    assert key == other_key
+
+    itinerary = [(0, 1), (1, 2), (2, 3), (3, 4), (4, 5), (5, 6), (6, 0)]
+    stored = tsp_to_canonical({"itinerary": itinerary}, order)
+    restored = tsp_from_canonical(stored, other_order)
+    assert restored["itinerary"] == [(relabel[i], relabel[j]) for i, j in itinerary]
+
+
+def test_tsp_hash_sees_options_and_blocked_routes():
+    distances = _tsp(2)
+    key = canonical_tsp(7, distances, [], ("dfj", True))[0]
+    assert canonical_tsp(7, distances, [], ("mtz", True))[0] != key
+    assert canonical_tsp(7, distances, [(1, 2)], ("dfj", True))[0] != key
+
+
+@pytest.mark.parametrize("status, kept", [
+    (GRB.OPTIMAL, True), (GRB.INFEASIBLE, True), (GRB.TIME_LIMIT, False), (GRB.INTERRUPTED, False),
+])
+def test_only_final_tsp_results_are_stored(monkeypatch, status, kept):
+    stored = []
+    monkeypatch.setattr(solve_cache, "lookup", lambda key: None)
+    monkeypatch.setattr(solve_cache, "store", lambda key, value: stored.append(key))
+    result = solve_cache.tsp_cached(7, _tsp(3), [], ("dfj",), lambda: {"status": status, "itinerary": []})
+    assert result["status"] == status
+    assert bool(stored) == kept
+
+
+def test_memory_hits_keep_solutions_from_eviction(tmp_path):
+    path = str(tmp_path / "store.sqlite")
+    value = {"values": list(range(50))}
+    size = len(json.dumps(value))
+    store("hot", value, path)
+    store("cold", value, path)
+    time.sleep(0.01)
+    for _ in range(3):
+        assert solution_store.lookup("hot", path) == ("memory", value)
+    store("new", value, path, max_bytes=2 * size)
+    solution_store._memory.clear()
+    assert solution_store.lookup("hot", path) == ("disk", value)
+    assert solution_store.lookup("cold", path) is None
+    assert store_stats(path)["memory_hits"] == 3
+
+
+def test_memory_hits_are_written_in_batches(tmp_path, monkeypatch):
+    path = str(tmp_path / "store.sqlite")
+    store("batched", {"values": [1]}, path)
+    connections = []
+    connect = solution_store._connect
+    monkeypatch.setattr(solution_store, "_connect", lambda p: connections.append(p) or connect(p))
+    for _ in range(100):
+        assert solution_store.lookup("batched", path)[0] == "memory"
+    assert len(connections) <= 1
+    assert store_stats(path)["memory_hits"] == 100
@@ -0,0 +1,25 @@
+import time
+
+from solve_service import SolveService
+
+
+def _wait(service, job_id, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = service.job(job_id)
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} still {job['status']}")
+
+
+def test_bad_instance_fails_without_killing_the_worker():
+    service = SolveService(workers=1, timeout=10.0)
+    bad = service.submit({"kind": "tsp", "positions": [[0, 0], [1, 0], [1, 1], [0, 1]], "blocked_routes": [[0, 7]]})
+    job = _wait(service, bad["id"])
+    assert job["status"] == "failed"
+    assert job["result"]["error"].startswith("ValueError")
+
+    good = service.submit({"kind": "tsp", "positions": [[0, 0], [1, 0], [1, 1], [0, 1]]})
+    assert _wait(service, good["id"])["status"] == "done"
+    assert service.health()["restarts"] == 0
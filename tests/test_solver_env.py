@@ -0,0 +1,69 @@
+import gc
+import threading
+
+from gurobipy import GRB
+
+import solver_env
+from solver_env import new_model, set_defaults
+
+
+def _in_use():
+    return len(solver_env._started) - len(solver_env._idle)
+
+
+def test_a_model_keeps_its_environment_until_it_is_collected():
+    gc.collect()
+    before = _in_use()
+    first, second = new_model("first"), new_model("second")
+    assert _in_use() == before + 2
+    del first
+    gc.collect()
+    assert _in_use() == before + 1
+    del second
+    gc.collect()
+    assert _in_use() == before
+
+
+def test_defaults_apply_to_models_built_after_the_change():
+    set_defaults(Threads=1)
+    try:
+        m = new_model()
+        set_defaults(Threads=2)
+        assert m.Params.Threads == 1
+        assert new_model().Params.Threads == 2
+    finally:
+        set_defaults(Threads=0)
+
+
+def test_threads_solving_at_once_hold_separate_environments():
+    gc.collect()
+    before = _in_use()
+    ready, checked = threading.Barrier(5, timeout=30), threading.Event()
+    objectives, errors = [], []
+
+    def solve():
+        try:
+            m = new_model()
+            x = m.addVars(50, ub=1.0)
+            m.addConstr(x.sum() <= 10)
+            m.setObjective(x.sum(), GRB.MAXIMIZE)
+            ready.wait()
+            m.optimize()
+            objectives.append(m.ObjVal)
+            checked.wait()
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=solve) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        ready.wait()
+        # Every thread has built its model: one environment each
+        assert _in_use() == before + 4
+    finally:
+        checked.set()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert objectives == [10.0] * 4
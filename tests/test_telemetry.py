@@ -0,0 +1,33 @@
+from gurobipy import GRB
+
+from linear_model import build_linear_model, linear_problem
+from telemetry import optimize_with_stats
+
+
+def _stats(problem, **params):
+    m, _ = build_linear_model(problem)
+    for name, value in params.items():
+        m.setParam(name, value)
+    _, stats = optimize_with_stats(m)
+    return m, stats
+
+
+def test_optimal_mip_reports_its_gap():
+    problem = linear_problem([3, 2], [[1, 1], [1, 3]], ["<=", "<="], [4.5, 6.5], vtype="I", sense="max")
+    m, stats = _stats(problem)
+    assert m.Status == GRB.OPTIMAL
+    assert stats["gap"] is not None and stats["gap"] <= 1e-4
+
+
+def test_unbounded_mip_has_solutions_but_no_gap():
+    problem = linear_problem([1, 1], [[1, -1]], [">="], [1], vtype="I", sense="max")
+    m, stats = _stats(problem, DualReductions=0)
+    assert m.Status == GRB.UNBOUNDED and m.SolCount > 0
+    assert stats["gap"] is None
+
+
+def test_lp_has_no_gap_or_nodes():
+    problem = linear_problem([1, 2], [[1, 1]], [">="], [1])
+    _, stats = _stats(problem)
+    assert stats["gap"] is None
+    assert stats["nodes"] == 0
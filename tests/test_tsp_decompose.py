@@ -0,0 +1,17 @@
+import numpy as np
+import pytest
+
+from tsp_decompose import solve_decomposed
+
+
+def test_out_of_range_route_is_rejected_before_clustering():
+    points = np.random.default_rng(0).random((30, 2))
+    with pytest.raises(ValueError, match="0-30"):
+        next(solve_decomposed(points, [(0, 30)], cluster_size=10, workers=1))
+
+
+def test_decomposed_tour_visits_every_point_once():
+    points = np.random.default_rng(0).random((30, 2))
+    *_, snapshot = solve_decomposed(points, [(0, 1), (1, 0)], cluster_size=10, workers=1, polish_time=0.5)
+    assert sorted(snapshot["tour"]) == list(range(30))
+    assert snapshot["blocked_used"] == 0
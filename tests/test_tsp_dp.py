@@ -0,0 +1,81 @@
+import itertools
+import math
+
+from gurobipy import GRB
+import numpy as np
+import pytest
+
+import batch_solve
+import tsp_dp
+from batch_solve import solve_instance
+from tsp_dp import DP_MAX_NODES, dp_fits, held_karp
+from tsp_model import pick_formulation
+
+
+# Asymmetric distances with some arcs missing, plus some blocked routes
+def _instance(n, seed):
+    rng = np.random.default_rng(seed)
+    distances = {
+        (i, j): float(rng.integers(1, 100)) for i in range(n) for j in range(n) if i != j and rng.random() > 0.15
+    }
+    blocked = [arc for arc in distances if rng.random() < 0.1]
+    return distances, blocked
+
+
+def _brute_force(n, distances, blocked):
+    best = math.inf
+    for rest in itertools.permutations(range(1, n)):
+        arcs = list(zip((0, *rest), (*rest, 0)))
+        if all(arc in distances and arc not in blocked for arc in arcs):
+            best = min(best, sum(distances[arc] for arc in arcs))
+    return best
+
+
+@pytest.mark.parametrize("n, seed", [(n, seed) for n in range(3, 9) for seed in range(4)])
+def test_held_karp_matches_brute_force(n, seed):
+    distances, blocked = _instance(n, seed)
+    expected = _brute_force(n, distances, set(blocked))
+    result = held_karp(n, distances, blocked)
+    if math.isinf(expected):
+        assert result["status"] == GRB.INFEASIBLE and not result["itinerary"]
+        return
+    assert result["status"] == GRB.OPTIMAL
+    assert result["objective"] == pytest.approx(expected)
+    # The itinerary is one tour over every point, on allowed arcs, of that length
+    itinerary = result["itinerary"]
+    assert sorted(i for i, _ in itinerary) == list(range(n))
+    assert sorted(j for _, j in itinerary) == list(range(n))
+    assert all(arc in distances and arc not in blocked for arc in itinerary)
+    assert sum(distances[arc] for arc in itinerary) == pytest.approx(expected)
+
+
+def test_held_karp_refuses_tables_over_the_memory_budget(monkeypatch):
+    monkeypatch.setattr(tsp_dp, "DP_MEMORY_FRACTION", 1e-12)
+    distances, _ = _instance(8, 0)
+    assert not dp_fits(8)
+    with pytest.raises(MemoryError):
+        held_karp(8, distances)
+
+
+def test_automatic_formulation_switches_to_the_mip_above_the_threshold():
+    assert pick_formulation(DP_MAX_NODES) == "dp"
+    assert pick_formulation(DP_MAX_NODES + 1) == "dfj"
+    assert pick_formulation(DP_MAX_NODES + 1, "dp") == "dp"
+    assert dp_fits(DP_MAX_NODES + 1, max_nodes=None)
+    assert not dp_fits(40, max_nodes=None)
+
+
+def test_batch_dp_instance_too_large_for_memory_falls_back_to_the_mip():
+    positions = np.random.default_rng(0).random((31, 2)).tolist()
+    line = solve_instance({"id": "big", "kind": "tsp", "positions": positions, "formulation": "dp"})
+    assert "error" not in line
+    assert line["formulation"] == "dfj" and line["optimal"]
+
+
+def test_batch_reports_a_memory_error_on_its_own_line(monkeypatch):
+    def out_of_memory(*args):
+        raise MemoryError("tables too large")
+
+    monkeypatch.setattr(batch_solve, "solve_tsp", out_of_memory)
+    line = solve_instance({"id": "t", "kind": "tsp", "positions": [[0, 0], [1, 0], [0, 1]]})
+    assert line["error"] == "MemoryError: tables too large"
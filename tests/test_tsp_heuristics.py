@@ -0,0 +1,15 @@
+import numpy as np
+import pytest
+
+from tsp_heuristics import check_routes
+
+
+def test_check_routes_keeps_valid_pairs():
+    assert check_routes(4, [[0, 3], (np.int64(2), 1)]) == [(0, 3), (2, 1)]
+    assert check_routes(4, []) == []
+
+
+@pytest.mark.parametrize("route", [[0, 7], [-1, 2], [1, 1], [0], [0, 1, 2], 3, ["0", "1"], [0.5, 1]])
+def test_check_routes_rejects_bad_routes(route):
+    with pytest.raises(ValueError):
+        check_routes(4, [route])
@@ -0,0 +1,57 @@
+import math
+import multiprocessing
+import time
+
+import numpy as np
+
+from tsp_anytime import anytime_tsp
+from tsp_race import _publish, _tour_cost, race_tsp
+
+# One-way street: 0 -> 1 -> 2 -> 0 is cheap, the other direction is not
+DISTANCES = {(0, 1): 1.0, (1, 2): 1.0, (2, 0): 1.0, (1, 0): 5.0, (2, 1): 5.0, (0, 2): 5.0}
+
+
+def test_tour_cost_takes_the_cheaper_direction():
+    assert _tour_cost([0, 1, 2], DISTANCES, set()) == (3.0, [0, 1, 2])
+    assert _tour_cost([0, 2, 1], DISTANCES, set()) == (3.0, [1, 2, 0])
+
+
+def test_tour_cost_avoids_blocked_and_missing_arcs():
+    assert _tour_cost([0, 1, 2], DISTANCES, {(0, 1)}) == (15.0, [2, 1, 0])
+    assert _tour_cost([0, 1, 2], DISTANCES, {(0, 1), (1, 0)}) is None
+    missing = {arc: value for arc, value in DISTANCES.items() if arc not in ((2, 0), (0, 2))}
+    assert _tour_cost([0, 1, 2], missing, set()) is None
+
+
+def test_publish_keeps_the_best_tour_and_its_owner():
+    shared = {
+        "length": multiprocessing.Value("d", math.inf),
+        "tour": multiprocessing.Array("i", 3, lock=False),
+        "owner": multiprocessing.Value("i", -1, lock=False),
+        "version": multiprocessing.Value("i", 0, lock=False),
+    }
+    _publish(shared, 2, [0, 2, 1], DISTANCES, {(0, 1)})
+    assert (shared["length"].value, shared["owner"].value) == (15.0, 2)
+    _publish(shared, 1, [0, 1, 2], DISTANCES, set())
+    _publish(shared, 0, [0, 1, 2], DISTANCES, {(0, 1)})
+    assert (shared["length"].value, list(shared["tour"]), shared["owner"].value) == (3.0, [0, 1, 2], 1)
+    assert shared["version"].value == 2
+
+
+def test_anytime_search_ends_when_asked_to_stop():
+    points = np.random.default_rng(0).random((300, 2))
+    start = time.perf_counter()
+    *_, last = anytime_tsp(points, time_limit=30.0, stop=lambda: time.perf_counter() - start > 0.2)
+    assert last["done"]
+    assert time.perf_counter() - start < 2.0
+
+
+def test_heuristic_race_reports_before_the_deadline():
+    points = np.random.default_rng(1).random((60, 2)) * 100
+    distances = {
+        (i, j): float(np.hypot(*(points[i] - points[j]))) for i in range(60) for j in range(60) if i != j
+    }
+    race = race_tsp(points.tolist(), distances, [], ["heuristic"], time_limit=2.0)
+    assert race["winner"] == 0 and race["reason"] == "deadline"
+    run = race["runs"][0]
+    assert run["objective"] is not None and len(run["itinerary"]) == 60